@@ -0,0 +1,12 @@
+# ----------------------------------------------------------------------------------------------------
+# "python -m src <step>" from the root folder of the project. The files of "src" import each other by
+# name, so the "src" folder is added to the path first. See main.py for the options.
+# ----------------------------------------------------------------------------------------------------
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import main # noqa: E402
+
+main()
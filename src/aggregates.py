@@ -0,0 +1,193 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from schema import MONTH_DTYPE, MONTH_NAMES, RESULT_NAMES, schema_applier
+from profiling import instrumented
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# The "cube" is a dataframe with the count of each result name (columns) for every Year and Month (rows).
+# Every year has all 12 months in calendar order, even the ones without data (zeros), so the order of the
+# months never has to be fixed after a groupby. It is built once, then the plots only slice it.
+# ----------------------------------------------------------------------------------------------------
+@instrumented()
+def result_cube_builder(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """Counts the results per Year, Month and Result name in one pass.
+
+    Args:
+        dataframe (pd.DataFrame): Data feed here must be the cleaned and merged data.
+
+    Returns:
+        pd.DataFrame: Index -> (Year, Month). Columns -> result names in the canonical order.
+    """
+    df_results = schema_applier(dataframe[["Year", "Month", "Detailed Result"]])
+
+    # Rows without a year (a result without a song) are not counted.
+    known_year = df_results["Year"].notna().to_numpy()
+    year_values = df_results["Year"].to_numpy(dtype=np.int16, na_value=0)
+    years = np.unique(year_values[known_year])
+    year_codes = np.searchsorted(years, year_values)
+    month_codes = df_results["Month"].cat.codes.to_numpy().astype(np.int64)
+    result_codes = df_results["Detailed Result"].cat.codes.to_numpy().astype(np.int64)
+    # Rows with an unknown month / result name have a code of -1. Those are not counted.
+    valid = known_year & (month_codes >= 0) & (result_codes >= 0)
+    # Every (Year, Month, Result) has its own position in a flat array -> one bincount does all the counting.
+    flat_codes = (year_codes * len(MONTH_NAMES) + month_codes) * len(RESULT_NAMES) + result_codes
+    counts = np.bincount(flat_codes[valid], minlength=len(years) * len(MONTH_NAMES) * len(RESULT_NAMES))
+
+    index = pd.MultiIndex.from_product(
+        [years, pd.CategoricalIndex(MONTH_NAMES, dtype=MONTH_DTYPE)], names=["Year", "Month"]
+        )
+    columns = pd.Index(RESULT_NAMES, name="Detailed Result")
+
+    return pd.DataFrame(counts.reshape(len(index), len(columns)), index=index, columns=columns)
+
+# ----------------------------------------------------------------------------------------------------
+# Functions to get a slice of the cube.
+# ----------------------------------------------------------------------------------------------------
+def zero_trimmer(counts: pd.DataFrame) -> pd.DataFrame:
+    """Removes the rows (Year / Month) without data and the result names that didn't happen.
+
+    Args:
+        counts (pd.DataFrame): Any slice of the cube.
+
+    Returns:
+        pd.DataFrame: Same slice without the zero rows and columns.
+    """
+    counts = counts[counts.sum(axis=1) > 0]
+
+    return counts.loc[:, counts.sum(axis=0) > 0]
+
+def cube_years(cube: pd.DataFrame) -> list[int]:
+    """Years with data in chronological order.
+
+    Args:
+        cube (pd.DataFrame): Output of result_cube_builder.
+
+    Returns:
+        list[int]: Years.
+    """
+    per_year = cube.groupby(level="Year").sum().sum(axis=1)
+
+    return [int(year) for year in per_year.index[per_year > 0]]
+
+def cube_months(cube: pd.DataFrame) -> list[str]:
+    """Months with data in calendar order.
+
+    Args:
+        cube (pd.DataFrame): Output of result_cube_builder.
+
+    Returns:
+        list[str]: Names of the months.
+    """
+    per_month = cube.groupby(level="Month", observed=False).sum().sum(axis=1)
+
+    return [str(month) for month in per_month.index[per_month > 0]]
+
+def months_per_year(cube: pd.DataFrame, year: int) -> pd.DataFrame:
+    """Results per month of one year. Only the months with data.
+
+    Args:
+        cube (pd.DataFrame): Output of result_cube_builder.
+        year (int): The year.
+
+    Returns:
+        pd.DataFrame: Index -> Month. Columns -> result names.
+    """
+    counts = zero_trimmer(cube.xs(year, level="Year"))
+    counts.index = counts.index.astype(str)
+
+    return counts
+
+def years_per_month(cube: pd.DataFrame, month: str) -> pd.DataFrame:
+    """Results per year of one month. Only the years with data in that month.
+
+    Args:
+        cube (pd.DataFrame): Output of result_cube_builder.
+        month (str): Name of the month.
+
+    Returns:
+        pd.DataFrame: Index -> Year. Columns -> result names.
+    """
+    return zero_trimmer(cube.xs(month, level="Month"))
+
+def results_per_year(cube: pd.DataFrame, full_years_only: bool = False) -> pd.DataFrame:
+    """Results per year.
+
+    Args:
+        cube (pd.DataFrame): Output of result_cube_builder.
+        full_years_only (bool, optional): Only the years with data in all 12 months. Defaults to False.
+
+    Returns:
+        pd.DataFrame: Index -> Year. Columns -> result names.
+    """
+    per_year = cube.groupby(level="Year").sum()
+
+    if full_years_only:
+        months_with_data = (cube.sum(axis=1) > 0).groupby(level="Year").sum()
+        per_year = per_year[months_with_data == len(MONTH_NAMES)]
+
+    return zero_trimmer(per_year)
+
+def results_total(cube: pd.DataFrame) -> pd.Series:
+    """Count of each result name in the whole data.
+
+    Args:
+        cube (pd.DataFrame): Output of result_cube_builder.
+
+    Returns:
+        pd.Series: Index -> result names (only the ones that happened).
+    """
+    total = cube.sum(axis=0)
+
+    return total[total > 0]
+
+# ----------------------------------------------------------------------------------------------------
+# Slices of the cube as JSON. Used by the stats service (stats_server.py) and the report (report.py).
+# ----------------------------------------------------------------------------------------------------
+def index_item(item) -> str | int | list:
+    """One item of an index as JSON -> month names stay texts, years become ints, (Year, Month) a list.
+
+    Args:
+        item: Item of the index of a slice of the cube.
+
+    Returns:
+        str | int | list: The item.
+    """
+    if isinstance(item, tuple):
+        return [index_item(part) for part in item]
+
+    return item if isinstance(item, str) else int(item)
+
+def frame_json(counts: pd.DataFrame) -> dict:
+    """A slice of the cube as JSON -> {"index", "columns", "data"}.
+
+    Args:
+        counts (pd.DataFrame): Any slice of the cube.
+
+    Returns:
+        dict: The slice. The data is made of ints.
+    """
+    return {
+        "index" : [index_item(item) for item in counts.index],
+        "columns" : [str(column) for column in counts.columns],
+        "data" : counts.to_numpy().astype(int).tolist()
+    }
+
+def total_json(cube: pd.DataFrame) -> dict:
+    """Count and percentage of each result name -> same numbers as the pie chart.
+
+    Args:
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+
+    Returns:
+        dict: {"index", "data", "percent"}.
+    """
+    total = results_total(cube)
+
+    return {
+        "index" : [str(result) for result in total.index],
+        "data" : total.to_numpy().astype(int).tolist(),
+        "percent" : (total / total.sum() * 100).round(2).tolist()
+    }
@@ -0,0 +1,243 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from functools import lru_cache
+from storage import dataframe_reader, dataframe_writer, data_version_getter
+from schema import RESULT_DTYPE, RESULT_NAMES
+from momentum import TRIES_PER_RESULT
+from text_normalization import WHITESPACE_PATTERN
+from settings import data_path
+from profiling import instrumented
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# Index of the artists of the merged data ("Artist" column, see data_cleaning_merging.py). The rows are
+# grouped by artist once -> the rows of one artist are a slice of "rows" between two "offsets", found with
+# a binary search in the sorted names. The counts of each result per artist are made at the same time.
+# Looking up an artist never goes through the whole data again.
+#
+# The names are compared without case -> "bts" finds "BTS". An artist is counted as written in the table,
+# so "Jawsh 685, Jason Derulo, BTS" is not counted as "BTS".
+#
+# artist_lookup("BTS")   -> the rows of the artist, count of each result, average tries and failure rate
+# artists_stats()        -> the same numbers for all the artists ("artist_stats.csv", written by the cleaning step)
+#
+# The streaming mode of the cleaning step never has the whole data at once -> the counts of each chunk are
+# added up with artist_counts_adder, then made into the same statistics.
+# ----------------------------------------------------------------------------------------------------
+ARTIST_STATS_NAME = "merged/artist_stats.csv"
+
+def artist_key(artist: str) -> str:
+    """Name of an artist as it is searched in the index.
+
+    Args:
+        artist (str): Name of the artist -> " bts ".
+
+    Returns:
+        str: The name without case and with single spaces -> "bts".
+    """
+    return WHITESPACE_PATTERN.sub(" ", artist).strip().casefold()
+
+@instrumented()
+def artist_index_builder(dataframe: pd.DataFrame) -> dict:
+    """Groups the rows by artist and counts the results of each artist, in one pass.
+
+    Args:
+        dataframe (pd.DataFrame): The merged data. At least "Artist" and "Detailed Result".
+
+    Returns:
+        dict: "keys" (sorted names, see artist_key), "offsets" and "rows" (rows of the n-th artist ->
+        rows[offsets[n]:offsets[n + 1]], in the order of the data), "stats" (see artists_stats) and "data".
+    """
+    artists = dataframe["Artist"].astype(object)
+    # Each name is only made into a key once, then the keys are sorted.
+    name_codes, names = pd.factorize(artists)
+    key_codes, keys = pd.factorize(pd.Series([artist_key(name) for name in names], dtype=object), sort=True)
+    # Rows without an artist (not "Artist - Song") have a code of -1. Those are not in the index.
+    valid = name_codes >= 0
+    codes = np.full(len(name_codes), -1)
+    codes[valid] = key_codes[name_codes[valid]]
+    rows = np.flatnonzero(valid)[np.argsort(codes[valid], kind="stable")]
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(codes[valid], minlength=len(keys)))))
+
+    result_codes = pd.Categorical(dataframe["Detailed Result"], dtype=RESULT_DTYPE).codes
+    counted = valid & (result_codes >= 0)
+    counts = np.bincount(codes[counted] * len(RESULT_NAMES) + result_codes[counted],
+                         minlength=len(keys) * len(RESULT_NAMES)).reshape(len(keys), len(RESULT_NAMES))
+
+    df_counts = pd.DataFrame(counts, columns=RESULT_NAMES)
+    # Shown as the first way it is written in the data.
+    df_counts.insert(0, "Artist", artists.to_numpy()[rows[offsets[:-1]]])
+
+    return {"keys" : np.asarray(keys, dtype=object), "offsets" : offsets, "rows" : rows,
+            "stats" : artist_stats_builder(df_counts), "data" : dataframe}
+
+def artist_stats_builder(df_counts: pd.DataFrame) -> pd.DataFrame:
+    """Attempts, average tries and failure rate of each artist, from the count of each result.
+
+    Args:
+        df_counts (pd.DataFrame): "Artist" and the count of each result name, one row per artist.
+
+    Returns:
+        pd.DataFrame: "Artist", "Attempts", the count of each result name, "Average Tries" and "Failure Rate",
+        in the same order as the counts.
+    """
+    counts = df_counts[RESULT_NAMES].to_numpy()
+    attempts = counts.sum(axis=1)
+
+    df_stats = df_counts[["Artist", *RESULT_NAMES]].reset_index(drop=True)
+    df_stats.insert(1, "Attempts", attempts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df_stats["Average Tries"] = counts @ TRIES_PER_RESULT / attempts
+        df_stats["Failure Rate"] = counts[:, RESULT_NAMES.index("Failed")] / attempts
+
+    return df_stats
+
+def artist_counts_adder(df_counts: pd.DataFrame | None, dataframe: pd.DataFrame) -> pd.DataFrame:
+    """Adds the count of each result per artist of a chunk of the merged data to the counts of the chunks
+    before. Only the counts are kept, so the memory used grows with the artists and not with the rows.
+
+    Args:
+        df_counts (pd.DataFrame | None): Output of the chunks before. None for the first chunk.
+        dataframe (pd.DataFrame): Chunk of the merged data. At least "Artist" and "Detailed Result".
+
+    Returns:
+        pd.DataFrame: Index -> names as searched (see artist_key), sorted. Columns -> "Artist" (first way it
+        is written in the data) and the count of each result name. See artist_stats_builder.
+    """
+    artist_index = artist_index_builder(dataframe[["Artist", "Detailed Result"]])
+    df_chunk = artist_index["stats"][["Artist", *RESULT_NAMES]].set_axis(artist_index["keys"])
+
+    if df_counts is None:
+        return df_chunk
+
+    grouped = pd.concat([df_counts, df_chunk]).groupby(level=0, sort=True)
+
+    return pd.concat([grouped["Artist"].first(), grouped[RESULT_NAMES].sum()], axis=1)
+
+def artist_stats_finisher(df_stats: pd.DataFrame) -> pd.DataFrame:
+    """The statistics as they are written to "artist_stats.csv" -> most attempts first, rounded.
+
+    Args:
+        df_stats (pd.DataFrame): Output of artist_stats_builder.
+
+    Returns:
+        pd.DataFrame: The statistics.
+    """
+    return df_stats.sort_values("Attempts", ascending=False, kind="stable").round(4)
+
+def artist_position(artist_index: dict, artist: str) -> int:
+    """Position of an artist in the index, with a binary search.
+
+    Args:
+        artist_index (dict): Output of artist_index_builder.
+        artist (str): Name of the artist, any case.
+
+    Raises:
+        KeyError: The artist is not in the data.
+
+    Returns:
+        int: The position.
+    """
+    key = artist_key(artist)
+    position = int(np.searchsorted(artist_index["keys"], key))
+
+    if position == len(artist_index["keys"]) or artist_index["keys"][position] != key:
+        raise KeyError(f"Unknown artist: {artist}.")
+
+    return position
+
+def artist_attempts(artist_index: dict, artist: str) -> pd.DataFrame:
+    """Rows of the merged data of one artist.
+
+    Args:
+        artist_index (dict): Output of artist_index_builder.
+        artist (str): Name of the artist, any case.
+
+    Raises:
+        KeyError: The artist is not in the data.
+
+    Returns:
+        pd.DataFrame: The rows, in the order of the data.
+    """
+    position = artist_position(artist_index, artist)
+    offsets = artist_index["offsets"]
+
+    return artist_index["data"].iloc[artist_index["rows"][offsets[position]:offsets[position + 1]]]
+
+@lru_cache(maxsize=1)
+def artist_index_reader(merged_path: str, data_version: tuple[str, int, int]) -> dict:
+    """Loads the merged data and builds its index. Cached, so the file is only read again if it has changed.
+
+    Args:
+        merged_path (str): Path of the merged data.
+        data_version (tuple[str, int, int]): Output of storage.data_version_getter. Only used as part of the
+        cache key.
+
+    Returns:
+        dict: Output of artist_index_builder.
+    """
+    return artist_index_builder(dataframe_reader(merged_path))
+
+def artist_index_loader(merged_path: str | None = None) -> dict:
+    """The index of the merged data. See artist_index_reader.
+
+    Args:
+        merged_path (str | None, optional): Path of the merged data. Defaults to None -> "data_merged.csv"
+        in the data folder.
+
+    Returns:
+        dict: Output of artist_index_builder.
+    """
+    merged_path = merged_path or data_path("merged/data_merged.csv")
+
+    return artist_index_reader(merged_path, data_version_getter(merged_path))
+
+def artist_lookup(artist: str, merged_path: str | None = None) -> dict:
+    """Everything about one artist.
+
+    Args:
+        artist (str): Name of the artist, any case.
+        merged_path (str | None, optional): See artist_index_loader. Defaults to None.
+
+    Raises:
+        KeyError: The artist is not in the data.
+
+    Returns:
+        dict: "Artist", "Attempts", the count of each result name, "Average Tries", "Failure Rate" and
+        "Rows" (the rows of the merged data).
+    """
+    artist_index = artist_index_loader(merged_path)
+    position = artist_position(artist_index, artist)
+
+    return {**artist_index["stats"].iloc[position].to_dict(), "Rows" : artist_attempts(artist_index, artist)}
+
+def artists_stats(merged_path: str | None = None) -> pd.DataFrame:
+    """Attempts, count of each result name, average tries and failure rate of every artist.
+
+    Args:
+        merged_path (str | None, optional): See artist_index_loader. Defaults to None.
+
+    Returns:
+        pd.DataFrame: One row per artist, most attempts first.
+    """
+    df_stats = artist_index_loader(merged_path)["stats"]
+
+    return df_stats.sort_values("Attempts", ascending=False, kind="stable").reset_index(drop=True)
+
+def artist_stats_writer(merged_path: str | None = None, stats_path: str | None = None) -> None:
+    """Writes the statistics of every artist -> "artist_stats.csv". Used by the cleaning step, except in
+    streaming mode (see data_cleaning_merging.merged_chunks_builder).
+
+    Args:
+        merged_path (str | None, optional): Path of the merged data. Defaults to None -> "data_merged.csv"
+        in the data folder.
+        stats_path (str | None, optional): Where to write them. Defaults to None -> ARTIST_STATS_NAME in the
+        data folder.
+    """
+    merged_path = merged_path or data_path("merged/data_merged.csv")
+    # Only the two columns used by the counts are loaded.
+    df_stats = artist_index_builder(dataframe_reader(merged_path, columns=["Artist", "Detailed Result"]))["stats"]
+
+    dataframe_writer(artist_stats_finisher(df_stats), stats_path or data_path(ARTIST_STATS_NAME))
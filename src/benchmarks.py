@@ -0,0 +1,172 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from synthetic_data import synthetic_archive_builder, cell_styles_builder, temporary_project
+from data_gathering import results_cleaner, tables_scraper_pandas
+from data_cleaning_merging import main as data_cleaning
+from text_normalization import song_catcher, songs_filter
+from storage import dataframe_reader, dataframe_writer
+from settings import data_path
+from aggregates import result_cube_builder
+from momentum import momentum_builder
+from figure_rendering import figure_data_slicer, figure_jobs_builder
+from typing import Callable
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# Benchmarks of the pipeline on synthetic archives (see synthetic_data.py). Each function of the pipeline
+# and the whole run (scraped data -> CSV files -> cleaning -> cube) is timed for every size. The fastest
+# time of each benchmark can be saved as a baseline. The next runs are compared to it and the script
+# fails if one of them got slower than the tolerance.
+#
+# python benchmarks.py --sizes 10000 100000 --save-baseline
+# python benchmarks.py --sizes 10000 100000
+# ----------------------------------------------------------------------------------------------------
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT_DIR, "data", "benchmarks", "baseline.json")
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+TOLERANCE = 0.25
+
+def benchmarks_builder(rows: int, seed: int = 0) -> dict[str, Callable[[], object]]:
+    """Makes the synthetic data of one size and the benchmarks that use it. Making the data is not timed.
+
+    Args:
+        rows (int): Number of rows of the synthetic archive.
+        seed (int, optional): Seed of the synthetic archive. Defaults to 0.
+
+    Returns:
+        dict[str, Callable[[], object]]: Name of the benchmark -> function to be timed.
+    """
+    tables, table_styles = synthetic_archive_builder(rows, seed=seed)
+    cell_styles = cell_styles_builder(table_styles)
+
+    df_results = results_cleaner(cell_styles)
+    df_tables = tables_scraper_pandas(tables)
+    songs = df_tables["Song Questions + Snack Time Game"]
+    df_songs = df_tables[songs_filter(songs)].reset_index(drop=True)
+    df_merged = pd.concat([df_songs, df_results], axis=1)
+    cube = result_cube_builder(df_merged)
+
+    return {
+        "results_cleaner" : lambda: results_cleaner(cell_styles),
+        "tables_scraper_pandas" : lambda: tables_scraper_pandas(tables),
+        "song_catcher" : lambda: songs.map(song_catcher),
+        "songs_filter" : lambda: songs_filter(songs),
+        "result_cube_builder" : lambda: result_cube_builder(df_merged),
+        "momentum_builder" : lambda: momentum_builder(df_merged),
+        "figure_data_slicer" : lambda: [figure_data_slicer(cube, function_name, arguments)
+                                        for _, function_name, arguments in figure_jobs_builder(cube)],
+        "end_to_end" : lambda: end_to_end_runner(cell_styles, tables)
+    }
+
+def end_to_end_runner(cell_styles: list[str], tables: list[pd.DataFrame]) -> pd.DataFrame:
+    """Runs the pipeline without the scraping and the plots, with the files written to a temporary folder
+    that has the same layout as the project.
+
+    Args:
+        cell_styles (list[str]): Styles of the cells, like data_gathering.result_scraper_lxml.
+        tables (list[pd.DataFrame]): Tables per year, like data_gathering.result_scraper_lxml.
+
+    Returns:
+        pd.DataFrame: The cube of the merged data.
+    """
+    with temporary_project():
+        dataframe_writer(results_cleaner(cell_styles), data_path("cleaned/cleaned_result.csv"))
+        dataframe_writer(tables_scraper_pandas(tables), data_path("raw/raw_tables.csv"))
+        data_cleaning()
+        df_merged = dataframe_reader(data_path("merged/data_merged.csv"), columns=["Month", "Year", "Detailed Result"])
+
+        return result_cube_builder(df_merged)
+
+def benchmark_timer(function: Callable[[], object], repeat: int) -> dict[str, float]:
+    """Times a function a few times.
+
+    Args:
+        function (Callable[[], object]): The function to be timed.
+        repeat (int): How many times.
+
+    Returns:
+        dict[str, float]: Fastest and median time in seconds.
+    """
+    timings = []
+
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start_time)
+
+    return {"min" : min(timings), "median" : statistics.median(timings)}
+
+def baseline_comparer(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Compares the fastest times to the baseline.
+
+    Args:
+        results (dict): Size -> name of the benchmark -> timings.
+        baseline (dict): Same format as results.
+        tolerance (float): How much slower is still fine -> 0.25 = 25% slower.
+
+    Returns:
+        list[str]: The benchmarks that got slower than the tolerance.
+    """
+    regressions = []
+
+    for size, per_size in results.items():
+        for name, timings in per_size.items():
+            previous = baseline.get(size, {}).get(name)
+            if previous is None:
+                continue
+            if timings["min"] > previous["min"] * (1 + tolerance):
+                regressions.append(f"{name} ({size} rows): {timings['min']:.4f}s vs {previous['min']:.4f}s")
+
+    return regressions
+
+def main():
+    """
+    Runs the benchmarks of all the sizes and prints the times. Saves them as the baseline (--save-baseline)
+    or compares them to the saved baseline. Exits with 1 if one of the benchmarks got slower.
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks of the pipeline on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Rows of the synthetic archives.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark. The fastest one is kept.")
+    parser.add_argument("--only", nargs="+", help="Names of the benchmarks to be run.")
+    parser.add_argument("--save-baseline", action="store_true", help="Save the times as the baseline.")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Allowed slowdown -> 0.25 = 25%%.")
+    arguments = parser.parse_args()
+
+    results = {}
+    for rows in arguments.sizes:
+        per_size = results.setdefault(str(rows), {})
+        for name, function in benchmarks_builder(rows).items():
+            if arguments.only and name not in arguments.only:
+                continue
+            per_size[name] = benchmark_timer(function, arguments.repeat)
+            print(f"{name} ({rows} rows): {per_size[name]['min']:.4f}s min, {per_size[name]['median']:.4f}s median")
+
+    if arguments.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        print(f"Baseline saved to {BASELINE_PATH}")
+        return
+
+    if not os.path.exists(BASELINE_PATH):
+        print("No baseline yet. Use --save-baseline.")
+        return
+
+    with open(BASELINE_PATH, encoding="utf-8") as baseline_file:
+        regressions = baseline_comparer(results, json.load(baseline_file), arguments.tolerance)
+
+    for regression in regressions:
+        print(f"Slower than the baseline: {regression}")
+    if regressions:
+        sys.exit(1)
+    print("No regression.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from synthetic_data import temporary_project
+from data_cleaning_merging import TABLE_COLUMNS, data_merger, main as data_cleaning_merging
+from aggregates import result_cube_builder
+from results_sidecar import sidecar_frame_loader, sidecar_writer
+from results_store import result_rates_query, store_writer
+from storage import dataframe_reader, dataframe_writer
+from settings import data_path
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# Checks of the steps on a few rows made by hand, for the cases that the real data and the synthetic
+# archive don't have (see fixture_server.py for the checks on the synthetic archive). Each checker raises
+# an AssertionError if the output is not the expected one.
+#
+# python checks.py     -> runs all of them
+# ----------------------------------------------------------------------------------------------------
+TABLE_ROWS = [
+    ["1", "BTS - DNA", "April 7, 2018", "April", 2018],
+    ["1", "Twice - Fancy", "April 7, 2018", "April", 2018],
+    ["2", "IU - Lilac", "April 14, 2018", "April", 2018]
+]
+RESULT_ROWS = [
+    ["2nd Try Success", "Success", 2],
+    ["Failed", "Failed", 0],
+    ["1st Try Success", "Success", 1]
+]
+# Rows of "raw_tables.csv" that are not songs.
+SNACK_ROW = ["2", "Initial Quiz", "April 14, 2018", "April", 2018]
+# Files written by data_cleaning_merging.
+CLEANED_FILES = ["cleaned/cleaned_tables.csv", "merged/data_merged.csv", "merged/artist_stats.csv"]
+# Merged data of store_checker -> an artist written two ways, an episode that is not a number and a
+# round with an unknown month ("TBA").
+STORE_ROWS = {
+    "Episode #" : ["1", "1", "2", "Special 3"],
+    "Song Questions + Snack Time Game" : ["BTS - DNA", "IU - Lilac", "bts - Butter", "AKMU - Dinosaur"],
+    "Artist" : ["BTS", "IU", "bts", "AKMU"],
+    "Song" : ["DNA", "Lilac", "Butter", "Dinosaur"],
+    "Air Date" : ["April 7, 2018", "April 7, 2018", "April 14, 2018", "TBA"],
+    "Month" : ["April", "April", "April", "TBA"],
+    "Year" : [2018, 2018, 2018, 2019],
+    "Detailed Result" : ["2nd Try Success", "Failed", "1st Try Success", "Failed"],
+    "General Result" : ["Success", "Failed", "Success", "Failed"],
+    "Result as Number" : [2, 0, 1, 0]
+}
+
+def check_tables(rows: int) -> pd.DataFrame:
+    """The first rows of TABLE_ROWS, as the songs of the cleaned tables.
+
+    Args:
+        rows (int): Number of rows.
+
+    Returns:
+        pd.DataFrame: Songs with a result.
+    """
+    return pd.DataFrame(TABLE_ROWS[:rows], columns=TABLE_COLUMNS)
+
+def check_results(rows: int) -> pd.DataFrame:
+    """The first rows of RESULT_ROWS, as the cleaned results.
+
+    Args:
+        rows (int): Number of rows.
+
+    Returns:
+        pd.DataFrame: Results.
+    """
+    return pd.DataFrame(RESULT_ROWS[:rows], columns=["Detailed Result", "General Result", "Result as Number"])
+
+def merge_mismatch_checker() -> None:
+    """Merges more results than songs, then more songs than results. The missing cells are <NA> (the
+    merge must not fail on the ints), the rows without a year are not counted in the cube, and the
+    sidecar loads them back as <NA>.
+
+    Raises:
+        AssertionError: The merged data is not the expected one.
+    """
+    df_merged = data_merger(check_tables(1), check_results(2))
+
+    assert len(df_merged) == 2
+    assert str(df_merged["Year"].dtype) == "Int16" and str(df_merged["Result as Number"].dtype) == "Int8"
+    assert df_merged["Year"].isna().tolist() == [False, True]
+    assert df_merged["Result as Number"].tolist() == [2, 0]
+    assert result_cube_builder(df_merged).to_numpy().sum() == 1
+
+    with temporary_project():
+        dataframe_writer(df_merged, data_path("merged/data_merged.csv"))
+        sidecar_writer()
+        df_sidecar = sidecar_frame_loader(columns=["Year", "Detailed Result"])
+
+    assert df_sidecar is not None
+    pd.testing.assert_series_equal(df_sidecar["Year"], df_merged["Year"])
+    pd.testing.assert_series_equal(df_sidecar["Detailed Result"], df_merged["Detailed Result"])
+
+    df_merged = data_merger(check_tables(3), check_results(2))
+
+    assert len(df_merged) == 3
+    assert df_merged["Result as Number"].isna().tolist() == [False, False, True]
+    assert result_cube_builder(df_merged).to_numpy().sum() == 2
+
+def streaming_checker(songs: int, results: int) -> None:
+    """Runs data_cleaning_merging on a few rows, all at once then one row at a time (streaming mode), and
+    checks that the files are the same.
+
+    Args:
+        songs (int): Number of songs of "raw_tables.csv" (at most the rows of TABLE_ROWS).
+        results (int): Number of rows of "cleaned_result.csv" (at most the rows of RESULT_ROWS).
+
+    Raises:
+        AssertionError: The files of the streaming mode are not the same.
+    """
+    df_tables = check_tables(songs)
+    df_tables = pd.concat([df_tables, pd.DataFrame([SNACK_ROW], columns=TABLE_COLUMNS)], ignore_index=True)
+
+    with temporary_project():
+        dataframe_writer(df_tables, data_path("raw/raw_tables.csv"))
+        dataframe_writer(check_results(results), data_path("cleaned/cleaned_result.csv"))
+
+        data_cleaning_merging()
+        expected = {path : dataframe_reader(data_path(path)) for path in CLEANED_FILES}
+        data_cleaning_merging(chunk_size=1)
+        streamed = {path : dataframe_reader(data_path(path)) for path in CLEANED_FILES}
+
+    assert len(expected["merged/data_merged.csv"]) == max(songs, results)
+    for path in CLEANED_FILES:
+        pd.testing.assert_frame_equal(streamed[path], expected[path], obj=path)
+
+def store_checker() -> None:
+    """Writes a few rows to the SQLite store (see results_store.py) and checks the groups, the counts and
+    the failure rates of result_rates_query for each "by".
+
+    Raises:
+        AssertionError: The answer of the store is not the expected one.
+    """
+    with temporary_project():
+        dataframe_writer(pd.DataFrame(STORE_ROWS), data_path("merged/data_merged.csv"))
+        store_writer()
+        rates = {by : result_rates_query(by=by) for by in ("year", "month", "episode", "artist")}
+
+    assert list(rates["year"].index) == [2018, 2019], rates["year"]
+    assert list(rates["year"]["Total"]) == [3, 1], rates["year"]
+    assert list(rates["year"]["Failure Rate"]) == [1 / 3, 1.0], rates["year"]
+    # The unknown month is grouped under None, after the known months.
+    assert list(rates["month"].index) == ["April", None], rates["month"]
+    assert list(rates["month"]["Total"]) == [3, 1], rates["month"]
+    assert list(rates["month"]["Failure Rate"]) == [1 / 3, 1.0], rates["month"]
+    # In the order of the data.
+    assert list(rates["episode"].index) == ["1", "2", "Special 3"], rates["episode"]
+    assert list(rates["episode"]["Total"]) == [2, 1, 1], rates["episode"]
+    assert list(rates["episode"]["1st Try Success"]) == [0, 1, 0], rates["episode"]
+    # Any case is the same artist. Most rounds first, then in the order of the data.
+    assert [artist.lower() for artist in rates["artist"].index] == ["bts", "iu", "akmu"], rates["artist"]
+    assert list(rates["artist"]["Total"]) == [2, 1, 1], rates["artist"]
+    assert list(rates["artist"]["Failure Rate"]) == [0.0, 1.0, 1.0], rates["artist"]
+
+def main():
+    """
+    Runs all the checks.
+    """
+    merge_mismatch_checker()
+    print("More results than songs / more songs than results: merged as expected")
+    streaming_checker(songs=1, results=3)
+    streaming_checker(songs=3, results=2)
+    print("Streaming mode with more results than songs / more songs than results: same files as all at once")
+    store_checker()
+    print("SQLite store: groups per year, month, episode and artist as expected")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,12 @@
-import matplotlib.pyplot as plt
-import matplotlib as mpl
+import hashlib
+import json
+
+# Colors of each result name. Same colors as the cells in the Wikipedia page.
+COLOR_DICT = {"1st Try Success" : "#ABEBC6", "2nd Try Success" : "#AED6F1", "3rd Try Success" : "#E6B0AA", "Failed" : "#D2B4DE"}
+# rcParams set by custom_plot_settings.
+PLOT_RC_PARAMS = {"figure.dpi" : 150, "figure.figsize" : (10, 10), "font.size" : 14}
+# Settings used when saving the figures.
+SAVEFIG_SETTINGS = {"dpi" : 300, "bbox_inches" : "tight", "pad_inches" : 0.5}
 
 def custom_plot_settings(result_names: list[str]):
     """Accepts a list of string that contains the current result names.
@@ -11,23 +18,34 @@ def custom_plot_settings(result_names: list[str]):
     Returns:
         matplotlib.colors.ListedColormap: Custom Colormap.
     """
-    color_dict = {"1st Try Success" : "#ABEBC6", "2nd Try Success" : "#AED6F1", "3rd Try Success" : "#E6B0AA", "Failed" : "#D2B4DE"}
-    
+    # matplotlib is only imported here, so the colors can be used without it (see report.py).
+    import matplotlib.pyplot as plt
+    import matplotlib as mpl
+
     colors = []
     
     for result_name in result_names:
-        if result_name in color_dict.keys():
-            colors.append(color_dict[result_name])
+        if result_name in COLOR_DICT.keys():
+            colors.append(COLOR_DICT[result_name])
     
     custom_colors = plt.cm.colors.ListedColormap(colors) # type: ignore
 
-    mpl.rcParams["figure.dpi"] = 150
-    mpl.rcParams["figure.figsize"] = (10, 10)
-    mpl.rcParams["font.size"] = 14
+    for name, value in PLOT_RC_PARAMS.items():
+        mpl.rcParams[name] = value
     
     return custom_colors
 
+def plot_settings_fingerprint() -> str:
+    """Hash of all the settings above. If any of them changes, the figures have to be made again.
+
+    Returns:
+        str: sha256 of the settings.
+    """
+    settings = {"colors" : COLOR_DICT, "rc_params" : PLOT_RC_PARAMS, "savefig" : SAVEFIG_SETTINGS}
+    
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
 if __name__ == "__main__":
     # Just a test case.
     result_names = ["1st Try Success", "2nd Try Success", "3rd Try Success", "Failed"]
-    custom_colors = custom_plot_settings(result_names)
\ No newline at end of file
+    custom_colors = custom_plot_settings(result_names)
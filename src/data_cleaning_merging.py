@@ -1,95 +1,185 @@
 # ----------------------------------------------------------------------------------------------------
 # Imports
 # ----------------------------------------------------------------------------------------------------
+from typing import Iterable, Iterator
+from incremental import dataframe_appender, high_water_mark_reader, from_mark_filter, songs_results_checker
+from storage import dataframe_reader, dataframe_writer, dataframes_writer, dataframe_chunks_reader, dataframes_chunks_writer
+from schema import schema_applier
+from text_normalization import artist_song_splitter, songs_filter
+from results_store import store_writer
+from results_sidecar import sidecar_writer
+from artists import ARTIST_STATS_NAME, artist_counts_adder, artist_stats_builder, artist_stats_finisher, artist_stats_writer
+from settings import data_path
+from profiling import instrumented
 import pandas as pd
-import re
+
+# ----------------------------------------------------------------------------------------------------
+# Columns of the data.
+# ----------------------------------------------------------------------------------------------------
+# Columns of the merged data.
+COLUMNS_INORDER = ["Episode #", "Song Questions + Snack Time Game", "Artist", "Song", "Air Date", "Month", "Year",
+                   "Detailed Result", "General Result", "Result as Number"]
+# Columns of "cleaned_tables.csv" and "cleaned_result.csv".
+TABLE_COLUMNS = ["Episode #", "Song Questions + Snack Time Game", "Air Date", "Month", "Year"]
+RESULT_COLUMNS = ["Detailed Result", "General Result", "Result as Number"]
 
 # ----------------------------------------------------------------------------------------------------
 # Functions that are used by the main function.
 # ----------------------------------------------------------------------------------------------------
-def song_catcher(text: str) -> bool:
-    """Accepts a string and determines if its a song or not based on the format "String - String".
+def artist_columns_adder(df_merged: pd.DataFrame) -> pd.DataFrame:
+    """Adds the "Artist" and "Song" columns (see text_normalization.artist_song_splitter) and puts the
+    columns in order.
 
     Args:
-        text (str): A string to be determine if its a song or not.
+        df_merged (pd.DataFrame): Merged data, with or without the "Artist" and "Song" columns.
 
     Returns:
-        bool: True -> It is a song.\n\t\tFalse -> Not a song.
+        pd.DataFrame: The merged data.
     """
-    pattern = r"[a-zA-Z0-9`~!@#$%^&*)(=+_\}{';:.>,<?/-Â] - [a-zA-Z0-9`~!@#$%^&*)(=+_\}{';:.>,<?/-Â]|[a-zA-Z0-9`~!@#$%^&*)(=+_\}{';:.>,<?/-Â] -[a-zA-Z0-9`~!@#$%^&*)(=+_\}{';:.>,<?/-Â]"
-    is_it_a_song = False
-    
-    matched = re.findall(pattern, text)
-    if matched:
-        is_it_a_song = True
-        return is_it_a_song
-    else:
-        return is_it_a_song
+    df_merged = df_merged.drop(columns=["Artist", "Song"], errors="ignore")
+    df_merged = pd.concat([df_merged, artist_song_splitter(df_merged["Song Questions + Snack Time Game"])], axis=1)
 
-def song_remover(text: str) -> bool:
-    """Accepts a string and determines if its a song to be 
-    remove or not since not all song has a result in it.
+    return schema_applier(df_merged[COLUMNS_INORDER])
+
+def data_merger(df_table_songs: pd.DataFrame, df_results: pd.DataFrame) -> pd.DataFrame:
+    """Puts the results next to the songs. The n-th song gets the n-th result.
 
     Args:
-        text (str): A string to be determine if its to be remove or not.
+        df_table_songs (pd.DataFrame): Songs with a result, index starting from 0.
+        df_results (pd.DataFrame): Results, index starting from 0.
 
     Returns:
-        bool: True -> Remove the song.\n\t\tFalse -> Don't remove the song.
+        pd.DataFrame: The merged data.
     """
-    # This list contains the songs with no Result in it.
-    song_list = [
-        "Jin (BTS) - Super Tuna",
-        "Badkiz - Ear Attack",
-        "DJ DOC - Let's Go to the Beach",
-        "BTS - Airplane pt.2",
-        "Deux - We Are",
-        "TXT - New Rules",
-        "Turbo - Only Seventeen",
-        "Lee Seung-yoon - Some Some Some",
-        "TBA - TBA"
-    ]
-    
-    remove_song = False
+    return artist_columns_adder(pd.concat([df_table_songs, df_results], axis=1))
+
+def merged_chunks_builder(table_chunks: Iterable[pd.DataFrame], result_chunks: Iterable[pd.DataFrame]) -> Iterator[dict[str, pd.DataFrame]]:
+    """Streaming version of the main function. The songs of each chunk of the tables get the next results,
+    so only about two chunks are in memory at once. The results of each artist are counted chunk by chunk
+    (see artists.artist_counts_adder), and "artist_stats.csv" is written at the end.
+
+    Args:
+        table_chunks (Iterable[pd.DataFrame]): Chunks of "raw_tables.csv".
+        result_chunks (Iterable[pd.DataFrame]): Chunks of "cleaned_result.csv".
+
+    Yields:
+        Iterator[dict[str, pd.DataFrame]]: Path -> rows to be added to "cleaned_tables.csv" and "data_merged.csv",
+        then "artist_stats.csv" as one last chunk.
+    """
+    result_chunks = iter(result_chunks)
+    df_pending = schema_applier(pd.DataFrame(columns=RESULT_COLUMNS))
+    df_no_songs = pd.DataFrame(columns=TABLE_COLUMNS)
+    df_artist_counts = None
+
+    for df_tables in table_chunks:
+        df_table_songs = df_tables[songs_filter(df_tables["Song Questions + Snack Time Game"])].reset_index(drop=True)
+        # Results that are not used yet, enough for the songs of this chunk.
+        while len(df_pending) < len(df_table_songs):
+            df_next = next(result_chunks, None)
+            if df_next is None:
+                break
+            df_pending = pd.concat([df_pending, schema_applier(df_next)], ignore_index=True)
+
+        df_results = df_pending.iloc[:len(df_table_songs)].reset_index(drop=True)
+        df_pending = df_pending.iloc[len(df_table_songs):].reset_index(drop=True)
+        df_merged = data_merger(df_table_songs, df_results)
+        df_artist_counts = artist_counts_adder(df_artist_counts, df_merged)
+
+        yield {
+            data_path("cleaned/cleaned_tables.csv") : df_table_songs,
+            data_path("merged/data_merged.csv") : df_merged
+        }
+    # More results than songs. Same as the main function -> the results are added without songs (<NA> year).
+    for df_next in result_chunks:
+        df_pending = pd.concat([df_pending, schema_applier(df_next)], ignore_index=True)
+
+    if len(df_pending):
+        df_merged = data_merger(df_no_songs, df_pending)
+        df_artist_counts = artist_counts_adder(df_artist_counts, df_merged)
+        yield {data_path("merged/data_merged.csv") : df_merged}
+
+    if df_artist_counts is not None:
+        yield {data_path(ARTIST_STATS_NAME) : artist_stats_finisher(artist_stats_builder(df_artist_counts))}
+
+def cleaned_data_writer(incremental: bool = False, chunk_size: int | None = None) -> None:
+    """Cleans and merges the data, then writes the CSV files. See the main function.
+
+    Args:
+        incremental (bool, optional): See the main function. Defaults to False.
+        chunk_size (int | None, optional): See the main function. Defaults to None.
+    """
+    if chunk_size is not None:
+        if incremental:
+            raise ValueError("The streaming mode can't be used with the incremental mode.")
+        dataframes_chunks_writer(merged_chunks_builder(
+            dataframe_chunks_reader(data_path("raw/raw_tables.csv"), chunk_size, dtype={"Episode #" : str}),
+            dataframe_chunks_reader(data_path("cleaned/cleaned_result.csv"), chunk_size)
+            ))
+        return
+
+    high_water_mark = high_water_mark_reader(data_path("merged/data_merged.csv")) if incremental else None
     
-    if text in song_list:
-        remove_song = True
-        return remove_song
+    df_results = schema_applier(dataframe_reader(data_path("cleaned/cleaned_result.csv")))
+    df_tables = dataframe_reader(data_path("raw/raw_tables.csv"))
     
-    return remove_song
+    if high_water_mark is not None:
+        # Only the last episode in the merged data and the rows after it are cleaned (again).
+        kept_rows = high_water_mark["Rows"] - high_water_mark["Rows in last episode"]
+        df_results = df_results.iloc[kept_rows:].reset_index(drop=True)
+        df_tables = df_tables[from_mark_filter(df_tables, high_water_mark)]
+
+    df_table_songs = df_tables[songs_filter(df_tables["Song Questions + Snack Time Game"])].reset_index(drop=True)
+
+    if high_water_mark is not None:
+        songs_results_checker(len(df_table_songs), len(df_results), high_water_mark)
+
+    df_merged = data_merger(df_table_songs, df_results)
+
+    if high_water_mark is not None:
+        dataframes_writer({
+            data_path("cleaned/cleaned_tables.csv") : dataframe_appender(
+                data_path("cleaned/cleaned_tables.csv"), df_table_songs, kept_rows
+                ),
+            # The Artist / Song of the existing rows are made again, in case they were written without them.
+            data_path("merged/data_merged.csv") : artist_columns_adder(dataframe_appender(
+                data_path("merged/data_merged.csv"), df_merged, kept_rows
+                ))
+        })
+        return
+
+    dataframe_writer(df_table_songs, data_path("cleaned/cleaned_tables.csv"))
+    dataframe_writer(df_merged, data_path("merged/data_merged.csv"))
 
 # ----------------------------------------------------------------------------------------------------
 # Main function:
 # ----------------------------------------------------------------------------------------------------
-def main() -> None:
+@instrumented("clean")
+def main(incremental: bool = False, chunk_size: int | None = None, store: bool = False,
+         sidecar: bool = False) -> None:
     """
     Main function of the file. Loads the csv as dataframe then determines each row in "Song" if its a song.
     Outputs a file that is cleaned -> filtered data wherein all the data are just songs with results in it.
+    The success statistics of each artist are written to "artist_stats.csv" (see artists.py).
+
+    Args:
+        incremental (bool, optional): Only clean the last episode in the merged data and the rows after it,
+        and replace them in the existing CSV files. Defaults to False.
+        chunk_size (int | None, optional): Streaming mode -> the files are read, cleaned and written this
+        many rows at a time, so the memory used doesn't grow with the data. Defaults to None -> all at once.
+        store (bool, optional): Also write the merged data to the SQLite store (see results_store.py).
+        Defaults to False.
+        sidecar (bool, optional): Also write the binary sidecar of the merged data, used by the plots and
+        the stats instead of the CSV (see results_sidecar.py). Defaults to False.
     """
-    df_results = pd.read_csv("../data/cleaned/cleaned_result.csv")
-    df_tables = pd.read_csv("../data/raw/raw_tables.csv")
-
-    songs_handler = []
-
-    for _, row in df_tables.iterrows():
-        current_row = row.copy()
-        current_song = str(current_row["Song Questions + Snack Time Game"])
-        
-        remove_song = song_remover(current_song)
-        if remove_song is True:
-            continue
-        
-        is_it_a_song = song_catcher(current_song)
-        if is_it_a_song is True:
-            songs_handler.append(current_row.to_dict())
-
-    df_table_songs = pd.DataFrame(songs_handler)
-
-    df_merged = pd.concat([df_table_songs, df_results], axis=1)
-    columns_inorder = ["Episode #", "Song Questions + Snack Time Game", "Air Date", "Month", "Year", "Detailed Result", "General Result", "Result as Number"]
-    df_merged[columns_inorder] = df_merged[columns_inorder].astype("object")
-
-    df_table_songs.to_csv("../data/cleaned/cleaned_tables.csv", index=False)
-    df_merged.to_csv("../data/merged/data_merged.csv", index=False)
+    cleaned_data_writer(incremental, chunk_size)
+    # The streaming mode has already written them, without reading the merged data again.
+    if chunk_size is None:
+        artist_stats_writer(data_path("merged/data_merged.csv"))
+
+    if store:
+        store_writer(data_path("merged/data_merged.csv"))
+    if sidecar:
+        sidecar_writer(data_path("merged/data_merged.csv"))
 
 if __name__ == "__main__":
     main()
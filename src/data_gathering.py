@@ -1,11 +1,17 @@
 # ----------------------------------------------------------------------------------------------------
 # Imports:
 # ----------------------------------------------------------------------------------------------------
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service as EdgeService
-from selenium.webdriver.common.by import By
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
-import time
+from io import StringIO
+from urllib.request import Request, urlopen
+from page_cache import USER_AGENT, cached_page_fetcher
+from incremental import dataframe_appender, high_water_mark_reader, from_mark_filter, songs_results_checker
+from storage import dataframe_writer, dataframes_writer
+from schema import schema_applier
+from settings import data_path
+from profiling import counter_incrementer, instrumented
+from text_normalization import (string_formatter, month_extractor, column_formatter, month_column_extractor,
+                                air_date_parser, month_name_extractor, songs_filter)
+import lxml.html
 import pandas as pd
 import re
 
@@ -19,10 +25,146 @@ Success - 2nd attempt - 174, 214, 241   -   Blue    -   "background: rgb(174, 21
 Success - 3rd attempt - 230, 176, 170   -   Red     -   "background: rgb(230, 176, 170);    -   #E6B0AA"
 Failed                - 210, 180, 222   -   Purple  -   "background: rgb(210, 180, 222);    -   #D2B4DE"
 '''
+# Style of a cell (as returned by the browser) -> (Detailed Result, General Result, Result as Number).
+RESULT_COLORS = {
+    "background: rgb(171, 235, 198);" : ("1st Try Success", "Success", 1),
+    "background: rgb(174, 214, 241);" : ("2nd Try Success", "Success", 2),
+    "background: rgb(230, 176, 170);" : ("3rd Try Success", "Success", 3),
+    "background: rgb(210, 180, 222);" : ("Failed", "Failed", 0)
+}
+# The first table in the webpage is for the year 2018. One table per year.
+FIRST_YEAR = 2018
+PAGE_URL = "https://en.wikipedia.org/wiki/List_of_DoReMi_Market_episodes"
+# The tables with the episodes (and their colored cells).
+TABLE_XPATH = "//div[contains(@class, \"hidden-content mw-collapsible-content\")]"
 
 # ----------------------------------------------------------------------------------------------------
 # Collection of functions used by main.
 # ----------------------------------------------------------------------------------------------------
+@instrumented()
+def page_source_fetcher(page_url: str) -> str:
+    """Downloads the HTML of the webpage once. No browser needed.
+
+    Args:
+        page_url (str): URL of the webpage to be scraped.
+
+    Returns:
+        str: The HTML of the webpage.
+    """
+    # Wikipedia refuses requests without a User-Agent.
+    request = Request(page_url, headers={"User-Agent": USER_AGENT})
+    
+    counter_incrementer("network_calls")
+    with urlopen(request, timeout=30) as response:
+        charset = response.headers.get_content_charset() or "utf-8"
+        html = response.read().decode(charset)
+    
+    return html
+
+def style_normalizer(style: str) -> str:
+    """The style attribute in the raw HTML is written as "background:#ABEBC6" while the browser (Selenium)
+    gives back "background: rgb(171, 235, 198);". This converts the raw one to the format of the browser
+    so that results_cleaner works the same way for both.
+
+    Args:
+        style (str): Value of the "style" attribute of a cell. Can be empty.
+
+    Returns:
+        str: Style in the same format as the one returned by Selenium.
+    """
+    declarations = []
+    
+    for per_declaration in style.split(";"):
+        if ":" not in per_declaration:
+            continue
+        name, value = per_declaration.split(":", 1)
+        name = name.strip().lower()
+        value = value.strip()
+        
+        hex_color = re.fullmatch(r"#([0-9a-fA-F]{3}|[0-9a-fA-F]{6})", value)
+        if hex_color:
+            hex_value = hex_color.group(1)
+            if len(hex_value) == 3:
+                hex_value = "".join(per_char * 2 for per_char in hex_value)
+            red, green, blue = (int(hex_value[i:i + 2], 16) for i in (0, 2, 4))
+            value = f"rgb({red}, {green}, {blue})"
+        else:
+            rgb_color = re.fullmatch(r"rgb\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)", value)
+            if rgb_color:
+                value = "rgb({}, {}, {})".format(*rgb_color.groups())
+        # The browser reports "background-color" that is set alone as "background".
+        if name == "background-color":
+            name = "background"
+        
+        declarations.append(f"{name}: {value};")
+    
+    return " ".join(declarations)
+
+@instrumented()
+def result_scraper_lxml(html: str, first_table: int = 0, table_xpath: str = TABLE_XPATH) -> tuple[list[str], list[pd.DataFrame]]:
+    """Parses the HTML once and gets both the color of each cell and the text of each table
+    from the same "hidden-content mw-collapsible-content" tables.
+
+    Args:
+        html (str): The HTML of the webpage. Either downloaded or from a local file.
+        first_table (int, optional): Tables before this one are skipped. Used by the incremental mode.
+        Defaults to 0.
+        table_xpath (str, optional): XPath of the tables. Defaults to TABLE_XPATH.
+
+    Returns:
+        tuple[list[str], list[pd.DataFrame]]: A list consisting of the style of each cell (same as 
+        result_scraper_selenium) and the tables per year.
+    """
+    document = lxml.html.fromstring(html)
+    all_tables_lxml = document.xpath(table_xpath)
+    
+    data_table_lxml = []
+    tables_html = []
+    
+    for per_table in all_tables_lxml[first_table:]:
+        for per_row in per_table.iter("tr"):
+            for per_cell in per_row.iter("td"):
+                attri_value = style_normalizer(per_cell.get("style", ""))
+                data_table_lxml.append(attri_value)
+        tables_html.append(lxml.html.tostring(per_table, encoding="unicode"))
+    # All the tables are read by pandas in one call.
+    selected_tables = pd.read_html(StringIO("".join(tables_html))) if tables_html else []
+    
+    return data_table_lxml, selected_tables
+
+@instrumented()
+def page_scraper_selenium(page_url: str) -> list:
+    """Old way of scraping the results. Opens the webpage in a browser and gets the color of each cell.
+    Only used as a fallback, so Selenium is imported here and not needed otherwise.
+
+    Args:
+        page_url (str): URL of the webpage to be scraped.
+
+    Returns:
+        list: A list consisting of cells with color in it.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.edge.service import Service as EdgeService
+    from webdriver_manager.microsoft import EdgeChromiumDriverManager
+    import time
+    
+    driver = webdriver.Edge(service=EdgeService(EdgeChromiumDriverManager().install()))
+
+    driver.get(page_url)
+    counter_incrementer("webdriver_calls")
+    # Wait for 3 seconds to make sure that the webpage has been load properly.
+    time.sleep(3)
+
+    all_tables_selenium = driver.find_elements(by="xpath", value=TABLE_XPATH)
+    counter_incrementer("webdriver_calls")
+    # This function get color values from td tag of the HTML:
+    data_table_selenium = result_scraper_selenium(all_tables_selenium)
+
+    driver.quit()
+    
+    return data_table_selenium
+
+@instrumented()
 def result_scraper_selenium(table: list) -> list:
     """This function scrapes the cells with color in each raw table.
 
@@ -32,151 +174,86 @@ def result_scraper_selenium(table: list) -> list:
     Returns:
         list: A list consisting of cells with color in it.
     """
+    from selenium.webdriver.common.by import By
+    
     data_table_selenium = []
 
     for per_table in table:
         rows = per_table.find_elements(By.TAG_NAME, "tr")
+        counter_incrementer("webdriver_calls")
         for per_row in rows:
             cells = per_row.find_elements(By.TAG_NAME, "td")
+            # One call for the row and one per cell.
+            counter_incrementer("webdriver_calls", 1 + len(cells))
             for per_cell in cells:
                 attri_value = per_cell.get_attribute("style")
                 data_table_selenium.append(attri_value)
     
     return data_table_selenium
 
-def results_cleaner(table: list) -> pd.DataFrame:
+@instrumented()
+def results_cleaner(table: list, result_colors: dict[str, tuple] = RESULT_COLORS) -> pd.DataFrame:
     """This cleans the data of the scraped by selenium. Creates a list with proper results names in it.
        Don't know if I will be using all the columns that I've made here. But its better to make many
        different columns than going back here to update my code.
 
     Args:
         table (list): The table ouput by result_scraper_selenium
+        result_colors (dict[str, tuple], optional): Style of a cell -> result. Cells with any other
+        style are skipped. Defaults to RESULT_COLORS.
 
     Returns:
         pd.DataFrame: A dataframe -> cleaned data for the results.
     """
-    detailed_result_selenium = []
-    general_result_selenium = []
-    result_as_int_selenium = []
-    
-    for per_row in table:
-        if per_row == "background: rgb(171, 235, 198);":
-            detailed_result_selenium.append("1st Try Success")
-            general_result_selenium.append("Success")
-            result_as_int_selenium.append("1")
-            continue
-        if per_row == "background: rgb(174, 214, 241);":
-            detailed_result_selenium.append("2nd Try Success")
-            general_result_selenium.append("Success")
-            result_as_int_selenium.append("2")
-            continue
-        if per_row == "background: rgb(230, 176, 170);":
-            detailed_result_selenium.append("3rd Try Success")
-            general_result_selenium.append("Success")
-            result_as_int_selenium.append("3")
-            continue
-        if per_row == "background: rgb(210, 180, 222);":
-            detailed_result_selenium.append("Failed")
-            general_result_selenium.append("Failed")
-            result_as_int_selenium.append("0")
-            continue
+    results = [result_colors[per_row] for per_row in table if per_row in result_colors]
 
-    df_results = pd.DataFrame()
-    df_results["Detailed Result"] = detailed_result_selenium
-    df_results["General Result"] = general_result_selenium
-    df_results["Result as Number"] = result_as_int_selenium
+    df_results = pd.DataFrame(results, columns=["Detailed Result", "General Result", "Result as Number"])
     
-    return df_results
-
-def string_formatter(text: str) -> str:
-    """This removes the "Notes" / "HyperLink" in the text
+    return schema_applier(df_results)
 
-    Args:
-        text (str): Any text in the table. 
-
-    Returns:
-        str: Formatted string.
-    """
-    pattern = r"\[[a-z]{1,2}\]"
-    
-    handler = re.findall(pattern, text)
-    if handler:
-        text_list = list(text)
-        filtered_list = []
-        for per_char in text_list:
-            if per_char == "[":
-                break
-            else:
-                filtered_list.append(per_char)
-        filtered_text = "".join(filtered_list).strip()
-        return filtered_text
-    else:
-        return text
-
-def month_extractor(text: str) -> str:
-    """This function just retrieves the Date in the "Air Date" column. Might be useful
-    in the data visualization.
-
-    Args:
-        text (str): Text in the "Air Date" column.
-
-    Returns:
-        str: Month in String format. To be inserted in the new column named "Month".
-    """
-    text_list = list(text)
-    handler = []
-    
-    for per_char in text_list:
-        if per_char.isalpha():
-            handler.append(per_char)
-    
-    month = "".join(handler).strip()
-    return month
-
-def tables_scraper_pandas(table: list[pd.DataFrame]) -> pd.DataFrame:
+@instrumented()
+def tables_scraper_pandas(table: list[pd.DataFrame], first_year: int = FIRST_YEAR) -> pd.DataFrame:
     """After the pandas scraped the tables, this function will add two new columns
        that might be useful for the next step -> "Month" and "Year"
-       This function also formats the texts by calling to another functions.
+       This function also formats the texts. Works on the whole column at once instead of
+       calling string_formatter and month_extractor per row.
 
     Args:
         table (list[pd.DataFrame]): Dataframe consisting of tables scraped by Pandas.
+        first_year (int, optional): Year of the first table. Defaults to FIRST_YEAR.
 
     Returns:
         pd.DataFrame: Returns a semi-cleaned data. Will still output as RAW data.
     """
-    consolidated_tables_pandas = pd.DataFrame()
-    consolidated_tables_pandas["Year"] = [] # Adding two new column that might be useful for the next steps.
-    consolidated_tables_pandas["Month"] = []
-
-    year = 2018
-    # Iterating through each table:
-    for per_table in table:
-        cleaned_table = []
-        # Iterating through each row of the table. Applying the two functions above to this function.
-        for _, row in per_table.iterrows():
-            current_row = row.copy()
-            
-            current_episode = str(current_row["Ep."])
-            filtered_episode = string_formatter(current_episode)
-            current_row["Ep."] = filtered_episode
-            
-            current_date = str(current_row["Air Date"])
-            filtered_date = string_formatter(current_date)
-            current_row["Air Date"] = f"{filtered_date}, {year}"
-            
-            month = month_extractor(filtered_date)
-            current_row["Month"] = month
-            
-            current_row["Year"] = str(year)
-            
-            current_song = str(current_row["Song Questions[b] + Snack Time Game[c]"])
-            filtered_song = string_formatter(current_song)
-            current_row["Song Questions[b] + Snack Time Game[c]"] = filtered_song
-            
-            cleaned_table.append(current_row.to_dict())
-        year += 1
-        cleaned_df = pd.DataFrame(cleaned_table)
-        consolidated_tables_pandas = pd.concat([consolidated_tables_pandas, cleaned_df], axis=0)
+    columns_inorder = ["Episode #", "Song Questions + Snack Time Game", "Air Date", "Month", "Year"]
+    
+    if not table:
+        return pd.DataFrame(columns=columns_inorder)
+    # ----------------------------------------------------------------------------------------------------
+    # All the tables are concatenated once. Each table is tagged with its year first.
+    # ----------------------------------------------------------------------------------------------------
+    # The text columns are converted to string per table so that the numbers are written the same
+    # way as before, even if the dtype of a column is not the same for every table.
+    # ----------------------------------------------------------------------------------------------------
+    text_columns = {"Ep." : str, "Air Date" : str, "Song Questions[b] + Snack Time Game[c]" : str}
+    
+    consolidated_tables_pandas = pd.concat(
+        [per_table.astype(text_columns).assign(Year=year) for year, per_table in enumerate(table, start=first_year)],
+        axis=0, ignore_index=True
+        )
+    # Removing the "Notes" / "HyperLink" and parsing the dates. See text_normalization.py.
+    # ----------------------------------------------------------------------------------------------------
+    filtered_date = column_formatter(consolidated_tables_pandas["Air Date"])
+    
+    consolidated_tables_pandas["Ep."] = column_formatter(consolidated_tables_pandas["Ep."])
+    consolidated_tables_pandas["Air Date"] = filtered_date + ", " + consolidated_tables_pandas["Year"].astype(str)
+    # Only the month is kept from the parsed date. If it's not a real date yet ("TBA"), the letters are used
+    # as the month. The later steps parse the "Air Date" again when they need the date (see schema_applier).
+    months = month_name_extractor(air_date_parser(consolidated_tables_pandas["Air Date"]))
+    consolidated_tables_pandas["Month"] = months.fillna(month_column_extractor(filtered_date))
+    consolidated_tables_pandas["Song Questions[b] + Snack Time Game[c]"] = column_formatter(
+        consolidated_tables_pandas["Song Questions[b] + Snack Time Game[c]"]
+        )
 
     consolidated_tables_pandas = consolidated_tables_pandas.drop(
         ["Featured Market", "Dressing Theme Concept", "Guest(s)"], axis=1
@@ -184,52 +261,124 @@ def tables_scraper_pandas(table: list[pd.DataFrame]) -> pd.DataFrame:
             columns={"Ep." : "Episode #", "Song Questions[b] + Snack Time Game[c]" : "Song Questions + Snack Time Game"}
             )
 
-    columns_inorder = ["Episode #", "Song Questions + Snack Time Game", "Air Date", "Month", "Year"]
     df_arranged_columns = consolidated_tables_pandas[columns_inorder].copy()
     return df_arranged_columns
 
 # ----------------------------------------------------------------------------------------------------
 # Main function:
 # ----------------------------------------------------------------------------------------------------
-def main() -> None:
-    """
-    Main function of the file. This uses both selenium and pandas to scrape the results and tables from
-    the webpage respectively. After that, another function will clean the data gathered by selenium. For
-    the data gathered by the pandas, it will be semi-cleaned only. Will only be adding some new columns
-    -> "Month" and "Year" that might be useful for the next step, and remove some "Notes" / "HyperLink" 
-    in the text for each cell of the table.
+@instrumented("gather")
+def main(backend: str = "lxml",
+         html_path: str | None = None,
+         use_cache: bool = True,
+         offline: bool = False,
+         revision: str | None = None,
+         incremental: bool = False,
+         page_url: str = PAGE_URL,
+         page_specs: list[dict] | str | None = None) -> None:
     """
-    # ----------------------------------------------------------------------------------------------------
-    # Scraping Results using Selenium.
-    # ----------------------------------------------------------------------------------------------------
-    driver = webdriver.Edge(service=EdgeService(EdgeChromiumDriverManager().install()))
-
-    page_url = "https://en.wikipedia.org/wiki/List_of_DoReMi_Market_episodes"
-
-    driver.get(page_url)
-    # Wait for 3 seconds to make sure that the webpage has been load properly.
-    time.sleep(3)
-
-    all_tables_selenium = driver.find_elements(by="xpath", value="//div[contains(@class, \"hidden-content mw-collapsible-content\")]")
-    # This function get color values from td tag of the HTML:
-    data_table_selenium = result_scraper_selenium(all_tables_selenium)
-
-    driver.quit()
-
-    # This function cleans the raw result gathered using Selenium.
-    df_results = results_cleaner(data_table_selenium)
-    df_results.to_csv("../data/cleaned/cleaned_result.csv", index=False)
+    Main function of the file. The webpage is downloaded once and parsed with lxml to get both the results
+    (colored cells) and the tables (texts). The old way using Selenium is still available as a fallback.
+    After that, another function will clean the results. For the tables, it will be semi-cleaned only. 
+    Will only be adding some new columns -> "Month" and "Year" that might be useful for the next step, 
+    and remove some "Notes" / "HyperLink" in the text for each cell of the table.
 
+    Args:
+        backend (str, optional): "lxml" or "selenium". Defaults to "lxml".
+        html_path (str | None, optional): Local HTML file to be used instead of downloading the webpage.
+        Only for the "lxml" backend. Defaults to None.
+        use_cache (bool, optional): Use the local page cache (see page_cache.py). Defaults to True.
+        offline (bool, optional): Replay the webpage from the cache only. Defaults to False.
+        revision (str | None, optional): Pinned snapshot in the cache (revision ID, ETag or sha256). 
+        Defaults to None.
+        incremental (bool, optional): Only scrape the last episode in the merged data and the episodes after
+        it, and replace them in the existing CSV files. Defaults to False.
+        page_url (str, optional): URL of the webpage. Can be a local copy (see fixture_server.py).
+        Defaults to PAGE_URL.
+        page_specs (list[dict] | str | None, optional): Many pages to be gathered at the same time instead
+        of the one webpage, or the path of a JSON file with them. See page_gathering.py. Defaults to None.
+    """
+    if page_specs is not None:
+        if backend != "lxml" or incremental:
+            raise ValueError("Page specs only work with the \"lxml\" backend and without the incremental mode.")
+        # Imported here since page_gathering imports this file.
+        from page_gathering import main as pages_gathering, page_specs_loader
+        
+        pages_gathering(page_specs_loader(page_specs) if isinstance(page_specs, str) else page_specs)
+        return
+    
+    high_water_mark = high_water_mark_reader(data_path("merged/data_merged.csv")) if incremental else None
+    # Only the tables starting from the year of the last episode are needed in incremental mode.
+    first_table = 0 if high_water_mark is None else high_water_mark["Year"] - FIRST_YEAR
+    
+    if backend == "lxml":
+        # ----------------------------------------------------------------------------------------------------
+        # Scraping Results and Tables in one pass using lxml.
+        # ----------------------------------------------------------------------------------------------------
+        if html_path is not None:
+            with open(html_path, encoding="utf-8") as html_file:
+                html = html_file.read()
+        elif use_cache or offline or revision is not None:
+            html = cached_page_fetcher(page_url, offline=offline, revision=revision)
+        else:
+            html = page_source_fetcher(page_url)
+        
+        data_table_lxml, selected_tables = result_scraper_lxml(html, first_table)
+        
+        # This function cleans the raw result gathered using lxml.
+        df_results = results_cleaner(data_table_lxml)
+    elif backend == "selenium":
+        # ----------------------------------------------------------------------------------------------------
+        # Scraping Results using Selenium.
+        # ----------------------------------------------------------------------------------------------------
+        data_table_selenium = page_scraper_selenium(page_url)
+
+        # This function cleans the raw result gathered using Selenium.
+        df_results = results_cleaner(data_table_selenium)
+
+        # ----------------------------------------------------------------------------------------------------
+        # Gathering the tables and the texts using Pandas.
+        # ----------------------------------------------------------------------------------------------------
+        counter_incrementer("network_calls")
+        all_tables_pandas = pd.read_html(page_url)
+        # Throwing the first one since its a table that is not needed.
+        selected_tables = all_tables_pandas[1:].copy()
+    else:
+        raise ValueError(f"Unknown backend: {backend}. Use \"lxml\" or \"selenium\".")
+
+    if high_water_mark is None:
+        df_tables_pandas = tables_scraper_pandas(selected_tables)
+        
+        dataframe_writer(df_results, data_path("cleaned/cleaned_result.csv"))
+        dataframe_writer(df_tables_pandas, data_path("raw/raw_tables.csv"))
+        return
     # ----------------------------------------------------------------------------------------------------
-    # Gathering the tables and the texts using Pandas.
+    # Incremental mode. Selenium always scrapes all the tables, so the old tables are thrown away here.
+    # The last episode in the merged data can still have changed ("TBA" rows filled in, rows added), so it
+    # is scraped again with the episodes after it. Only the results before it are skipped, then its rows
+    # and the new ones replace the end of the existing CSV files (see incremental.py).
     # ----------------------------------------------------------------------------------------------------
-    all_tables_pandas = pd.read_html(page_url)
-    # Throwing the first one since its a table that is not needed.
-    selected_tables = all_tables_pandas[1:].copy()
-
-    df_tables_pandas = tables_scraper_pandas(selected_tables)
-
-    df_tables_pandas.to_csv("../data/raw/raw_tables.csv", index=False)
+    kept_results = high_water_mark["Rows"] - high_water_mark["Rows in last episode"]
+    if backend == "selenium":
+        selected_tables = selected_tables[first_table:]
+        df_results = df_results.iloc[kept_results:]
+    else:
+        df_results = df_results.iloc[high_water_mark["Rows in last year"] - high_water_mark["Rows in last episode"]:]
+    
+    df_tables_pandas = tables_scraper_pandas(selected_tables, high_water_mark["Year"])
+    df_new_tables = df_tables_pandas[from_mark_filter(df_tables_pandas, high_water_mark)]
+    songs_results_checker(
+        int(songs_filter(df_new_tables["Song Questions + Snack Time Game"]).sum()), len(df_results), high_water_mark
+        )
+    
+    dataframes_writer({
+        data_path("raw/raw_tables.csv") : dataframe_appender(
+            data_path("raw/raw_tables.csv"), df_new_tables, lambda df: ~from_mark_filter(df, high_water_mark)
+            ),
+        data_path("cleaned/cleaned_result.csv") : dataframe_appender(
+            data_path("cleaned/cleaned_result.csv"), df_results, kept_results
+            )
+    })
 
 if __name__ == "__main__":
     main()
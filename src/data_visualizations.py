@@ -1,12 +1,38 @@
 # ----------------------------------------------------------------------------------------------------
 # Imports
 # ----------------------------------------------------------------------------------------------------
-from custom_plot_settings import custom_plot_settings
+from custom_plot_settings import SAVEFIG_SETTINGS, custom_plot_settings
+from storage import dataframe_reader
+from schema import ordered_result_names, schema_applier
+from settings import data_path, figures_path
+from aggregates import (result_cube_builder, cube_years, cube_months, months_per_year, years_per_month,
+                        results_per_year, results_total)
+from momentum import momentum_builder
+from results_sidecar import sidecar_frame_loader
+from figure_rendering import batch_renderer
+from profiling import instrumented
 from  datetime import datetime
+import os
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib as mpl
 
+# Most points drawn by the line plots. Longer data (synthetic archives) only draws every n-th point.
+MAX_LINE_POINTS = 5000
+# The two series of bar plots -> one plot per year (its months) and one plot per month (its years).
+# See series_figure_builder.
+SERIES_SETTINGS = {
+    "months" : {"items" : cube_years, "slicer" : months_per_year, "xlabel" : "Month", "figure" : "Plot-Months",
+                "title" : "Consolidated results per Month\n(Year: {})"},
+    "years" : {"items" : cube_months, "slicer" : years_per_month, "xlabel" : "Year", "figure" : "Plot-Years",
+               "title" : "Consolidated results per Year\n(Month: {})"}
+}
+# Plots per row of the small multiples grid. See plot_series_grid.
+GRID_COLUMNS = 4
+# Width of the bars. Same as the bar plots of pandas.
+BAR_WIDTH = 0.5
+
 # ----------------------------------------------------------------------------------------------------
 # Functions that are used by the main function.
 # ----------------------------------------------------------------------------------------------------
@@ -21,219 +47,307 @@ def datetime_formatter() -> str:
     
     return formatted_datetime
 
-def result_names_ordered_func(result_names: list) -> list[str]:
-    """Makes the current list of result names to be in chronological order.
+def figure_finisher(save_path: str | None) -> None:
+    """Saves the current figure if a path is given. Otherwise, shows it.
 
     Args:
-        result_names (list): Raw list of results names. Might be unordered in some scenarios.
-
-    Returns:
-        list[str]: Chronological order of result names.
+        save_path (str | None): Where to save the figure. None -> plt.show().
     """
+    if save_path is None:
+        plt.show()
+        return
     
-    ordered_result_names: list = ["1st Try Success","2nd Try Success", "3rd Try Success", "Failed"]
-    
-    result_names_ordered: list = []
-    
-    for result in ordered_result_names:
-        if result in result_names:
-            result_names_ordered.append(result)
-    
-    return result_names_ordered
+    plt.savefig(save_path, **SAVEFIG_SETTINGS)
+    plt.close("all")
 
-def plot_months_per_year(dataframe: pd.DataFrame) -> None:
-    """Accepts a pandas dataframe and make plots of the months per year.
+def plot_months_of_year(cube: pd.DataFrame, per_year: int, save_path: str | None = None) -> None:
+    """Makes the plot of the months of one year.
 
     Args:
-        dataframe (pd.DataFrame): Data feed here must be the cleaned and merged data.
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        per_year (int): The year to be plotted.
+        save_path (str | None, optional): Where to save the figure. Defaults to None -> shows it.
     """
-    
-    year_list = list(dataframe["Year"].unique())
-    
-    for per_year in year_list:
-        # > Current datetime to be used for naming the saved plots.
-        current_datetime = datetime_formatter()
-        # Filtered dataframe base on the current year in the list.
-        df_year = dataframe[dataframe["Year"] == per_year].copy()
-        # A dataframe that will be use to handle the data of the inner for loop
-        handler = pd.DataFrame()
-        
-        month_list = list(df_year["Month"].unique())
-        # Just some rcParams setting to make the text bigger or smaller depending on how many months there is available.
-        if len(month_list) > 6:
-            mpl.rcParams["font.size"] = 14
-        else:
-            mpl.rcParams["font.size"] = 18
-        # ----------------------------------------------------------------------------------------------------
-        # This inner for loop is used to make the grouping of months in the filtered dataframe in order.
-        # By default, if you used "groupby" to the whole dataframe, it will jumble the order of the months. 
-        # This for loop ensures that the order the months is still in order while grouping it.
-        # ----------------------------------------------------------------------------------------------------
-        for per_month in month_list:
-            df_months_inorder = df_year[df_year["Month"] == per_month]
-            
-            per_month_result = df_months_inorder.groupby(["Month", "Detailed Result"]).size().unstack()
-            
-            handler = pd.concat([handler, per_month_result], axis=0)
-        # ----------------------------------------------------------------------------------------------------
-        # > Reording the columns of the filtered -> grouped dataframe.
-        # > Filling the NaN with "0" so that I could convert the Dtype to "int". This will prevent the values
-        # to have decimals.
-        # ----------------------------------------------------------------------------------------------------
-        result_names = list(df_year["Detailed Result"].unique())
-        result_names_ordered = result_names_ordered_func(result_names)
+    # ----------------------------------------------------------------------------------------------------
+    # Results per month of the year. The months are already in order and the result names that didn't
+    # happen in this year are already removed. See aggregates.py.
+    # ----------------------------------------------------------------------------------------------------
+    df_results_per_month = months_per_year(cube, per_year)
+    result_names_ordered = list(df_results_per_month.columns)
+    # Just some rcParams setting to make the text bigger or smaller depending on how many months there is available.
+    if len(df_results_per_month) > 6:
+        mpl.rcParams["font.size"] = 14
+    else:
+        mpl.rcParams["font.size"] = 18
+    # ----------------------------------------------------------------------------------------------------
+    # > Applying the custom color settings based on how many Result names there is.
+    # > Data plotting and other settings.
+    # ----------------------------------------------------------------------------------------------------
+    custom_colors = custom_plot_settings(result_names_ordered)
+    ax = df_results_per_month.plot(kind="bar", stacked=True, colormap=custom_colors, rot=45)
+    ax.grid(axis="y")
+    plt.xlabel("Month", fontsize=18)
+    plt.ylabel("Number of Occurrences", fontsize=18)
+    plt.title(f"Consolidated results per Month\n(Year: {per_year})", fontsize=25)
+    plt.legend(title="Result:", fontsize=12, bbox_to_anchor=(1, 1))
+    # ----------------------------------------------------------------------------------------------------
+    # This for loop gets the Results for each month, checks the value if its greater than 0. If it is, 
+    # then it will be placed to the bar - centered. If its 0 or lower, then it will be just an empty string.
+    # ----------------------------------------------------------------------------------------------------
+    for c in ax.containers:
+        labels = [int(v.get_height()) if v.get_height() > 0 else "" for v in c]
         
-        df_results_per_month = handler[result_names_ordered].copy()
-        df_results_per_month.fillna(0, inplace=True)
-        df_results_per_month[result_names_ordered] = df_results_per_month[result_names_ordered].astype("int")
-        # ----------------------------------------------------------------------------------------------------
-        # > Applying the custom color settings based on how many Result names there is.
-        # > Data plotting and other settings.
-        # ----------------------------------------------------------------------------------------------------
-        custom_colors = custom_plot_settings(result_names_ordered)
-        ax = df_results_per_month.plot(kind="bar", stacked=True, colormap=custom_colors, rot=45)
-        ax.grid(axis="y")
-        plt.xlabel("Month", fontsize=18)
-        plt.ylabel("Number of Occurrences", fontsize=18)
-        plt.title(f"Consolidated results per Month\n(Year: {per_year})", fontsize=25)
-        plt.legend(title="Result:", fontsize=12, bbox_to_anchor=(1, 1))
-        # ----------------------------------------------------------------------------------------------------
-        # This for loop gets the Results for each month, checks the value if its greater than 0. If it is, 
-        # then it will be placed to the bar - centered. If its 0 or lower, then it will be just an empty string.
-        # ----------------------------------------------------------------------------------------------------
-        for c in ax.containers:
-            labels = [int(v.get_height()) if v.get_height() > 0 else "" for v in c]
-            
-            ax.bar_label(c, labels=labels, label_type="center") # type: ignore
-        # ----------------------------------------------------------------------------------------------------
-        # Saves and show the plots.
-        # ----------------------------------------------------------------------------------------------------
-        # plt.savefig(f"../figures/Plot-Months-{per_year}.{current_datetime}.jpg",
-        #             dpi=300,
-        #             bbox_inches ="tight",
-        #             pad_inches=0.5)
-        plt.show()
+        ax.bar_label(c, labels=labels, label_type="center") # type: ignore
+    # Saves or show the plot.
+    figure_finisher(save_path)
 
-def plot_years_per_month(dataframe: pd.DataFrame) -> None:
-    """Accepts a pandas dataframe and make plots of the years per month.
+def plot_months_per_year(cube: pd.DataFrame, save_dir: str | None = None, grid: bool = False) -> None:
+    """Accepts the result cube and make plots of the months per year.
 
     Args:
-        dataframe (pd.DataFrame): Data feed here must be the cleaned and merged data.
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        save_dir (str | None, optional): Folder where the figures are saved, all with the same figure (see
+        plot_series). Defaults to None -> shows them one by one.
+        grid (bool, optional): All the years in one image instead (see plot_series_grid). Defaults to False.
     """
-    
-    # ----------------------------------------------------------------------------------------------------
-    # > Getting the unique "Month" values (No repetition) to be loop and used as a filtering method to the 
-    # dataframe.
-    # ----------------------------------------------------------------------------------------------------
-    month_list = ["January", "February", "March", "April", "May", "June", "July",
-                "August", "September", "October", "November", "December"]
-
-    for per_month in month_list:
-        # > Current datetime to be used for naming the saved plots.
-        current_datetime = datetime_formatter()
-        # Filtered dataframe base on the current month in the list.
-        df_current_month = dataframe[dataframe["Month"] == per_month]
-        # A dataframe that will be use to handle the data of the inner for loop
-        handler = pd.DataFrame()
-        
-        year_list = list(df_current_month["Year"].unique())
-        # ----------------------------------------------------------------------------------------------------
-        # This inner for loop is used to make the grouping of years in the filtered dataframe in order.
-        # By default, if you used "groupby" to the whole dataframe, it will jumble the order of the years. 
-        # This for loop ensures that the order the years is still in order while grouping it.
-        # ----------------------------------------------------------------------------------------------------
-        for per_year in year_list:
-            df_year_inorder = df_current_month[df_current_month["Year"] == per_year]
-            
-            per_year_result = df_year_inorder.groupby(["Year", "Detailed Result"]).size().unstack()
-            
-            handler = pd.concat([handler, per_year_result], axis=0)
-        # ----------------------------------------------------------------------------------------------------
-        # > Reording the columns of the filtered -> grouped dataframe.
-        # > Filling the NaN with "0" so that I could convert the Dtype to "int". This will prevent the values
-        # to have decimals.
-        # ----------------------------------------------------------------------------------------------------
-        result_names = list(df_current_month["Detailed Result"].unique())
-        result_names_ordered = result_names_ordered_func(result_names)
-        
-        df_results_per_year = handler[result_names_ordered].copy()
-        df_results_per_year.fillna(0, inplace=True)
-        df_results_per_year[result_names_ordered] = df_results_per_year[result_names_ordered].astype("int")
-        # ----------------------------------------------------------------------------------------------------
-        # Data plotting and settings.
-        # ----------------------------------------------------------------------------------------------------
-        custom_colors = custom_plot_settings(result_names_ordered)
-        ax = df_results_per_year.plot(kind="bar", stacked=True, colormap=custom_colors, rot=45)
-        ax.grid(axis="y")
-        plt.xlabel("Year", fontsize=18)
-        plt.ylabel("Number of Occurrences", fontsize=18)
-        plt.title(f"Consolidated results per Year\n(Month: {per_month})", fontsize=25)
-        plt.legend(title="Result:", fontsize=12, bbox_to_anchor=(1, 1))
-        # ----------------------------------------------------------------------------------------------------
-        # This for loop gets the Results for each month, checks the value if its greater than 0. If it is, 
-        # then it will be placed to the bar - centered. If its 0 or lower, then it will be just an empty string.
-        # ----------------------------------------------------------------------------------------------------
-        for c in ax.containers:
-            labels = [int(v.get_height()) if v.get_height() > 0 else "" for v in c]
-            
-            ax.bar_label(c, labels=labels, label_type="center") # type: ignore
-        # ----------------------------------------------------------------------------------------------------
-        # Saves and show the plots.
-        # ----------------------------------------------------------------------------------------------------
-        # plt.savefig(f"../figures/Plot-Years-{per_month}.{current_datetime}.jpg",
-        #             dpi=300,
-        #             bbox_inches ="tight",
-        #             pad_inches=0.5)
-        plt.show()
+    if grid:
+        plot_series_grid(cube, "months", save_dir and os.path.join(save_dir, f"Plot-Months-Grid.{datetime_formatter()}.jpg"))
+    elif save_dir is not None:
+        plot_series(cube, "months", {per_year : os.path.join(save_dir, f"Plot-Months-{per_year}.{datetime_formatter()}.jpg")
+                                     for per_year in cube_years(cube)})
+    else:
+        for per_year in cube_years(cube):
+            plot_months_of_year(cube, per_year)
 
-def plot_comparison_per_consolidated_year(dataframe: pd.DataFrame) -> None:
-    """Accepts a pandas dataframe and make plots of the years.
+def plot_years_of_month(cube: pd.DataFrame, per_month: str, save_path: str | None = None) -> None:
+    """Makes the plot of the years of one month.
 
     Args:
-        dataframe (pd.DataFrame): Data feed here must be the cleaned and merged data.
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        per_month (str): The month to be plotted.
+        save_path (str | None, optional): Where to save the figure. Defaults to None -> shows it.
     """
-    
-    # Current datetime to be used for naming the saved plots.
-    current_datetime = datetime_formatter()
     # ----------------------------------------------------------------------------------------------------
-    # This part of the code checks if the current iteration of the year has 12 months of data in it. If it
-    # has, then it will be concatenated to the df_year which holds all the years with only 12 months in it.
+    # Results per year of the month. The years are already in order.
     # ----------------------------------------------------------------------------------------------------
-    year_list = list(dataframe["Year"].unique())
-    df_year = pd.DataFrame()
-
-    for year in year_list:
-        df_current_year = dataframe[dataframe["Year"] == year]
-        
-        month_list = list(df_current_year["Month"].unique())
-        
-        if len(month_list) == 12:
-            df_year = pd.concat([df_year, df_current_year], axis=0)
+    df_results_per_year = years_per_month(cube, per_month)
+    result_names_ordered = list(df_results_per_year.columns)
     # ----------------------------------------------------------------------------------------------------
-    # This inner for loop is used to make the grouping of months in the filtered dataframe in order.
-    # By default, if you used "groupby" to the whole dataframe, it will jumble the order of the months. 
-    # This for loop ensures that the order the months is still in order while grouping it.
+    # Data plotting and settings.
     # ----------------------------------------------------------------------------------------------------
-    handler = pd.DataFrame()
-    filtered_year_list = list(df_year["Year"].unique())
-
-    for year in filtered_year_list:
-        df_year_inorder = df_year[df_year["Year"] == year]
-        
-        per_year_result = df_year_inorder.groupby(["Year", "Detailed Result"]).size().unstack()
+    custom_colors = custom_plot_settings(result_names_ordered)
+    ax = df_results_per_year.plot(kind="bar", stacked=True, colormap=custom_colors, rot=45)
+    ax.grid(axis="y")
+    plt.xlabel("Year", fontsize=18)
+    plt.ylabel("Number of Occurrences", fontsize=18)
+    plt.title(f"Consolidated results per Year\n(Month: {per_month})", fontsize=25)
+    plt.legend(title="Result:", fontsize=12, bbox_to_anchor=(1, 1))
+    # ----------------------------------------------------------------------------------------------------
+    # This for loop gets the Results for each month, checks the value if its greater than 0. If it is, 
+    # then it will be placed to the bar - centered. If its 0 or lower, then it will be just an empty string.
+    # ----------------------------------------------------------------------------------------------------
+    for c in ax.containers:
+        labels = [int(v.get_height()) if v.get_height() > 0 else "" for v in c]
         
-        handler = pd.concat([handler, per_year_result], axis=0)
+        ax.bar_label(c, labels=labels, label_type="center") # type: ignore
+    # Saves or show the plot.
+    figure_finisher(save_path)
+
+def plot_years_per_month(cube: pd.DataFrame, save_dir: str | None = None, grid: bool = False) -> None:
+    """Accepts the result cube and make plots of the years per month.
+
+    Args:
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        save_dir (str | None, optional): Folder where the figures are saved, all with the same figure (see
+        plot_series). Defaults to None -> shows them one by one.
+        grid (bool, optional): All the months in one image instead (see plot_series_grid). Defaults to False.
+    """
+    if grid:
+        plot_series_grid(cube, "years", save_dir and os.path.join(save_dir, f"Plot-Years-Grid.{datetime_formatter()}.jpg"))
+    elif save_dir is not None:
+        plot_series(cube, "years", {per_month : os.path.join(save_dir, f"Plot-Years-{per_month}.{datetime_formatter()}.jpg")
+                                    for per_month in cube_months(cube)})
+    else:
+        for per_month in cube_months(cube):
+            plot_years_of_month(cube, per_month)
+
+# ----------------------------------------------------------------------------------------------------
+# Series renderer. The plots of plot_months_per_year / plot_years_per_month all look the same, only the
+# bars, the numbers on them, the x labels and the title change. So the figure, the axes, the legend and
+# the style are made once, with enough bars for the longest slice, and each plot only changes those.
+# ----------------------------------------------------------------------------------------------------
+def series_slices(cube: pd.DataFrame, series: str) -> dict:
+    """The counts of every plot of a series.
+
+    Args:
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        series (str): "months" (per year) or "years" (per month). See SERIES_SETTINGS.
+
+    Returns:
+        dict: Year / month -> its counts. Same as aggregates.months_per_year / years_per_month.
+    """
+    settings = SERIES_SETTINGS[series]
+
+    return {item : settings["slicer"](cube, item) for item in settings["items"](cube)}
+
+def stacked_bars_drawer(ax, counts: pd.DataFrame, result_names: list[str], custom_colors,
+                        bars: dict | None = None, short_labels: bool = False) -> list:
+    """Draws the stacked bars of one plot of a series with their numbers in the middle.
+
+    Args:
+        ax (matplotlib.axes.Axes): Where to draw.
+        counts (pd.DataFrame): Counts of the plot. Index -> x labels. Columns -> result names.
+        result_names (list[str]): Result names of the whole series, in order.
+        custom_colors (matplotlib.colors.ListedColormap): Output of custom_plot_settings(result_names).
+        bars (dict | None, optional): Result name -> bars already made by series_figure_builder. Their
+        heights are changed and the extra ones are hidden. Defaults to None -> new bars.
+        short_labels (bool, optional): Only the first 3 letters of the x labels -> "Jan". Defaults to False.
+
+    Returns:
+        list: The numbers on the bars, so that they can be removed for the next plot.
+    """
+    positions = np.arange(len(counts))
+    bottoms = np.zeros(len(counts))
+    bar_labels = []
+
+    for color, result_name in enumerate(result_names):
+        heights = counts[result_name].to_numpy() if result_name in counts.columns else np.zeros(len(counts))
+
+        if bars is None:
+            container = ax.bar(positions, heights, BAR_WIDTH, bottom=bottoms, color=custom_colors(color),
+                               label=result_name)
+            # Only 0 stops the y margin. The bottom of an empty bar on top of a stack would cut the stack.
+            for bar in container:
+                bar.sticky_edges.y[:] = [0]
+        else:
+            container = bars[result_name]
+            for position, bar in enumerate(container):
+                bar.set_visible(position < len(counts))
+                if position < len(counts):
+                    bar.set_height(heights[position])
+                    bar.set_y(bottoms[position])
+
+        # Same place as bar_label(label_type="center"), but only for the bars that are not 0.
+        for position in np.flatnonzero(heights > 0):
+            bar_labels.append(ax.text(position, bottoms[position] + heights[position] / 2, int(heights[position]),
+                                      ha="center", va="center"))
+        bottoms += heights
+
+    ax.set_xticks(positions, [str(item)[:3] if short_labels else str(item) for item in counts.index], rotation=45)
+    ax.set_xlim(-BAR_WIDTH, len(counts) - 1 + BAR_WIDTH)
+
+    return bar_labels
+
+def series_figure_builder(cube: pd.DataFrame, series: str) -> dict:
+    """Makes the figure of a series once -> axes, bars, legend and style. See series_slice_drawer.
+
+    Args:
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        series (str): "months" (per year) or "years" (per month). See SERIES_SETTINGS.
+
+    Returns:
+        dict: "figure", "ax", "bars" (result name -> bars), "bar_labels", "result_names", "custom_colors"
+        and "series".
+    """
+    settings = SERIES_SETTINGS[series]
+    slices = series_slices(cube, series)
+    # The result names of all the plots, so that the colors and the legend are the same on each of them.
+    result_names = ordered_result_names([name for counts in slices.values() for name in counts.columns])
+    longest = max((len(counts) for counts in slices.values()), default=0)
+
+    custom_colors = custom_plot_settings(result_names)
+    figure, ax = plt.subplots()
+    positions = np.arange(longest)
+    bars = {result_name : ax.bar(positions, np.zeros(longest), BAR_WIDTH, color=custom_colors(color), label=result_name)
+            for color, result_name in enumerate(result_names)}
+    ax.grid(axis="y")
+    ax.set_xlabel(settings["xlabel"], fontsize=18)
+    ax.set_ylabel("Number of Occurrences", fontsize=18)
+    ax.legend(title="Result:", fontsize=12, bbox_to_anchor=(1, 1))
+
+    return {"figure" : figure, "ax" : ax, "bars" : bars, "bar_labels" : [], "result_names" : result_names,
+            "series" : series, "custom_colors" : custom_colors}
+
+def series_slice_drawer(series_figure: dict, cube: pd.DataFrame, item: int | str) -> None:
+    """Changes the figure of a series to the plot of one year / month. Only the bars, their numbers, the x
+    labels, the y limit and the title are changed.
+
+    Args:
+        series_figure (dict): Output of series_figure_builder.
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        item (int | str): The year ("months" series) or the month ("years" series).
+    """
+    settings = SERIES_SETTINGS[series_figure["series"]]
+    ax = series_figure["ax"]
+
+    for bar_label in series_figure["bar_labels"]:
+        bar_label.remove()
+    series_figure["bar_labels"] = stacked_bars_drawer(ax, settings["slicer"](cube, item), series_figure["result_names"],
+                                                      series_figure["custom_colors"], series_figure["bars"])
+    ax.relim(visible_only=True)
+    ax.autoscale_view(scalex=False)
+    ax.set_title(settings["title"].format(item), fontsize=25)
+
+def plot_series(cube: pd.DataFrame, series: str, save_paths: dict) -> None:
+    """Saves the plots of a series with one figure. See series_figure_builder.
+
+    Args:
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        series (str): "months" (per year) or "years" (per month). See SERIES_SETTINGS.
+        save_paths (dict): Year / month -> where to save its plot.
+    """
+    series_figure = series_figure_builder(cube, series)
+
+    for item, save_path in save_paths.items():
+        series_slice_drawer(series_figure, cube, item)
+        series_figure["figure"].savefig(save_path, **SAVEFIG_SETTINGS)
+
+    plt.close(series_figure["figure"])
+
+def plot_series_grid(cube: pd.DataFrame, series: str, save_path: str | None = None) -> None:
+    """All the plots of a series in one image (small multiples), with one legend.
+
+    Args:
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        series (str): "months" (per year) or "years" (per month). See SERIES_SETTINGS.
+        save_path (str | None, optional): Where to save the figure. Defaults to None -> shows it.
+    """
+    settings = SERIES_SETTINGS[series]
+    slices = series_slices(cube, series)
+    result_names = ordered_result_names([name for counts in slices.values() for name in counts.columns])
+    rows = max(1, -(-len(slices) // GRID_COLUMNS))
+
+    custom_colors = custom_plot_settings(result_names)
+    figure, axes = plt.subplots(rows, GRID_COLUMNS, figsize=(GRID_COLUMNS * 5, rows * 4.5), squeeze=False)
+    for ax, (item, counts) in zip(axes.flat, slices.items()):
+        stacked_bars_drawer(ax, counts, result_names, custom_colors, short_labels=series == "months")
+        ax.grid(axis="y")
+        ax.set_title(str(item), fontsize=18)
+    for ax in axes.flat[len(slices):]:
+        ax.set_visible(False)
+
+    figure.supxlabel(settings["xlabel"], fontsize=18)
+    figure.supylabel("Number of Occurrences", fontsize=18)
+    figure.suptitle(settings["title"].split("\n")[0], fontsize=25)
+    figure.legend(*axes.flat[0].get_legend_handles_labels(), title="Result:", fontsize=12,
+                  loc="upper left", bbox_to_anchor=(1, 0.95))
+    figure.tight_layout()
+    # Saves or show the plot.
+    figure_finisher(save_path)
+
+def plot_comparison_per_consolidated_year(cube: pd.DataFrame, save_path: str | None = None) -> None:
+    """Accepts the result cube and make plots of the years.
+
+    Args:
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        save_path (str | None, optional): Where to save the figure. Defaults to None -> shows it.
+    """
     # ----------------------------------------------------------------------------------------------------
-    # > Reording the columns of the filtered -> grouped dataframe.
-    # > Filling the NaN with "0" so that I could convert the Dtype to "int". This will prevent the values
-    # to have decimals.
+    # Only the years that has 12 months of data in it are used.
     # ----------------------------------------------------------------------------------------------------
-    result_names = list(df_year["Detailed Result"].unique())
-    result_names_ordered = result_names_ordered_func(result_names)
-    
-    df_results_per_year = handler[result_names_ordered].copy()
-    df_results_per_year.fillna(0, inplace=True)
-    df_results_per_year[result_names_ordered] = df_results_per_year[result_names_ordered].astype("int")
+    df_results_per_year = results_per_year(cube, full_years_only=True)
+    result_names_ordered = list(df_results_per_year.columns)
+    filtered_year_list = list(df_results_per_year.index)
     # ----------------------------------------------------------------------------------------------------
     # Data plotting and settings.
     # ----------------------------------------------------------------------------------------------------
@@ -251,100 +365,149 @@ def plot_comparison_per_consolidated_year(dataframe: pd.DataFrame) -> None:
         labels = [int(v.get_height()) for v in c]
         
         ax.bar_label(c, labels=labels, label_type="center") # type: ignore
-    # ----------------------------------------------------------------------------------------------------
-    # Saves and show the plot.
-    # ----------------------------------------------------------------------------------------------------
-    # plt.savefig(f"../figures/Plot-Consolidated-{filtered_year_list[0]}-to-{filtered_year_list[-1]}.{current_datetime}.jpg",
-    #             dpi=300,
-    #             bbox_inches ="tight",
-    #             pad_inches=0.5)
-    plt.show()
+    # Saves or show the plot.
+    figure_finisher(save_path)
 
-def plot_pie_consolidated_result_year(dataframe: pd.DataFrame) -> None:
+def plot_pie_consolidated_result_year(cube: pd.DataFrame, save_path: str | None = None) -> None:
     """
-    Make a pie chart for the "Detailed Result" column of the dataframe.
+    Make a pie chart for the "Detailed Result" of the whole data.
 
     Args:
-        dataframe (pd.DataFrame): Data feed here must be the cleaned and merged data.
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        save_path (str | None, optional): Where to save the figure. Defaults to None -> shows it.
     """
-    # Current datetime to be used for naming the saved plots.
-    current_datetime = datetime_formatter()
-    # Making a copy of the dataframe with the column "Year" and "Detailed Result" only in it.
-    df_year = dataframe[["Year", "Detailed Result"]].copy()
-    # ----------------------------------------------------------------------------------------------------
-    # Looping through each row and count the occurence of each result name
-    # ----------------------------------------------------------------------------------------------------
-    first_count: int = 0
-    second_count: int = 0
-    third_count: int = 0
-    failed_count: int = 0
-    
-    for _, row in df_year.iterrows():
-        current_row = row.copy()
-        
-        current_row_result = current_row["Detailed Result"]
-        
-        if current_row_result == "1st Try Success":
-            first_count += 1
-            continue
-        
-        if current_row_result == "2nd Try Success":
-            second_count += 1
-            continue
-        
-        if current_row_result == "3rd Try Success":
-            third_count += 1
-            continue
-        
-        if current_row_result == "Failed":
-            failed_count += 1
-            continue
-    # Generating a ordered Result names in the case it is not.
-    result_names = list(df_year["Detailed Result"].unique())
-    result_names_ordered = result_names_ordered_func(result_names)
     # ----------------------------------------------------------------------------------------------------
     # Making a dataframe base of the ordered Result names and the count.
     # ----------------------------------------------------------------------------------------------------
-    df_sum_result = pd.DataFrame()
-    df_sum_result["Result"] = result_names_ordered
-    df_sum_result["Count"] = [first_count, second_count, third_count, failed_count]
-    # Setting the index to the "Result" column since "plot" doesn't take "int" as the index.
-    df_sum_result = df_sum_result.set_index("Result")
+    total = results_total(cube)
+    result_names_ordered = list(total.index)
+    
+    df_sum_result = pd.DataFrame({"Count" : total.to_numpy()}, index=pd.Index(result_names_ordered, name="Result"))
     # ----------------------------------------------------------------------------------------------------
-    # > Listing all the years. This is already in chronological order right from the start of the data 
-    # scraping.
+    # > Listing all the years. This is already in chronological order.
     # Applying custom color.
     # Plot settings.
     # ----------------------------------------------------------------------------------------------------
-    filtered_year_list = list(df_year["Year"].unique())
+    filtered_year_list = cube_years(cube)
     custom_cmap = custom_plot_settings(result_names_ordered)
     
     df_sum_result.plot(kind="pie", subplots=True, ylabel="", autopct='%1.1f%%', colormap=custom_cmap)
     plt.title(f"Results percentage:\n{filtered_year_list[0]} to {filtered_year_list[-1]}", fontsize=25)
     plt.legend(title="Result:", fontsize=16, loc="upper left", bbox_to_anchor=(-0.2, 1))
+    # Saves or show the plot.
+    figure_finisher(save_path)
+
+def plot_rolling_success_rate(momentum: dict, save_path: str | None = None) -> None:
+    """Makes the plot of the success rate of the last rounds over time.
+
+    Args:
+        momentum (dict): Output of momentum.momentum_builder.
+        save_path (str | None, optional): Where to save the figure. Defaults to None -> shows it.
+    """
+    df_rolling = momentum["rolling"].dropna(subset=["Date"])
+    df_rolling = df_rolling.iloc[::max(1, len(df_rolling) // MAX_LINE_POINTS)]
     # ----------------------------------------------------------------------------------------------------
-    # Plot and saves it to the "figure" folder.
+    # Data plotting and settings. Same color as "1st Try Success".
     # ----------------------------------------------------------------------------------------------------
-    # plt.savefig(f"../figures/Plot-Result-Percentage-{filtered_year_list[0]}-to-{filtered_year_list[-1]}.{current_datetime}.jpg",
-    #         dpi=300,
-    #         bbox_inches ="tight",
-    #         pad_inches=0.5)
-    plt.show()
+    custom_colors = custom_plot_settings(["1st Try Success"])
+    ax = (df_rolling.set_index("Date")[["Success Rate"]] * 100).plot(kind="line", colormap=custom_colors,
+                                                                       linewidth=3, legend=False)
+    ax.grid(axis="y")
+    ax.set_ylim(0, 105)
+    plt.xlabel("Air Date", fontsize=18)
+    plt.ylabel("Success Rate (%)", fontsize=18)
+    plt.title(f"Success rate of the last {momentum['round_window']} rounds", fontsize=25)
+    # Saves or show the plot.
+    figure_finisher(save_path)
+
+def plot_longest_streaks(momentum: dict, save_path: str | None = None) -> None:
+    """Makes the plot of the longest runs of the same result in a row.
+
+    Args:
+        momentum (dict): Output of momentum.momentum_builder.
+        save_path (str | None, optional): Where to save the figure. Defaults to None -> shows it.
+    """
+    df_streaks = momentum["streaks"]
+    result_names_ordered = list(dict.fromkeys(df_streaks["Detailed Result"]))
+    # ----------------------------------------------------------------------------------------------------
+    # One bar per run, colored like its result name. The longest ones are on top (stable -> same order
+    # as the streaks if two have the same length).
+    # ----------------------------------------------------------------------------------------------------
+    df_streaks = df_streaks.sort_values("Length", ascending=False, kind="stable")
+    custom_colors = custom_plot_settings(result_names_ordered)
+    labels = [f"{result}\nEp. {first} to {last}" for result, first, last
+              in zip(df_streaks["Detailed Result"], df_streaks["From Episode"], df_streaks["To Episode"])]
+    colors = [custom_colors(result_names_ordered.index(result)) for result in df_streaks["Detailed Result"]]
+
+    _, ax = plt.subplots()
+    bars = ax.barh(labels[::-1], df_streaks["Length"].to_numpy()[::-1], color=colors[::-1])
+    ax.bar_label(bars, label_type="center")
+    ax.grid(axis="x")
+    plt.xlabel("Rounds in a row", fontsize=18)
+    plt.title("Longest streaks", fontsize=25)
+    # Saves or show the plot.
+    figure_finisher(save_path)
+
+def plot_average_tries(momentum: dict, save_path: str | None = None) -> None:
+    """Makes the plot of the average tries per round of the last episodes over time.
+
+    Args:
+        momentum (dict): Output of momentum.momentum_builder.
+        save_path (str | None, optional): Where to save the figure. Defaults to None -> shows it.
+    """
+    df_tries = momentum["tries"].dropna(subset=["Date"])
+    df_tries = df_tries.iloc[::max(1, len(df_tries) // MAX_LINE_POINTS)]
+    # ----------------------------------------------------------------------------------------------------
+    # Data plotting and settings. Same color as "2nd Try Success".
+    # ----------------------------------------------------------------------------------------------------
+    custom_colors = custom_plot_settings(["2nd Try Success"])
+    ax = df_tries.set_index("Date")[["Average Tries"]].plot(kind="line", colormap=custom_colors, linewidth=3,
+                                                              legend=False)
+    ax.grid(axis="y")
+    ax.set_ylim(1, 3)
+    plt.xlabel("Air Date", fontsize=18)
+    plt.ylabel("Tries per round", fontsize=18)
+    plt.title(f"Average tries of the last {momentum['episode_window']} episodes", fontsize=25)
+    # Saves or show the plot.
+    figure_finisher(save_path)
 
 # ----------------------------------------------------------------------------------------------------
 # Main function:
 # ----------------------------------------------------------------------------------------------------
-def main() -> None:
+@instrumented("plot")
+def main(batch: bool = False, workers: int | None = None, grid: bool = False) -> None:
     """
     Main function for this file. Runs the functions that plots the data and saves it into "figures" folder.
+
+    Args:
+        batch (bool, optional): Saves all the figures to the "figures" folder without showing them. The
+        figures are made at the same time on all the cores. Defaults to False.
+        workers (int | None, optional): Number of processes for the batch mode. Defaults to None -> all cores.
+        grid (bool, optional): Also the months per year and the years per month as images of small
+        multiples. Defaults to False.
     """
-    df: pd.DataFrame = pd.read_csv("../data/merged/data_merged.csv")
-    df = df.set_index("Episode #")
+    # The binary sidecar if it is up to date (no parsing), otherwise only the columns used by the plots.
+    df: pd.DataFrame | None = sidecar_frame_loader(data_path("merged/data_merged.csv"))
+    if df is None:
+        df = dataframe_reader(
+            data_path("merged/data_merged.csv"), columns=["Episode #", "Air Date", "Month", "Year", "Detailed Result"]
+            )
+        df = schema_applier(df)
+    # The data is counted once here. All the plots use this.
+    cube = result_cube_builder(df.set_index("Episode #"))
+    momentum = momentum_builder(df)
+    
+    if batch:
+        batch_renderer(cube, figures_path(), workers, momentum, grid)
+        return
     
-    plot_pie_consolidated_result_year(df)
-    plot_comparison_per_consolidated_year(df)
-    plot_months_per_year(df)
-    plot_years_per_month(df)
+    plot_pie_consolidated_result_year(cube)
+    plot_comparison_per_consolidated_year(cube)
+    plot_months_per_year(cube, grid=grid)
+    plot_years_per_month(cube, grid=grid)
+    plot_rolling_success_rate(momentum)
+    plot_longest_streaks(momentum)
+    plot_average_tries(momentum)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
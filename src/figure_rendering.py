@@ -0,0 +1,314 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from aggregates import cube_years, cube_months, months_per_year, years_per_month, results_per_year, results_total
+from custom_plot_settings import SAVEFIG_SETTINGS, plot_settings_fingerprint
+from schema import ordered_result_names
+from profiling import instrumented
+from settings import figures_path
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO
+import hashlib
+import json
+import os
+import time
+import tracemalloc
+import matplotlib
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# Batch mode of data_visualizations. Every figure is an independent job -> (name of the file, name of the
+# plot function in data_visualizations, arguments). The jobs are made at the same time by a pool of
+# processes using a non-interactive backend, so nothing is shown and nothing blocks.
+#
+# Each figure is named by a hash of the data it plots and the plot settings -> "Plot-Months-2023.<hash>.jpg".
+# If a figure with the same hash already exists, it is not made again. "manifest.json" in the figures folder
+# keeps the current file of each figure. The older files made by this batch mode are deleted.
+#
+# The plots of a series ("Plot-Months-*", "Plot-Years-*") are made with one figure per process, only their
+# bars and labels change from one plot to the next (see data_visualizations.series_figure_builder). With
+# "grid", each series is also saved as one image of small multiples -> "Plot-Months-Grid".
+# ----------------------------------------------------------------------------------------------------
+# The cube (and momentum) of the current run. Sent once to every process instead of once per job.
+worker_state: dict = {}
+MANIFEST_NAME = "manifest.json"
+# Plot functions that plot the momentum (see momentum.py) instead of the cube -> the part they plot.
+MOMENTUM_PLOTS = {
+    "plot_rolling_success_rate" : "rolling",
+    "plot_longest_streaks" : "streaks",
+    "plot_average_tries" : "tries"
+}
+# Plot functions of a series -> the series. See data_visualizations.SERIES_SETTINGS.
+SERIES_PLOTS = {
+    "plot_months_of_year" : "months",
+    "plot_years_of_month" : "years"
+}
+
+def figure_jobs_builder(cube: pd.DataFrame, momentum: dict | None = None,
+                        grid: bool = False) -> list[tuple[str, str, tuple]]:
+    """Lists all the figures to be made. Same figures and names as the plots in the "figures" folder.
+
+    Args:
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        momentum (dict | None, optional): Output of momentum.momentum_builder. Defaults to None -> no
+        momentum plots.
+        grid (bool, optional): Also one image of small multiples per series. Defaults to False.
+
+    Returns:
+        list[tuple[str, str, tuple]]: (Name of the figure, Name of the plot function, Arguments).
+    """
+    year_list = cube_years(cube)
+    full_year_list = list(results_per_year(cube, full_years_only=True).index)
+
+    jobs = [(f"Plot-Result-Percentage-{year_list[0]}-to-{year_list[-1]}", "plot_pie_consolidated_result_year", ())]
+
+    if full_year_list:
+        jobs.append(
+            (f"Plot-Consolidated-{full_year_list[0]}-to-{full_year_list[-1]}", "plot_comparison_per_consolidated_year", ())
+            )
+
+    for per_year in year_list:
+        jobs.append((f"Plot-Months-{per_year}", "plot_months_of_year", (per_year,)))
+
+    for per_month in cube_months(cube):
+        jobs.append((f"Plot-Years-{per_month}", "plot_years_of_month", (per_month,)))
+
+    if grid:
+        jobs.append(("Plot-Months-Grid", "plot_series_grid", ("months",)))
+        jobs.append(("Plot-Years-Grid", "plot_series_grid", ("years",)))
+
+    if momentum is not None:
+        jobs.append(("Plot-Momentum-Success-Rate", "plot_rolling_success_rate", ()))
+        jobs.append(("Plot-Momentum-Streaks", "plot_longest_streaks", ()))
+        jobs.append(("Plot-Momentum-Tries", "plot_average_tries", ()))
+
+    return jobs
+
+def figure_data_slicer(cube: pd.DataFrame, function_name: str, arguments: tuple,
+                       momentum: dict | None = None) -> pd.DataFrame | pd.Series:
+    """The part of the cube (or momentum) that is plotted by a job.
+
+    Args:
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        function_name (str): Name of the plot function.
+        arguments (tuple): Arguments of the plot function.
+        momentum (dict | None, optional): Output of momentum.momentum_builder. Defaults to None.
+
+    Returns:
+        pd.DataFrame | pd.Series: The data of the figure.
+    """
+    if function_name in MOMENTUM_PLOTS and momentum is not None:
+        return momentum[MOMENTUM_PLOTS[function_name]]
+    if function_name == "plot_months_of_year":
+        return months_per_year(cube, *arguments)
+    if function_name == "plot_years_of_month":
+        return years_per_month(cube, *arguments)
+    if function_name == "plot_series_grid":
+        slicer = months_per_year if arguments[0] == "months" else years_per_month
+        items = cube_years(cube) if arguments[0] == "months" else cube_months(cube)
+        return pd.concat({item : slicer(cube, item) for item in items})
+    if function_name == "plot_comparison_per_consolidated_year":
+        return results_per_year(cube, full_years_only=True)
+    if function_name == "plot_pie_consolidated_result_year":
+        return results_total(cube)
+    
+    raise ValueError(f"Unknown plot function: {function_name}.")
+
+def figure_key(cube: pd.DataFrame, job: tuple[str, str, tuple], settings_fingerprint: str,
+               momentum: dict | None = None) -> str:
+    """Hash of everything that changes how a figure looks -> the job itself, its data and the plot settings.
+
+    Args:
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        job (tuple[str, str, tuple]): One of the jobs of figure_jobs_builder.
+        settings_fingerprint (str): Output of custom_plot_settings.plot_settings_fingerprint.
+        momentum (dict | None, optional): Output of momentum.momentum_builder. Defaults to None.
+
+    Returns:
+        str: sha256 of the figure.
+    """
+    figure_name, function_name, arguments = job
+    data_slice = figure_data_slicer(cube, function_name, arguments, momentum)
+    parts = [figure_name, function_name, repr(arguments), data_slice.to_csv(), settings_fingerprint]
+    if function_name in SERIES_PLOTS:
+        # Made by the series renderer -> the legend has the result names of the whole series.
+        series_slices = figure_data_slicer(cube, "plot_series_grid", (SERIES_PLOTS[function_name],))
+        parts.append("series")
+        parts.append(",".join(ordered_result_names(list(series_slices.columns))))
+    if function_name in MOMENTUM_PLOTS and momentum is not None:
+        # The windows are in the titles of the momentum plots.
+        parts.append(f"{momentum['round_window']},{momentum['episode_window']}")
+    
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\0")
+    
+    return hasher.hexdigest()
+
+def manifest_loader(figures_dir: str) -> dict:
+    """Loads the manifest of the figures. Empty if there's none yet.
+
+    Args:
+        figures_dir (str): Folder of the figures.
+
+    Returns:
+        dict: Name of the figure -> {"file", "key"}.
+    """
+    manifest_path = os.path.join(figures_dir, MANIFEST_NAME)
+    
+    if not os.path.exists(manifest_path):
+        return {}
+    
+    with open(manifest_path, encoding="utf-8") as manifest_file:
+        return json.load(manifest_file)
+
+def manifest_saver(figures_dir: str, manifest: dict) -> None:
+    """Saves the manifest of the figures.
+
+    Args:
+        figures_dir (str): Folder of the figures.
+        manifest (dict): Name of the figure -> {"file", "key"}.
+    """
+    manifest_path = os.path.join(figures_dir, MANIFEST_NAME)
+    
+    with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+def renderer_initializer(cube: pd.DataFrame, momentum: dict | None = None) -> None:
+    """Runs once in each process. Switches to a backend that doesn't need a screen and keeps the cube.
+
+    Args:
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        momentum (dict | None, optional): Output of momentum.momentum_builder. Defaults to None.
+    """
+    matplotlib.use("Agg")
+    # Only the memory of the main process is recorded (see profiling.py). tracemalloc is copied into the
+    # processes when they are forked and would only slow the plots down.
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    worker_state["cube"] = cube
+    worker_state["momentum"] = momentum
+
+def figure_drawer(cube: pd.DataFrame, job: tuple[str, str, tuple], save_path: str | BinaryIO, momentum: dict | None = None,
+                  series_figures: dict | None = None) -> None:
+    """Makes one figure and saves it. Used by the batch mode and the stats service (stats_server.py), so
+    both have the same figures.
+
+    Args:
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        job (tuple[str, str, tuple]): One of the jobs of figure_jobs_builder.
+        save_path (str | BinaryIO): Where to save the figure (a path or a file in memory).
+        momentum (dict | None, optional): Output of momentum.momentum_builder. Defaults to None.
+        series_figures (dict | None, optional): Series -> its figure, kept to be changed by the next plots of
+        the series. Defaults to None -> the figure of the series is made for this plot only.
+    """
+    # Imported here since data_visualizations imports this file.
+    import data_visualizations
+
+    _, function_name, arguments = job
+
+    if function_name not in SERIES_PLOTS:
+        plot_data = momentum if function_name in MOMENTUM_PLOTS else cube
+        getattr(data_visualizations, function_name)(plot_data, *arguments, save_path=save_path)
+        return
+
+    series = SERIES_PLOTS[function_name]
+    series_figure = None if series_figures is None else series_figures.get(series)
+    if series_figure is None:
+        series_figure = data_visualizations.series_figure_builder(cube, series)
+    data_visualizations.series_slice_drawer(series_figure, cube, *arguments)
+    series_figure["figure"].savefig(save_path, **SAVEFIG_SETTINGS)
+
+    if series_figures is None:
+        data_visualizations.plt.close(series_figure["figure"])
+    else:
+        series_figures[series] = series_figure
+
+def figure_job_runner(job: tuple[str, str, tuple], save_path: str) -> tuple[str, str, float]:
+    """Makes one figure and saves it.
+
+    Args:
+        job (tuple[str, str, tuple]): One of the jobs of figure_jobs_builder.
+        save_path (str): Where to save the figure.
+
+    Returns:
+        tuple[str, str, float]: Name of the figure, where it's saved and how many seconds it took.
+    """
+    start_time = time.perf_counter()
+    # One figure per series in each process, made by its first plot and changed by the next ones.
+    figure_drawer(worker_state["cube"], job, save_path, worker_state["momentum"],
+                  worker_state.setdefault("series_figures", {}))
+
+    return job[0], save_path, time.perf_counter() - start_time
+
+@instrumented()
+def batch_renderer(cube: pd.DataFrame, figures_dir: str | None = None, workers: int | None = None,
+                   momentum: dict | None = None, grid: bool = False) -> list[tuple[str, str, float]]:
+    """Makes all the figures that have changed in parallel and saves them to the "figures" folder. Prints
+    how long each figure took.
+
+    Args:
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        figures_dir (str | None, optional): Where to save the figures. Defaults to None -> the figures folder.
+        workers (int | None, optional): Number of processes. Defaults to None -> all cores.
+        momentum (dict | None, optional): Output of momentum.momentum_builder. Defaults to None -> no
+        momentum plots.
+        grid (bool, optional): See figure_jobs_builder. Defaults to False.
+
+    Returns:
+        list[tuple[str, str, float]]: Name of the figure, where it's saved and how many seconds it took.
+        Only the figures that were made again.
+    """
+    figures_dir = figures_dir or figures_path()
+    os.makedirs(figures_dir, exist_ok=True)
+    start_time = time.perf_counter()
+    
+    manifest = manifest_loader(figures_dir)
+    settings_fingerprint = plot_settings_fingerprint()
+    # ----------------------------------------------------------------------------------------------------
+    # Skipping the figures that already exist with the same hash.
+    # ----------------------------------------------------------------------------------------------------
+    current_figures = {}
+    jobs_to_render = []
+    save_paths = []
+    
+    for job in figure_jobs_builder(cube, momentum, grid):
+        key = figure_key(cube, job, settings_fingerprint, momentum)
+        file_name = f"{job[0]}.{key[:12]}.jpg"
+        current_figures[job[0]] = {"file" : file_name, "key" : key}
+        
+        previous = manifest.get(job[0])
+        if previous is not None and previous["key"] == key and os.path.exists(os.path.join(figures_dir, file_name)):
+            continue
+        
+        jobs_to_render.append(job)
+        save_paths.append(os.path.join(figures_dir, file_name))
+    
+    timings = []
+    if jobs_to_render:
+        with ProcessPoolExecutor(max_workers=workers, initializer=renderer_initializer,
+                                 initargs=(cube, momentum)) as executor:
+            timings = list(executor.map(figure_job_runner, jobs_to_render, save_paths))
+    # ----------------------------------------------------------------------------------------------------
+    # Deleting the older files of the figures (only the ones made by this batch mode), then saving the
+    # manifest.
+    # ----------------------------------------------------------------------------------------------------
+    for figure_name, previous in manifest.items():
+        current = current_figures.get(figure_name)
+        if current is not None and current["file"] == previous["file"]:
+            continue
+        old_path = os.path.join(figures_dir, previous["file"])
+        if os.path.exists(old_path):
+            os.remove(old_path)
+    
+    manifest_saver(figures_dir, current_figures)
+
+    for figure_name, _, seconds in timings:
+        print(f"{figure_name}: {seconds:.2f}s")
+    print(f"{len(timings)} figures made, {len(current_figures) - len(timings)} unchanged, "
+          f"in {time.perf_counter() - start_time:.2f}s")
+
+    return timings
@@ -0,0 +1,339 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from synthetic_data import (RESULT_STYLES, TABLE_COLUMNS, SONG_COLUMN, ARTISTS, synthetic_archive_builder,
+                            temporary_project)
+from data_gathering import FIRST_YEAR, main as data_gathering
+from data_cleaning_merging import main as data_cleaning_merging
+from storage import dataframe_reader
+from settings import data_path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from html import escape
+import argparse
+import hashlib
+import os
+import re
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# Local stand-in of the Wikipedia page. The synthetic archive (see synthetic_data.py) is written as HTML
+# that looks like the real page -> one collapsible "hidden-content mw-collapsible-content" table per year,
+# colored song cells ("background:#ABEBC6") and "Notes" as <sup> links. A small HTTP server serves it
+# with an optional delay, so data_gathering can be run end to end on localhost and its output compared
+# to the exact expected CSV files.
+#
+# python fixture_server.py --rows 3000 --latency 0.2        -> serves the page until Ctrl+C
+# python fixture_server.py --rows 30000 --check             -> runs data_gathering on it and checks the output, then
+#                                                              checks the incremental mode on an update of the page
+# ----------------------------------------------------------------------------------------------------
+PAGE_PATH = "/wiki/List_of_DoReMi_Market_episodes"
+# Older revision of the page, before the update of incremental_checker.
+OLD_PAGE_PATH = f"{PAGE_PATH}?oldid=1"
+FOOTNOTE_PATTERN = re.compile(r"(\[[a-z]{1,2}\])$")
+# Style of the browser -> style written in the wiki, and the cleaned result of each color.
+RESULT_HEX = {style : "background:#{:02X}{:02X}{:02X}".format(*map(int, re.findall(r"\d+", style)))
+              for style in RESULT_STYLES}
+RESULT_VALUES = dict(zip(RESULT_STYLES, [("1st Try Success", "Success", 1), ("2nd Try Success", "Success", 2),
+                                         ("3rd Try Success", "Success", 3), ("Failed", "Failed", 0)]))
+
+def cell_html_builder(text: str, style: str = "") -> str:
+    """One cell of a table. The "Note" at the end of the text becomes a <sup> link like in Wikipedia.
+
+    Args:
+        text (str): Text of the cell.
+        style (str, optional): Style of the browser (see RESULT_STYLES). Defaults to "" -> no color.
+
+    Returns:
+        str: The <td> of the cell.
+    """
+    style_html = f" style=\"{RESULT_HEX[style]}\"" if style else ""
+    note = FOOTNOTE_PATTERN.search(text)
+
+    if note:
+        text = escape(text[:note.start()]) + f"<sup class=\"reference\"><a href=\"#cite_note\">{note.group(1)}</a></sup>"
+    else:
+        text = escape(text)
+
+    return f"<td{style_html}>{text}</td>"
+
+def fixture_html_builder(tables: list[pd.DataFrame], table_styles: list[np.ndarray], revision: int = 1,
+                         first_year: int = FIRST_YEAR) -> str:
+    """Writes the synthetic archive as a Wikipedia-like page.
+
+    Args:
+        tables (list[pd.DataFrame]): First output of synthetic_data.synthetic_archive_builder.
+        table_styles (list[np.ndarray]): Second output of synthetic_data.synthetic_archive_builder.
+        revision (int, optional): Revision ID of the page ("wgRevisionId"). Defaults to 1.
+        first_year (int, optional): Year of the first table. Defaults to FIRST_YEAR.
+
+    Returns:
+        str: The HTML of the page.
+    """
+    header = "".join(
+        "<th>Song Questions<sup>[b]</sup> + Snack Time Game<sup>[c]</sup></th>" if column == SONG_COLUMN
+        else f"<th>{escape(column)}</th>" for column in TABLE_COLUMNS
+        )
+    song_position = TABLE_COLUMNS.index(SONG_COLUMN)
+
+    parts = [
+        "<!DOCTYPE html><html><head><title>List of DoReMi Market episodes - Wikipedia</title>",
+        f"<script>RLCONF={{\"wgRevisionId\":{revision}}};</script></head><body><div class=\"mw-parser-output\">",
+        # The first table of the page is not one of the episode tables.
+        "<table class=\"infobox\"><tbody><tr><th>Genre</th><td>Variety show</td></tr></tbody></table>"
+    ]
+
+    for year, (per_table, styles) in enumerate(zip(tables, table_styles), start=first_year):
+        parts.append(f"<h3>{year}</h3><div class=\"mw-collapsible mw-collapsed\">"
+                     f"<div class=\"hidden-content mw-collapsible-content\"><table class=\"wikitable\">"
+                     f"<tbody><tr>{header}</tr>")
+        for per_row, style in zip(per_table.itertuples(index=False), styles):
+            cells = [cell_html_builder(str(text), style if position == song_position else "")
+                     for position, text in enumerate(per_row)]
+            parts.append(f"<tr>{''.join(cells)}</tr>")
+        parts.append("</tbody></table></div></div>")
+
+    parts.append("</div></body></html>")
+
+    return "".join(parts)
+
+def expected_outputs_builder(tables: list[pd.DataFrame], table_styles: list[np.ndarray],
+                             first_year: int = FIRST_YEAR) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """The exact CSV files that data_gathering should write for the synthetic archive. Made from the
+    archive itself and not with the functions of data_gathering.
+
+    Args:
+        tables (list[pd.DataFrame]): First output of synthetic_data.synthetic_archive_builder.
+        table_styles (list[np.ndarray]): Second output of synthetic_data.synthetic_archive_builder.
+        first_year (int, optional): Year of the first table. Defaults to FIRST_YEAR.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: "cleaned_result.csv" and "raw_tables.csv" as text.
+    """
+    styles = [style for per_table in table_styles for style in per_table if style]
+    df_results = pd.DataFrame([RESULT_VALUES[style] for style in styles],
+                              columns=["Detailed Result", "General Result", "Result as Number"])
+
+    df_tables = pd.concat([per_table.assign(Year=year) for year, per_table in enumerate(tables, start=first_year)],
+                          ignore_index=True)
+    air_date = df_tables["Air Date"].str.replace(FOOTNOTE_PATTERN, "", regex=True)
+
+    df_expected_tables = pd.DataFrame({
+        "Episode #" : df_tables["Ep."],
+        "Song Questions + Snack Time Game" : df_tables[SONG_COLUMN].str.replace(FOOTNOTE_PATTERN, "", regex=True),
+        "Air Date" : air_date + ", " + df_tables["Year"].astype(str),
+        "Month" : air_date.str.split(" ").str[0],
+        "Year" : df_tables["Year"]
+    })
+
+    return df_results.astype(str), df_expected_tables.astype(str)
+
+def fixture_server_starter(pages: dict[str, str], latency: float = 0.0, host: str = "127.0.0.1",
+                           port: int = 0) -> tuple[ThreadingHTTPServer, str]:
+    """Starts the local server in the background. Answers 304 if the ETag of the page hasn't changed,
+    like Wikipedia, so the page cache can be tested too.
+
+    Args:
+        pages (dict[str, str]): Path -> HTML.
+        latency (float, optional): Seconds to wait before each answer. Defaults to 0.0.
+        host (str, optional): Address of the server. Defaults to "127.0.0.1".
+        port (int, optional): Port of the server. Defaults to 0 -> any free port.
+
+    Returns:
+        tuple[ThreadingHTTPServer, str]: The server (stop it with shutdown()) and its base URL.
+    """
+    encoded_pages = {path : html.encode("utf-8") for path, html in pages.items()}
+    etags = {path : f"\"{hashlib.sha256(body).hexdigest()[:16]}\"" for path, body in encoded_pages.items()}
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        # Keeps the connection open between requests, like Wikipedia.
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = encoded_pages.get(self.path)
+
+            if body is None:
+                self.send_error(404)
+                return
+            if self.headers.get("If-None-Match") == etags[self.path]:
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etags[self.path])
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Quiet. The benchmarks print their own timings.
+            pass
+
+    server = ThreadingHTTPServer((host, port), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def gather_checker(rows: int, latency: float = 0.0, seed: int = 0) -> float:
+    """Runs data_gathering on a local page made of a synthetic archive, in a temporary copy of the
+    project, and checks that both CSV files are exactly the expected ones.
+
+    Args:
+        rows (int): Number of rows of the synthetic archive.
+        latency (float, optional): Seconds the server waits before answering. Defaults to 0.0.
+        seed (int, optional): Seed of the synthetic archive. Defaults to 0.
+
+    Raises:
+        AssertionError: The output of data_gathering is not the expected one.
+
+    Returns:
+        float: Seconds that data_gathering took.
+    """
+    tables, table_styles = synthetic_archive_builder(rows, seed=seed)
+    expected_results, expected_tables = expected_outputs_builder(tables, table_styles)
+    server, base_url = fixture_server_starter({PAGE_PATH : fixture_html_builder(tables, table_styles)}, latency)
+
+    try:
+        with temporary_project():
+            start_time = time.perf_counter()
+            data_gathering(use_cache=False, page_url=f"{base_url}{PAGE_PATH}")
+            seconds = time.perf_counter() - start_time
+
+            df_results = dataframe_reader(data_path("cleaned/cleaned_result.csv")).astype(str)
+            df_tables = dataframe_reader(data_path("raw/raw_tables.csv")).astype(str)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    pd.testing.assert_frame_equal(df_results, expected_results)
+    pd.testing.assert_frame_equal(df_tables, expected_tables)
+
+    return seconds
+
+def page_updater(tables: list[pd.DataFrame],
+                 table_styles: list[np.ndarray]) -> tuple[list[pd.DataFrame], list[np.ndarray], list[pd.DataFrame], list[np.ndarray]]:
+    """Makes an older version of the synthetic archive, from before the last episode and before the end of
+    the episode before it -> its second row was still "TBA - TBA" (no result) and its third row wasn't
+    there yet. The last two rows of that episode are songs with a result in the newer version.
+
+    Args:
+        tables (list[pd.DataFrame]): First output of synthetic_data.synthetic_archive_builder.
+        table_styles (list[np.ndarray]): Second output of synthetic_data.synthetic_archive_builder.
+
+    Raises:
+        ValueError: The last table has less than two episodes.
+
+    Returns:
+        tuple[list[pd.DataFrame], list[np.ndarray], list[pd.DataFrame], list[np.ndarray]]: The tables and
+        styles of the older version, then of the newer version.
+    """
+    last_table = tables[-1].reset_index(drop=True)
+    last_styles = table_styles[-1].copy()
+    episodes = last_table["Ep."].unique()
+    if len(episodes) < 2:
+        raise ValueError("The last table needs at least two episodes. Use more rows.")
+
+    changed_rows = np.flatnonzero((last_table["Ep."] == episodes[-2]).to_numpy())[1:3]
+    last_table.loc[changed_rows, SONG_COLUMN] = [f"{ARTISTS[0]} - Filled In", f"{ARTISTS[1]} - Added Later"]
+    last_styles[changed_rows] = [RESULT_STYLES[0], RESULT_STYLES[3]]
+
+    kept = (last_table["Ep."] != episodes[-1]).to_numpy()
+    kept[changed_rows[1:]] = False
+    old_table = last_table.copy()
+    old_styles = last_styles.copy()
+    old_table.loc[changed_rows[0], SONG_COLUMN] = "TBA - TBA"
+    old_styles[changed_rows[0]] = ""
+
+    return ([*tables[:-1], old_table[kept].reset_index(drop=True)], [*table_styles[:-1], old_styles[kept]],
+            [*tables[:-1], last_table], [*table_styles[:-1], last_styles])
+
+def incremental_checker(rows: int, seed: int = 0) -> None:
+    """Runs the full pipeline (data_gathering and data_cleaning_merging) on an older version of a local
+    page, then the incremental mode on the newer version (see page_updater). Checks that the CSV files are
+    exactly the ones of the newer version and that the merged data is the same as after a full run.
+
+    Args:
+        rows (int): Number of rows of the synthetic archive.
+        seed (int, optional): Seed of the synthetic archive. Defaults to 0.
+
+    Raises:
+        AssertionError: The output of the incremental mode is not the expected one.
+    """
+    old_tables, old_styles, tables, table_styles = page_updater(*synthetic_archive_builder(rows, seed=seed))
+    expected_results, expected_tables = expected_outputs_builder(tables, table_styles)
+    server, base_url = fixture_server_starter({
+        OLD_PAGE_PATH : fixture_html_builder(old_tables, old_styles, revision=1),
+        PAGE_PATH : fixture_html_builder(tables, table_styles, revision=2)
+        })
+
+    try:
+        with temporary_project():
+            data_gathering(use_cache=False, page_url=f"{base_url}{OLD_PAGE_PATH}")
+            data_cleaning_merging()
+            data_gathering(use_cache=False, page_url=f"{base_url}{PAGE_PATH}", incremental=True)
+            data_cleaning_merging(incremental=True)
+
+            df_results = dataframe_reader(data_path("cleaned/cleaned_result.csv")).astype(str)
+            df_tables = dataframe_reader(data_path("raw/raw_tables.csv")).astype(str)
+            df_merged = dataframe_reader(data_path("merged/data_merged.csv"))
+            # Same files, without the incremental mode.
+            data_cleaning_merging()
+            df_expected_merged = dataframe_reader(data_path("merged/data_merged.csv"))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    pd.testing.assert_frame_equal(df_results, expected_results)
+    pd.testing.assert_frame_equal(df_tables, expected_tables)
+    pd.testing.assert_frame_equal(df_merged, df_expected_merged)
+
+def main():
+    """
+    Serves a synthetic page on localhost until Ctrl+C, or checks data_gathering against it (--check).
+    --save writes the page and the expected CSV files to a folder instead.
+    """
+    parser = argparse.ArgumentParser(description="Local stand-in of the Wikipedia page with synthetic episodes.")
+    parser.add_argument("--rows", type=int, default=3000, help="Rows of the synthetic archive.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic archive.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each answer.")
+    parser.add_argument("--port", type=int, default=8000, help="Port of the server.")
+    parser.add_argument("--check", action="store_true", help="Run data_gathering on the page and check the output.")
+    parser.add_argument("--save", metavar="FOLDER", help="Save the page and the expected CSV files to this folder.")
+    arguments = parser.parse_args()
+
+    if arguments.check:
+        seconds = gather_checker(arguments.rows, arguments.latency, arguments.seed)
+        print(f"data_gathering on {arguments.rows} rows: {seconds:.2f}s, output as expected")
+        incremental_checker(arguments.rows, arguments.seed)
+        print("Incremental mode after an update of the last episode: output as expected")
+        return
+
+    tables, table_styles = synthetic_archive_builder(arguments.rows, seed=arguments.seed)
+    html = fixture_html_builder(tables, table_styles)
+
+    if arguments.save:
+        os.makedirs(arguments.save, exist_ok=True)
+        with open(os.path.join(arguments.save, "page.html"), "w", encoding="utf-8") as html_file:
+            html_file.write(html)
+        expected_results, expected_tables = expected_outputs_builder(tables, table_styles)
+        expected_results.to_csv(os.path.join(arguments.save, "cleaned_result.csv"), index=False)
+        expected_tables.to_csv(os.path.join(arguments.save, "raw_tables.csv"), index=False)
+        print(f"Saved to {arguments.save}")
+        return
+
+    server, base_url = fixture_server_starter({PAGE_PATH : html}, arguments.latency, port=arguments.port)
+    print(f"Serving {base_url}{PAGE_PATH} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
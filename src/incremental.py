@@ -0,0 +1,116 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from typing import Callable
+from storage import dataframe_reader
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# Helpers for the incremental mode of data_gathering and data_cleaning_merging. The "high-water mark" is
+# the first row of the last episode in the merged data. The rows of that episode can still change on the
+# webpage ("TBA" rows filled in, rows added), so they are thrown away with everything after them, then
+# scraped and cleaned again. The new songs and results must match one to one, otherwise a full run is needed.
+# ----------------------------------------------------------------------------------------------------
+def high_water_mark_reader(merged_path: str) -> dict | None:
+    """Reads the last episode of the merged data.
+
+    Args:
+        merged_path (str): Path of the merged data.
+
+    Returns:
+        dict | None: "Episode #", "Air Date" (as text) and "Year" of the last row, how many rows there are ("Rows"),
+        how many of those are from the last year ("Rows in last year") and from the last episode ("Rows in last
+        episode"). None if there's no data yet.
+    """
+    try:
+        df_merged = dataframe_reader(merged_path, columns=["Episode #", "Air Date", "Year"]).astype(str)
+    except FileNotFoundError:
+        return None
+
+    if df_merged.empty:
+        return None
+
+    last_row = df_merged.iloc[-1]
+    other_episode = np.flatnonzero((
+        (df_merged["Episode #"] != last_row["Episode #"]) | (df_merged["Air Date"] != last_row["Air Date"])
+        ).to_numpy())
+
+    high_water_mark = {
+        "Episode #" : last_row["Episode #"],
+        "Air Date" : last_row["Air Date"],
+        "Year" : int(last_row["Year"]),
+        "Rows" : len(df_merged),
+        "Rows in last year" : int((df_merged["Year"] == last_row["Year"]).sum()),
+        "Rows in last episode" : len(df_merged) - 1 - int(other_episode[-1] if len(other_episode) else -1)
+    }
+
+    return high_water_mark
+
+def from_mark_filter(dataframe: pd.DataFrame, high_water_mark: dict) -> pd.Series:
+    """Mask of the rows from the first row of the last merged episode on. This is done by position and not
+    by comparing the episode numbers, since there are episodes like "Special 3" in between. The first row
+    with the same "Episode #" and "Air Date" as the high-water mark and all the rows after it are kept.
+
+    Args:
+        dataframe (pd.DataFrame): Any dataframe with the "Episode #" and "Air Date" columns.
+        high_water_mark (dict): Output of high_water_mark_reader.
+
+    Raises:
+        ValueError: The high-water mark is not in the dataframe. Do a full run instead.
+
+    Returns:
+        pd.Series: True -> The row is scraped / cleaned again.
+    """
+    matched = (
+        (dataframe["Episode #"].astype(str) == high_water_mark["Episode #"])
+        & (dataframe["Air Date"].astype(str) == high_water_mark["Air Date"])
+        ).to_numpy()
+
+    if not matched.any():
+        raise ValueError(
+            f"Episode {high_water_mark['Episode #']} ({high_water_mark['Air Date']}) not found. Run without incremental mode."
+            )
+
+    first_position = np.flatnonzero(matched)[0]
+
+    return pd.Series(np.arange(len(dataframe)) >= first_position, index=dataframe.index)
+
+def songs_results_checker(songs: int, results: int, high_water_mark: dict) -> None:
+    """Checks that the songs and the results from the high-water mark on match one to one. They don't if
+    a song or a result has changed before the last merged episode.
+
+    Args:
+        songs (int): Number of songs with a result from the high-water mark on.
+        results (int): Number of results from the high-water mark on.
+        high_water_mark (dict): Output of high_water_mark_reader.
+
+    Raises:
+        ValueError: Not the same number. Do a full run instead.
+    """
+    if songs != results:
+        raise ValueError(
+            f"{songs} songs but {results} results from episode {high_water_mark['Episode #']} "
+            f"({high_water_mark['Air Date']}) on. Run without incremental mode."
+            )
+
+def dataframe_appender(path: str, df_new: pd.DataFrame, keep: Callable[[pd.DataFrame], pd.Series] | int) -> pd.DataFrame:
+    """Loads the existing data, keeps only the rows that are still valid, then adds the new rows at the end.
+
+    Args:
+        path (str): Path of the existing data.
+        df_new (pd.DataFrame): New rows.
+        keep (Callable[[pd.DataFrame], pd.Series] | int): A function that returns the mask of rows to keep, or how many of the
+        first rows to keep.
+
+    Returns:
+        pd.DataFrame: The updated data. To be written with storage.dataframes_writer.
+    """
+    df_existing = dataframe_reader(path)
+
+    if callable(keep):
+        df_existing = df_existing[keep(df_existing)]
+    else:
+        df_existing = df_existing.iloc[:keep]
+
+    return pd.concat([df_existing, df_new], axis=0, ignore_index=True)
@@ -1,14 +1,315 @@
-from data_gathering import main as data_gathering
-from data_cleaning_merging import main as data_cleaning
-from data_visualizations import main as data_visualization
+from profiling import metrics, report_writer, session_starter
+from settings import data_path, figures_path, paths_setter
+import argparse
+import ast
+import cProfile
+import hashlib
+import importlib
+import json
+import os
+
+# ----------------------------------------------------------------------------------------------------
+# The steps of the pipeline and the files that each one reads and writes. A step is only run again if
+# one of its files has changed since its last run (like "make"). The paths are relative to the root
+# folder of the project, "{data}" and "{figures}" are the folders of settings.py. The code of each step
+# (its module and every module of "src" that it imports, see code_inputs) is also an input, so changing the
+# plot code or style only makes the plots again.
+#
+# The module of a step is only imported when the step runs, so "clean" never loads the browser / plot
+# libraries.
+# ----------------------------------------------------------------------------------------------------
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Fingerprints of the last runs, metrics of the last run (see profiling.py) and the cProfile dump of --profile.
+STATE_NAME = "pipeline_state.json"
+METRICS_NAME = "pipeline_metrics.json"
+PROFILE_NAME = "pipeline.prof"
+
+STAGES = {
+    "gather" : {
+        "module" : "data_gathering",
+        "kwargs" : {},
+        "inputs" : [],
+        "outputs" : ["{data}/raw/raw_tables.csv", "{data}/cleaned/cleaned_result.csv"]
+    },
+    "clean" : {
+        "module" : "data_cleaning_merging",
+        "kwargs" : {},
+        "inputs" : ["{data}/raw/raw_tables.csv", "{data}/cleaned/cleaned_result.csv", "{data}/excluded_songs.txt"],
+        "outputs" : ["{data}/cleaned/cleaned_tables.csv", "{data}/merged/data_merged.csv",
+                     "{data}/merged/artist_stats.csv"]
+    },
+    "plot" : {
+        "module" : "data_visualizations",
+        "kwargs" : {"batch" : True},
+        "inputs" : ["{data}/merged/data_merged.csv"],
+        "outputs" : ["{figures}/manifest.json"]
+    },
+    "report" : {
+        "module" : "report",
+        "kwargs" : {},
+        "inputs" : ["{data}/merged/data_merged.csv"],
+        "outputs" : ["{figures}/report.json", "{figures}/report.html"]
+    }
+}
+
+def file_path_resolver(path: str) -> str:
+    """Full path of a file of STAGES.
+
+    Args:
+        path (str): Path relative to the root folder, or starting with "{data}" / "{figures}".
+
+    Returns:
+        str: The full path.
+    """
+    if path.startswith("{data}/"):
+        return os.path.abspath(data_path(path.removeprefix("{data}/")))
+    if path.startswith("{figures}/"):
+        return os.path.abspath(figures_path(path.removeprefix("{figures}/")))
+
+    return os.path.join(ROOT_DIR, path)
+
+def file_fingerprint(path: str) -> str | None:
+    """sha256 of a file.
+
+    Args:
+        path (str): Path of STAGES. See file_path_resolver.
+
+    Returns:
+        str | None: The hash. None if the file doesn't exist.
+    """
+    full_path = file_path_resolver(path)
+
+    if not os.path.exists(full_path):
+        return None
+
+    hasher = hashlib.sha256()
+    with open(full_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            hasher.update(block)
+
+    return hasher.hexdigest()
+
+def code_inputs(module: str) -> list[str]:
+    """The code of a step -> its module and every module of "src" that it imports, even the ones that are
+    only imported by another module or inside a function.
+
+    Args:
+        module (str): Name of the module of the step.
+
+    Returns:
+        list[str]: Paths as in STAGES -> "src/storage.py", sorted.
+    """
+    found = set()
+    pending = [module]
+
+    while pending:
+        name = pending.pop()
+        path = os.path.join(ROOT_DIR, "src", f"{name}.py")
+        # The other imports are not files of "src" -> pandas, matplotlib.pyplot...
+        if name in found or not os.path.exists(path):
+            continue
+        found.add(name)
+        with open(path, encoding="utf-8") as source_file:
+            tree = ast.parse(source_file.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module is not None and node.level == 0:
+                pending.append(node.module)
+
+    return sorted(f"src/{name}.py" for name in found)
+
+def stage_fingerprints(stage: dict) -> dict[str, str | None]:
+    """Fingerprints of all the files of a step.
+
+    Args:
+        stage (dict): One of STAGES.
+
+    Returns:
+        dict[str, str | None]: Path -> hash.
+    """
+    paths = stage["inputs"] + code_inputs(stage["module"]) + stage["outputs"]
+
+    return {path : file_fingerprint(path) for path in paths}
+
+def stage_is_stale(stage: dict, previous: dict | None) -> bool:
+    """Determines if a step has to be run again.
+
+    Args:
+        stage (dict): One of STAGES.
+        previous (dict | None): Fingerprints of the last run of the step.
+
+    Returns:
+        bool: True -> A file has changed, an output is missing or the step was never run.
+    """
+    current = stage_fingerprints(stage)
+
+    if any(current[path] is None for path in stage["outputs"]):
+        return True
+
+    return previous != current
+
+def state_loader() -> dict:
+    """Loads the fingerprints of the last runs.
+
+    Returns:
+        dict: Name of the step -> fingerprints.
+    """
+    state_path = data_path(STATE_NAME)
+
+    if not os.path.exists(state_path):
+        return {}
+
+    with open(state_path, encoding="utf-8") as state_file:
+        return json.load(state_file)
+
+def state_saver(state: dict) -> None:
+    """Saves the fingerprints of the last runs.
+
+    Args:
+        state (dict): Name of the step -> fingerprints.
+    """
+    state_path = data_path(STATE_NAME)
+
+    with open(f"{state_path}.tmp", "w", encoding="utf-8") as state_file:
+        json.dump(state, state_file, indent=2, sort_keys=True)
+
+    os.replace(f"{state_path}.tmp", state_path)
+
+def stage_runner(force: bool = False, only: str | None = None, stage_kwargs: dict | None = None) -> None:
+    """Runs the steps that have changed, in order.
+
+    Args:
+        force (bool, optional): Run all the steps. Defaults to False.
+        only (str | None, optional): Run this step only, even if nothing has changed. Defaults to None.
+        stage_kwargs (dict | None, optional): Arguments of the main function of the step, on top of the ones
+        in STAGES. Defaults to None.
+    """
+    # The steps use paths relative to the "src" folder.
+    os.chdir(os.path.join(ROOT_DIR, "src"))
+    state = state_loader()
+
+    for name, stage in STAGES.items():
+        if only is not None and name != only:
+            continue
+        if not force and only is None and not stage_is_stale(stage, state.get(name)):
+            print(f"{name}: unchanged, skipped")
+            continue
+
+        print(f"{name}: running")
+        stage_function = importlib.import_module(stage["module"]).main
+        stage_function(**{**stage["kwargs"], **(stage_kwargs or {})})
+
+        state[name] = stage_fingerprints(stage)
+        state_saver(state)
+
+def metrics_printer() -> None:
+    """Prints the time, memory and rows of each step that was run."""
+    for name in STAGES:
+        record = metrics.get(name)
+        if record is None:
+            continue
+        peak_memory = record["peak_memory_bytes"]
+        peak_text = "-" if peak_memory is None else f"{peak_memory / 2**20:.1f} MiB"
+        counters_text = ", ".join(f"{counter}: {count}" for counter, count in sorted(record["counters"].items()))
+        print(f"{name}: {record['wall_seconds']:.2f}s wall, {record['cpu_seconds']:.2f}s CPU, peak {peak_text}"
+              f"{', ' + counters_text if counters_text else ''}")
+
+def arguments_parser() -> argparse.ArgumentParser:
+    """Options of the command line. The options of all the steps come before the name of the step:
+    "python -m src --data-dir ../other clean --chunk-size 100000".
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    parser = argparse.ArgumentParser(prog="python -m src", description="Runs the steps of the pipeline.")
+    parser.add_argument("--data-dir", help="Folder of the data. Defaults to \"data\".")
+    parser.add_argument("--figures-dir", help="Folder of the figures. Defaults to \"figures\".")
+    parser.add_argument("--force", action="store_true", help="Run all the steps, even the unchanged ones.")
+    parser.add_argument("--only", choices=list(STAGES), help="Run this step only.")
+    parser.add_argument("--profile", action="store_true", help="Save a cProfile dump of the run.")
+    parser.add_argument("--no-memory", action="store_true", help="Don't record the peak memory (faster).")
+    subparsers = parser.add_subparsers(dest="command", metavar="{gather,clean,plot,report,all}")
+
+    subparsers.add_parser("all", help="Run the steps that have changed (default).")
+
+    gather_parser = subparsers.add_parser("gather", help="Scrape the webpage.")
+    gather_parser.add_argument("--backend", choices=["lxml", "selenium"], default="lxml")
+    gather_parser.add_argument("--html-path", help="Local HTML file instead of the webpage.")
+    gather_parser.add_argument("--no-cache", action="store_true", help="Don't use the page cache.")
+    gather_parser.add_argument("--offline", action="store_true", help="Replay the webpage from the cache only.")
+    gather_parser.add_argument("--revision", help="Pinned snapshot in the cache.")
+    gather_parser.add_argument("--incremental", action="store_true", help="Only the new episodes.")
+    gather_parser.add_argument("--pages", help="JSON file of page specs to be gathered at the same time.")
+
+    clean_parser = subparsers.add_parser("clean", help="Clean and merge the data.")
+    clean_parser.add_argument("--incremental", action="store_true", help="Only the new episodes.")
+    clean_parser.add_argument("--chunk-size", type=int, help="Streaming mode, this many rows at a time.")
+    clean_parser.add_argument("--store", action="store_true", help="Also write the SQLite store of the merged data.")
+    clean_parser.add_argument("--sidecar", action="store_true", help="Also write the binary sidecar of the merged data.")
+
+    plot_parser = subparsers.add_parser("plot", help="Save all the figures.")
+    plot_parser.add_argument("--workers", type=int, help="Number of processes. Defaults to all cores.")
+    plot_parser.add_argument("--grid", action="store_true", help="Also one image of small multiples per series.")
+
+    subparsers.add_parser("report", help="Write the HTML report and its JSON (no images).")
+
+    return parser
+
+def stage_kwargs_builder(arguments: argparse.Namespace) -> dict:
+    """Arguments of the main function of the step chosen in the command line.
+
+    Args:
+        arguments (argparse.Namespace): Output of the parser.
+
+    Returns:
+        dict: Keyword arguments of the main function.
+    """
+    if arguments.command == "gather":
+        return {
+            "backend" : arguments.backend,
+            "html_path" : arguments.html_path and os.path.abspath(arguments.html_path),
+            "use_cache" : not arguments.no_cache,
+            "offline" : arguments.offline,
+            "revision" : arguments.revision,
+            "incremental" : arguments.incremental,
+            "page_specs" : arguments.pages and os.path.abspath(arguments.pages)
+        }
+    if arguments.command == "clean":
+        return {"incremental" : arguments.incremental, "chunk_size" : arguments.chunk_size, "store" : arguments.store,
+                "sidecar" : arguments.sidecar}
+    if arguments.command == "plot":
+        return {"workers" : arguments.workers, "grid" : arguments.grid}
+
+    return {}
 
 def main():
     """
-    This just runs all the files right after another to kind of automate the process.
+    This just runs all the files right after another to kind of automate the process. Only the steps
+    whose files have changed are run. Use --force to run everything or --only to run one step, or the name
+    of a step ("gather", "clean", "plot", "report") to run it with its own options.
+    The time, memory, rows and network calls of each step are saved to "pipeline_metrics.json" in the data
+    folder. Use --profile to also save a cProfile dump -> "pipeline.prof" (can be opened with snakeviz).
     """
-    data_gathering()
-    data_cleaning()
-    data_visualization()
+    arguments = arguments_parser().parse_args()
+    # Before going to the "src" folder, so that relative paths are taken from the current folder.
+    paths_setter(arguments.data_dir, arguments.figures_dir)
+
+    only = arguments.command if arguments.command in STAGES else arguments.only
+    run_kwargs = {"force" : arguments.force, "only" : only, "stage_kwargs" : stage_kwargs_builder(arguments)}
+
+    session_starter(track_memory=not arguments.no_memory)
+
+    if arguments.profile:
+        profiler = cProfile.Profile()
+        profiler.runcall(stage_runner, **run_kwargs)
+        profiler.dump_stats(data_path(PROFILE_NAME))
+        print(f"cProfile dump saved to {os.path.abspath(data_path(PROFILE_NAME))}")
+    else:
+        stage_runner(**run_kwargs)
+
+    report_writer(data_path(METRICS_NAME))
+    metrics_printer()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,203 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from schema import RESULT_DTYPE, RESULT_NAMES
+from text_normalization import air_date_parser
+from profiling import instrumented
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# Momentum of the team -> how the results change over time instead of the counts per year / month.
+# The rounds are put in the order they were aired (Air Date, then their order in the data), then:
+#   > rolling success rate over the last N rounds,
+#   > longest runs of the same result in a row ("Failed", "1st Try Success"),
+#   > average tries per round over the last N episodes.
+# Everything is done on whole arrays (cumulative sums, run-length encoding), so it stays fast on the
+# synthetic archives with millions of rows.
+# ----------------------------------------------------------------------------------------------------
+ROUND_WINDOW = 30
+EPISODE_WINDOW = 10
+STREAK_RESULTS = ["Failed", "1st Try Success"]
+# Longest runs kept for each result.
+TOP_STREAKS = 3
+# Tries used for each result name (same order as RESULT_NAMES). A failed round used all 3 tries.
+TRIES_PER_RESULT = np.array([1, 2, 3, 3])
+SUCCESS_RESULTS = ["1st Try Success", "2nd Try Success", "3rd Try Success"]
+
+def rounds_orderer(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """Puts the rounds in the order they were aired. Rounds of the same day are in the order of their
+    episode number, then keep their order in the data. Rounds with an unknown result are removed.
+
+    Args:
+        dataframe (pd.DataFrame): The cleaned and merged data. At least "Episode #", "Air Date" (or the
+        parsed "Date", see results_sidecar.py) and "Detailed Result".
+
+    Returns:
+        pd.DataFrame: "Episode #", "Date" and "Detailed Result" of the rounds in order, index starting from 0.
+    """
+    results = pd.Categorical(dataframe["Detailed Result"], dtype=RESULT_DTYPE)
+    if "Date" in dataframe.columns:
+        dates = dataframe["Date"].to_numpy()
+    else:
+        # The same days come back many times -> each day is only parsed once.
+        date_codes, air_dates = pd.factorize(dataframe["Air Date"].astype(str))
+        dates = air_date_parser(pd.Series(air_dates)).to_numpy()[date_codes]
+
+    # Episodes that are not a number ("Special 3") go after the numbered ones of the same day.
+    episode_numbers = pd.to_numeric(pd.Series(dataframe["Episode #"].to_numpy()), errors="coerce").to_numpy()
+
+    positions = np.flatnonzero(results.codes >= 0)
+    # By date, then by episode. Stable -> the rounds of the same episode keep their order. Unknown dates
+    # (NaT) go last.
+    positions = positions[np.lexsort((episode_numbers[positions], dates[positions]))]
+
+    return pd.DataFrame({
+        "Episode #" : dataframe["Episode #"].to_numpy()[positions],
+        "Date" : dates[positions],
+        "Detailed Result" : results[positions]
+    })
+
+def window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """Sum of the last "window" values at each position (fewer at the start) with one cumulative sum.
+
+    Args:
+        values (np.ndarray): The values in order.
+        window (int): Size of the window.
+
+    Returns:
+        np.ndarray: Same length as values.
+    """
+    totals = np.concatenate(([0], np.cumsum(values)))
+    ends = np.arange(1, len(values) + 1)
+
+    return totals[ends] - totals[np.maximum(ends - window, 0)]
+
+def window_counts(length: int, window: int) -> np.ndarray:
+    """Number of values in the window at each position -> 1, 2, ..., window, window, ...
+
+    Args:
+        length (int): Number of values.
+        window (int): Size of the window.
+
+    Returns:
+        np.ndarray: Same length as the values.
+    """
+    return np.minimum(np.arange(1, length + 1), window)
+
+def runs_encoder(values: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Run-length encoding -> [A, A, B, A] is (starts [0, 2, 3], lengths [2, 1, 1], values [A, B, A]).
+
+    Args:
+        values (np.ndarray): The values in order.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: Position of the first value of each run, its length and
+        its value.
+    """
+    if len(values) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64), values[:0]
+
+    starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+    lengths = np.diff(np.append(starts, len(values)))
+
+    return starts, lengths, values[starts]
+
+def rolling_success_rate(df_rounds: pd.DataFrame, window: int = ROUND_WINDOW) -> pd.DataFrame:
+    """Success rate of the last "window" rounds at each round.
+
+    Args:
+        df_rounds (pd.DataFrame): Output of rounds_orderer.
+        window (int, optional): Number of rounds. Defaults to ROUND_WINDOW.
+
+    Returns:
+        pd.DataFrame: "Round" (1, 2...), "Episode #", "Date" and "Success Rate" (0 to 1).
+    """
+    successes = df_rounds["Detailed Result"].isin(SUCCESS_RESULTS).to_numpy(dtype=np.int64)
+
+    return pd.DataFrame({
+        "Round" : np.arange(1, len(df_rounds) + 1),
+        "Episode #" : df_rounds["Episode #"].to_numpy(),
+        "Date" : df_rounds["Date"].to_numpy(),
+        "Success Rate" : window_sums(successes, window) / window_counts(len(successes), window)
+    })
+
+def longest_streaks(df_rounds: pd.DataFrame, results: list[str] = STREAK_RESULTS, top: int = TOP_STREAKS) -> pd.DataFrame:
+    """Longest runs of the same result in a row.
+
+    Args:
+        df_rounds (pd.DataFrame): Output of rounds_orderer.
+        results (list[str], optional): Result names to look for. Defaults to STREAK_RESULTS.
+        top (int, optional): Runs kept for each result. Defaults to TOP_STREAKS.
+
+    Returns:
+        pd.DataFrame: "Detailed Result", "Length", "From Episode", "To Episode", "From" and "To" (dates).
+        Longest first for each result; the earlier run first if two have the same length.
+    """
+    codes = df_rounds["Detailed Result"].cat.codes.to_numpy()
+    starts, lengths, run_codes = runs_encoder(codes)
+    ends = starts + lengths - 1
+    episodes = df_rounds["Episode #"].to_numpy()
+    dates = df_rounds["Date"].to_numpy()
+
+    streaks = []
+    for result in results:
+        runs = np.flatnonzero(run_codes == RESULT_NAMES.index(result))
+        runs = runs[np.argsort(-lengths[runs], kind="stable")][:top]
+        streaks.append(pd.DataFrame({
+            "Detailed Result" : result,
+            "Length" : lengths[runs],
+            "From Episode" : episodes[starts[runs]],
+            "To Episode" : episodes[ends[runs]],
+            "From" : dates[starts[runs]],
+            "To" : dates[ends[runs]]
+        }))
+
+    return pd.concat(streaks, ignore_index=True)
+
+def episode_average_tries(df_rounds: pd.DataFrame, window: int = EPISODE_WINDOW) -> pd.DataFrame:
+    """Average tries per round of the last "window" episodes at each episode.
+
+    Args:
+        df_rounds (pd.DataFrame): Output of rounds_orderer.
+        window (int, optional): Number of episodes. Defaults to EPISODE_WINDOW.
+
+    Returns:
+        pd.DataFrame: "Episode #", "Date", "Rounds", "Tries" and "Average Tries" (over the window).
+    """
+    tries = TRIES_PER_RESULT[df_rounds["Detailed Result"].cat.codes.to_numpy()]
+    # Rounds of the same episode are next to each other -> one run per episode.
+    starts, rounds, episodes = runs_encoder(df_rounds["Episode #"].astype(str).to_numpy())
+    episode_tries = np.add.reduceat(tries, starts) if len(starts) else tries[:0]
+
+    return pd.DataFrame({
+        "Episode #" : episodes,
+        "Date" : df_rounds["Date"].to_numpy()[starts],
+        "Rounds" : rounds,
+        "Tries" : episode_tries,
+        "Average Tries" : window_sums(episode_tries, window) / window_sums(rounds, window)
+    })
+
+@instrumented()
+def momentum_builder(dataframe: pd.DataFrame, round_window: int = ROUND_WINDOW,
+                     episode_window: int = EPISODE_WINDOW) -> dict:
+    """All the momentum numbers at once.
+
+    Args:
+        dataframe (pd.DataFrame): The cleaned and merged data.
+        round_window (int, optional): See rolling_success_rate. Defaults to ROUND_WINDOW.
+        episode_window (int, optional): See episode_average_tries. Defaults to EPISODE_WINDOW.
+
+    Returns:
+        dict: "rolling" (rolling_success_rate), "streaks" (longest_streaks), "tries" (episode_average_tries),
+        "round_window" and "episode_window".
+    """
+    df_rounds = rounds_orderer(dataframe)
+
+    return {
+        "rolling" : rolling_success_rate(df_rounds, round_window),
+        "streaks" : longest_streaks(df_rounds),
+        "tries" : episode_average_tries(df_rounds, episode_window),
+        "round_window" : round_window,
+        "episode_window" : episode_window
+    }
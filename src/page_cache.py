@@ -0,0 +1,263 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from profiling import counter_incrementer, instrumented
+from settings import data_path
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+
+# ----------------------------------------------------------------------------------------------------
+# Settings of the cache. The snapshots are saved as "objects/<sha256 of the HTML>.html.gz" and the
+# "index.json" keeps track which snapshot belongs to which URL, together with its ETag and revision.
+# The cache is in the "cache" folder of the data folder (see settings.py).
+# ----------------------------------------------------------------------------------------------------
+TTL_SECONDS = 24 * 60 * 60
+MAX_SNAPSHOTS_PER_URL = 5
+USER_AGENT = "Mozilla/5.0 (Amazing-Saturday-results scraper)"
+# Shortest start of a sha256 accepted as a pinned revision, like the short hashes of git.
+MIN_SHA256_PREFIX = 7
+
+# ----------------------------------------------------------------------------------------------------
+# Functions that are used by cached_page_fetcher.
+# ----------------------------------------------------------------------------------------------------
+def index_loader(cache_dir: str) -> dict:
+    """Loads the index of the cache. Returns an empty index if there's no cache yet.
+
+    Args:
+        cache_dir (str): Folder of the cache.
+
+    Returns:
+        dict: URL -> list of snapshots (newest is the last one).
+    """
+    index_path = os.path.join(cache_dir, "index.json")
+
+    if not os.path.exists(index_path):
+        return {}
+
+    with open(index_path, encoding="utf-8") as index_file:
+        return json.load(index_file)
+
+def index_saver(cache_dir: str, index: dict) -> None:
+    """Saves the index of the cache. Written to a temporary file first so that a crash will not
+    leave a broken index.
+
+    Args:
+        cache_dir (str): Folder of the cache.
+        index (dict): URL -> list of snapshots.
+    """
+    index_path = os.path.join(cache_dir, "index.json")
+    temp_path = f"{index_path}.tmp"
+
+    with open(temp_path, "w", encoding="utf-8") as index_file:
+        json.dump(index, index_file, indent=2)
+
+    os.replace(temp_path, index_path)
+
+def revision_extractor(html: str) -> str | None:
+    """Gets the revision ID of a Wikipedia page. This is written in the HTML as "wgRevisionId":123.
+
+    Args:
+        html (str): The HTML of the webpage.
+
+    Returns:
+        str | None: The revision ID. None if it's not found.
+    """
+    matched = re.search(r"\"wgRevisionId\":(\d+)", html)
+
+    if matched:
+        return matched.group(1)
+
+    return None
+
+def snapshot_saver(cache_dir: str, html: str) -> str:
+    """Saves the HTML compressed. The name of the file is the hash of the HTML, so the same page
+    is only saved once.
+
+    Args:
+        cache_dir (str): Folder of the cache.
+        html (str): The HTML of the webpage.
+
+    Returns:
+        str: sha256 of the HTML.
+    """
+    data = html.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    objects_dir = os.path.join(cache_dir, "objects")
+    os.makedirs(objects_dir, exist_ok=True)
+
+    object_path = os.path.join(objects_dir, f"{digest}.html.gz")
+    if not os.path.exists(object_path):
+        temp_path = f"{object_path}.tmp"
+        with gzip.open(temp_path, "wb") as object_file:
+            object_file.write(data)
+        os.replace(temp_path, object_path)
+
+    return digest
+
+def snapshot_loader(cache_dir: str, digest: str) -> str:
+    """Loads a saved HTML.
+
+    Args:
+        cache_dir (str): Folder of the cache.
+        digest (str): sha256 of the HTML.
+
+    Returns:
+        str: The HTML of the webpage.
+    """
+    object_path = os.path.join(cache_dir, "objects", f"{digest}.html.gz")
+
+    with gzip.open(object_path, "rb") as object_file:
+        return object_file.read().decode("utf-8")
+
+def snapshot_selector(snapshots: list[dict], revision: str | None) -> dict | None:
+    """Picks the snapshot to be used. If a revision is given, it can be the revision ID, the ETag or
+    the start of the sha256 (at least MIN_SHA256_PREFIX characters). Otherwise, the newest snapshot.
+
+    Args:
+        snapshots (list[dict]): Snapshots of one URL.
+        revision (str | None): Pinned revision.
+
+    Raises:
+        ValueError: The revision is empty.
+
+    Returns:
+        dict | None: The snapshot. None if there's no match.
+    """
+    if revision == "":
+        raise ValueError("The pinned revision is empty.")
+
+    if not snapshots:
+        return None
+
+    if revision is None:
+        return snapshots[-1]
+
+    is_sha256_prefix = len(revision) >= MIN_SHA256_PREFIX
+    for snapshot in reversed(snapshots):
+        if revision in (snapshot["revision"], snapshot["etag"]):
+            return snapshot
+        if is_sha256_prefix and snapshot["sha256"].startswith(revision):
+            return snapshot
+
+    return None
+
+def cache_evictor(cache_dir: str, index: dict, max_snapshots: int) -> None:
+    """Keeps only the newest snapshots of each URL, then deletes the files that are not used anymore.
+
+    Args:
+        cache_dir (str): Folder of the cache.
+        index (dict): URL -> list of snapshots.
+        max_snapshots (int): How many snapshots to keep per URL.
+    """
+    for page_url, snapshots in index.items():
+        index[page_url] = snapshots[-max_snapshots:]
+
+    used_digests = {snapshot["sha256"] for snapshots in index.values() for snapshot in snapshots}
+    objects_dir = os.path.join(cache_dir, "objects")
+
+    if not os.path.isdir(objects_dir):
+        return
+
+    for file_name in os.listdir(objects_dir):
+        digest = file_name.split(".")[0]
+        if digest not in used_digests:
+            os.remove(os.path.join(objects_dir, file_name))
+
+# ----------------------------------------------------------------------------------------------------
+# Main function of this file:
+# ----------------------------------------------------------------------------------------------------
+@instrumented()
+def cached_page_fetcher(page_url: str,
+                        cache_dir: str | None = None,
+                        ttl: float = TTL_SECONDS,
+                        max_snapshots: int = MAX_SNAPSHOTS_PER_URL,
+                        offline: bool = False,
+                        revision: str | None = None) -> str:
+    """Gets the HTML of the webpage from the cache. The webpage is only downloaded again if the
+    cache is older than the TTL, and even then it asks the server first if the page has changed
+    (ETag / Last-Modified). If it hasn't, the saved one is used.
+
+    Args:
+        page_url (str): URL of the webpage.
+        cache_dir (str | None, optional): Folder of the cache. Defaults to None -> "cache" in the data folder.
+        ttl (float, optional): Seconds before the server is asked again. Defaults to TTL_SECONDS.
+        max_snapshots (int, optional): How many snapshots to keep per URL. Defaults to MAX_SNAPSHOTS_PER_URL.
+        offline (bool, optional): Replay from the cache only. Never use the network. Defaults to False.
+        revision (str | None, optional): Use this saved revision (revision ID, ETag or start of the sha256)
+        instead of the newest one. Never uses the network. Defaults to None.
+
+    Raises:
+        FileNotFoundError: Offline / pinned revision but it's not in the cache.
+        ValueError: The pinned revision is empty.
+
+    Returns:
+        str: The HTML of the webpage.
+    """
+    cache_dir = cache_dir or data_path("cache")
+    index = index_loader(cache_dir)
+    snapshots = index.get(page_url, [])
+    # ----------------------------------------------------------------------------------------------------
+    # Replay from the cache.
+    # ----------------------------------------------------------------------------------------------------
+    if offline or revision is not None:
+        snapshot = snapshot_selector(snapshots, revision)
+        if snapshot is None:
+            raise FileNotFoundError(f"No cached snapshot of {page_url} (revision: {revision}) in {cache_dir}.")
+        return snapshot_loader(cache_dir, snapshot["sha256"])
+
+    latest = snapshot_selector(snapshots, None)
+    if latest is not None and time.time() - latest["checked_at"] < ttl:
+        return snapshot_loader(cache_dir, latest["sha256"])
+    # ----------------------------------------------------------------------------------------------------
+    # Conditional re-fetch. The server answers 304 if the page hasn't changed.
+    # ----------------------------------------------------------------------------------------------------
+    headers = {"User-Agent": USER_AGENT}
+    if latest is not None:
+        if latest["etag"]:
+            headers["If-None-Match"] = latest["etag"]
+        if latest["last_modified"]:
+            headers["If-Modified-Since"] = latest["last_modified"]
+
+    counter_incrementer("network_calls")
+    try:
+        with urlopen(Request(page_url, headers=headers), timeout=30) as response:
+            charset = response.headers.get_content_charset() or "utf-8"
+            html = response.read().decode(charset)
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+    except HTTPError as error:
+        if error.code != 304 or latest is None:
+            raise
+        latest["checked_at"] = time.time()
+        index_saver(cache_dir, index)
+        return snapshot_loader(cache_dir, latest["sha256"])
+
+    os.makedirs(cache_dir, exist_ok=True)
+    digest = snapshot_saver(cache_dir, html)
+
+    if latest is not None and latest["sha256"] == digest:
+        # Same page, the server just doesn't support conditional requests.
+        latest["checked_at"] = time.time()
+        latest["etag"] = etag or latest["etag"]
+        latest["last_modified"] = last_modified or latest["last_modified"]
+    else:
+        snapshots.append({
+            "sha256" : digest,
+            "revision" : revision_extractor(html),
+            "etag" : etag,
+            "last_modified" : last_modified,
+            "fetched_at" : time.time(),
+            "checked_at" : time.time()
+        })
+        index[page_url] = snapshots
+
+    cache_evictor(cache_dir, index, max_snapshots)
+    index_saver(cache_dir, index)
+
+    return html
@@ -0,0 +1,302 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from data_gathering import (FIRST_YEAR, PAGE_URL, RESULT_COLORS, TABLE_XPATH, result_scraper_lxml, results_cleaner,
+                            tables_scraper_pandas)
+from page_cache import USER_AGENT
+from storage import dataframes_writer
+from profiling import counter_incrementer, instrumented, metrics_collector, metrics_merger
+from settings import data_path
+import asyncio
+import http.client
+import json
+import os
+import ssl
+import time
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# Gathering of many pages at once (other shows / seasons with the same colored results). Each page is a
+# "page spec" -> URL, XPath of the tables, colors of the results, year of the first table and the folder
+# where its CSV files are written. Pages with the same folder (seasons of one show) are written together,
+# in the order of the specs.
+#
+# The pages are downloaded at the same time. Connections are kept open and reused per host, with a limit
+# of connections and requests per second for each host, and a retry with backoff when the server is busy.
+# Each page is parsed as soon as it's downloaded while the others are still downloading. The parsing is
+# done by a pool of processes since it needs the CPU, the downloads by a pool of threads. The metrics of
+# the parsing are sent back from the processes with each page (see profiling.metrics_collector).
+# ----------------------------------------------------------------------------------------------------
+DEFAULT_PAGE_SPEC = {
+    "name" : "DoReMi Market",
+    "url" : PAGE_URL,
+    "table_xpath" : TABLE_XPATH,
+    "result_colors" : RESULT_COLORS,
+    "first_year" : FIRST_YEAR,
+    # None -> the data folder (see settings.py).
+    "output_dir" : None
+}
+MAX_CONNECTIONS_PER_HOST = 16
+REQUESTS_PER_SECOND = 20.0
+RETRIES = 3
+BACKOFF_SECONDS = 1.0
+# The server answers these when it's busy or down for a moment -> try again.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Downloads at the same time (all hosts).
+THREAD_WORKERS = 64
+
+def page_spec_completer(spec: dict) -> dict:
+    """Fills the missing keys of a page spec with the ones of DEFAULT_PAGE_SPEC.
+
+    Args:
+        spec (dict): Page spec. At least "url".
+
+    Returns:
+        dict: Complete page spec. The result colors are tuples, even if read from JSON.
+    """
+    spec = {**DEFAULT_PAGE_SPEC, "name" : spec["url"], **spec}
+    spec["result_colors"] = {style : tuple(result) for style, result in spec["result_colors"].items()}
+
+    return spec
+
+def page_specs_loader(path: str) -> list[dict]:
+    """Reads the page specs from a JSON file -> a list of page specs.
+
+    Args:
+        path (str): Path of the JSON file.
+
+    Returns:
+        list[dict]: Complete page specs.
+    """
+    with open(path, encoding="utf-8") as specs_file:
+        return [page_spec_completer(spec) for spec in json.load(specs_file)]
+
+def fetch_state_builder(max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST,
+                        requests_per_second: float | None = REQUESTS_PER_SECOND,
+                        parse_workers: int | None = None) -> dict:
+    """Everything shared by the downloads of one run -> the open connections, the limits per host and
+    the pools of threads / processes.
+
+    Args:
+        max_connections_per_host (int, optional): Downloads at the same time per host.
+        Defaults to MAX_CONNECTIONS_PER_HOST.
+        requests_per_second (float | None, optional): Requests per second per host. None -> no limit.
+        Defaults to REQUESTS_PER_SECOND.
+        parse_workers (int | None, optional): Processes that parse the pages. Defaults to None -> all cores.
+
+    Returns:
+        dict: State of the downloads.
+    """
+    return {
+        "max_connections" : max_connections_per_host,
+        "interval" : 1 / requests_per_second if requests_per_second else 0.0,
+        "semaphores" : {},
+        "next_slot" : {},
+        "idle" : {},
+        "executor" : ThreadPoolExecutor(max_workers=THREAD_WORKERS),
+        "parse_executor" : ProcessPoolExecutor(max_workers=parse_workers),
+        "ssl_context" : ssl.create_default_context()
+    }
+
+async def rate_limiter(host: str, state: dict) -> None:
+    """Waits for the next free slot of the host.
+
+    Args:
+        host (str): "scheme://host:port".
+        state (dict): Output of fetch_state_builder.
+    """
+    now = time.monotonic()
+    slot = max(now, state["next_slot"].get(host, now))
+    state["next_slot"][host] = slot + state["interval"]
+
+    if slot > now:
+        await asyncio.sleep(slot - now)
+
+def connection_getter(host: str, state: dict) -> http.client.HTTPConnection:
+    """An open connection to the host, or a new one.
+
+    Args:
+        host (str): "scheme://host:port".
+        state (dict): Output of fetch_state_builder.
+
+    Returns:
+        http.client.HTTPConnection: The connection.
+    """
+    idle = state["idle"].setdefault(host, [])
+    if idle:
+        return idle.pop()
+
+    scheme, netloc = host.split("://", 1)
+    if scheme == "https":
+        return http.client.HTTPSConnection(netloc, timeout=30, context=state["ssl_context"])
+
+    return http.client.HTTPConnection(netloc, timeout=30)
+
+def http_getter(connection: http.client.HTTPConnection, path: str) -> tuple[int, dict[str, str], str]:
+    """Sends one GET request on the connection. Runs in a thread.
+
+    Args:
+        connection (http.client.HTTPConnection): Connection to the host.
+        path (str): Path and query of the page.
+
+    Returns:
+        tuple[int, dict[str, str], str]: Status, headers and the HTML.
+    """
+    connection.request("GET", path, headers={"User-Agent" : USER_AGENT})
+    response = connection.getresponse()
+    body = response.read()
+    charset = response.headers.get_content_charset() or "utf-8"
+
+    return response.status, dict(response.headers.items()), body.decode(charset, errors="replace")
+
+async def page_fetcher(url: str, state: dict, retries: int = RETRIES, backoff: float = BACKOFF_SECONDS) -> str:
+    """Downloads one page with the shared connections. Tries again if the server is busy or the
+    connection is lost -> waits 1s, 2s, 4s... or as long as the server asks ("Retry-After").
+
+    Args:
+        url (str): URL of the page.
+        state (dict): Output of fetch_state_builder.
+        retries (int, optional): How many times to try again. Defaults to RETRIES.
+        backoff (float, optional): Seconds before the first retry. Defaults to BACKOFF_SECONDS.
+
+    Raises:
+        HTTPError: The server answered with an error (after all the retries for the busy ones).
+
+    Returns:
+        str: The HTML of the page.
+    """
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}"
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    semaphore = state["semaphores"].setdefault(host, asyncio.Semaphore(state["max_connections"]))
+    loop = asyncio.get_running_loop()
+
+    for attempt in range(retries + 1):
+        async with semaphore:
+            await rate_limiter(host, state)
+            connection = connection_getter(host, state)
+            counter_incrementer("network_calls")
+            try:
+                status, headers, html = await loop.run_in_executor(state["executor"], http_getter, connection, path)
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                if attempt == retries:
+                    raise
+                wait = backoff * 2 ** attempt
+            else:
+                state["idle"][host].append(connection)
+                if status == 200:
+                    return html
+                if status not in RETRY_STATUSES or attempt == retries:
+                    raise HTTPError(url, status, f"Page could not be downloaded ({status}).", headers, None)
+                retry_after = headers.get("Retry-After", "")
+                wait = float(retry_after) if retry_after.isdigit() else backoff * 2 ** attempt
+
+        await asyncio.sleep(wait)
+
+def page_parser(html: str, spec: dict) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Gets the results and the tables of one page. Same steps as data_gathering.main.
+
+    Args:
+        html (str): The HTML of the page.
+        spec (dict): Page spec of the page.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Cleaned results and the semi-cleaned tables.
+    """
+    data_table_lxml, selected_tables = result_scraper_lxml(html, table_xpath=spec["table_xpath"])
+
+    return results_cleaner(data_table_lxml, spec["result_colors"]), tables_scraper_pandas(selected_tables, spec["first_year"])
+
+async def page_gatherer(spec: dict, state: dict) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Downloads one page then parses it in another process, so the other pages keep downloading. The
+    metrics of the parsing are added to the ones of this process.
+
+    Args:
+        spec (dict): Page spec of the page.
+        state (dict): Output of fetch_state_builder.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Output of page_parser.
+    """
+    html = await page_fetcher(spec["url"], state)
+
+    parsed, parse_metrics = await asyncio.get_running_loop().run_in_executor(
+        state["parse_executor"], metrics_collector, page_parser, html, spec
+        )
+    metrics_merger(parse_metrics)
+
+    return parsed
+
+async def pages_gatherer(specs: list[dict],
+                         max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST,
+                         requests_per_second: float | None = REQUESTS_PER_SECOND,
+                         parse_workers: int | None = None) -> list[tuple[pd.DataFrame, pd.DataFrame]]:
+    """Downloads and parses all the pages at the same time.
+
+    Args:
+        specs (list[dict]): Complete page specs.
+        max_connections_per_host (int, optional): See fetch_state_builder. Defaults to MAX_CONNECTIONS_PER_HOST.
+        requests_per_second (float | None, optional): See fetch_state_builder. Defaults to REQUESTS_PER_SECOND.
+        parse_workers (int | None, optional): See fetch_state_builder. Defaults to None -> all cores.
+
+    Returns:
+        list[tuple[pd.DataFrame, pd.DataFrame]]: Output of page_parser per page, in the order of the specs.
+    """
+    state = fetch_state_builder(max_connections_per_host, requests_per_second, parse_workers)
+
+    try:
+        return await asyncio.gather(*(page_gatherer(spec, state) for spec in specs))
+    finally:
+        state["executor"].shutdown(wait=False)
+        state["parse_executor"].shutdown(wait=False, cancel_futures=True)
+        for idle in state["idle"].values():
+            for connection in idle:
+                connection.close()
+
+def pages_writer(specs: list[dict], gathered: list[tuple[pd.DataFrame, pd.DataFrame]]) -> None:
+    """Writes the CSV files of each folder. The pages with the same folder are put together in order.
+
+    Args:
+        specs (list[dict]): Complete page specs.
+        gathered (list[tuple[pd.DataFrame, pd.DataFrame]]): Output of pages_gatherer.
+    """
+    per_folder: dict[str, list[tuple[pd.DataFrame, pd.DataFrame]]] = {}
+
+    for spec, page_output in zip(specs, gathered):
+        per_folder.setdefault(spec["output_dir"] or data_path(), []).append(page_output)
+
+    outputs = {}
+    for output_dir, page_outputs in per_folder.items():
+        for folder in ("cleaned", "raw"):
+            os.makedirs(os.path.join(output_dir, folder), exist_ok=True)
+        outputs[os.path.join(output_dir, "cleaned", "cleaned_result.csv")] = pd.concat(
+            [df_results for df_results, _ in page_outputs], ignore_index=True
+            )
+        outputs[os.path.join(output_dir, "raw", "raw_tables.csv")] = pd.concat(
+            [df_tables for _, df_tables in page_outputs], ignore_index=True
+            )
+
+    dataframes_writer(outputs)
+
+@instrumented()
+def main(specs: list[dict],
+         max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST,
+         requests_per_second: float | None = REQUESTS_PER_SECOND,
+         parse_workers: int | None = None) -> None:
+    """
+    Gathers all the pages and writes their CSV files. Used by data_gathering.main when it's given page specs.
+
+    Args:
+        specs (list[dict]): Page specs. The missing keys are taken from DEFAULT_PAGE_SPEC.
+        max_connections_per_host (int, optional): See fetch_state_builder. Defaults to MAX_CONNECTIONS_PER_HOST.
+        requests_per_second (float | None, optional): See fetch_state_builder. Defaults to REQUESTS_PER_SECOND.
+        parse_workers (int | None, optional): See fetch_state_builder. Defaults to None -> all cores.
+    """
+    specs = [page_spec_completer(spec) for spec in specs]
+    gathered = asyncio.run(pages_gatherer(specs, max_connections_per_host, requests_per_second, parse_workers))
+
+    pages_writer(specs, gathered)
@@ -0,0 +1,239 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from functools import wraps
+from typing import Callable
+import json
+import threading
+import time
+import tracemalloc
+
+# ----------------------------------------------------------------------------------------------------
+# Metrics of the pipeline. Every function decorated with @instrumented records its wall time, CPU time,
+# peak memory (only if tracemalloc is running -> see session_starter) and the number of rows going in and
+# out. counter_incrementer counts the network / WebDriver calls and the rows read / written by storage.py.
+# The counts are added to every function that is running at that moment, so a step includes the calls of
+# the functions inside it.
+#
+# The metrics only live in the process that records them. A function run by a pool of processes is run
+# with metrics_collector, which sends its metrics back with its output, and metrics_merger adds them to
+# the metrics of the main process.
+# ----------------------------------------------------------------------------------------------------
+metrics: dict[str, dict] = {}
+counters: dict[str, int] = {}
+# The pages of page_gathering are downloaded in threads (and parsed in processes, see above). Each thread
+# has its own stack of running functions.
+metrics_lock = threading.Lock()
+thread_state = threading.local()
+
+def active_stack_getter() -> list[list]:
+    """Functions that are running right now in this thread.
+
+    Returns:
+        list[list]: [name, start memory, highest memory seen so far, counters] per function.
+    """
+    if not hasattr(thread_state, "active_stack"):
+        thread_state.active_stack = []
+
+    return thread_state.active_stack
+
+def rows_counter(value) -> int | None:
+    """Number of rows of a dataframe / list. For a tuple, the rows of its first item.
+
+    Args:
+        value: Any argument or output of a function.
+
+    Returns:
+        int | None: Number of rows. None if it's not something with rows.
+    """
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if hasattr(value, "shape") or isinstance(value, list):
+        return len(value)
+
+    return None
+
+def record_builder() -> dict:
+    """Metrics of a function that hasn't been called yet.
+
+    Returns:
+        dict: Calls, wall / CPU time, peak memory, rows in / out and counters.
+    """
+    return {"calls" : 0, "wall_seconds" : 0.0, "cpu_seconds" : 0.0, "peak_memory_bytes" : None,
+            "rows_in" : None, "rows_out" : None, "counters" : {}}
+
+def metrics_recorder(name: str, wall: float, cpu: float, peak_memory: int | None, rows_in: int | None,
+                     rows_out: int | None, call_counters: dict[str, int]) -> None:
+    """Adds one call of a function to the metrics.
+
+    Args:
+        name (str): Name of the function.
+        wall (float): Wall time in seconds.
+        cpu (float): CPU time in seconds.
+        peak_memory (int | None): Highest memory used during the call, in bytes.
+        rows_in (int | None): Rows of the first argument.
+        rows_out (int | None): Rows of the output.
+        call_counters (dict[str, int]): Network / WebDriver calls during the call.
+    """
+    with metrics_lock:
+        record = metrics.setdefault(name, record_builder())
+
+        record["calls"] += 1
+        record["wall_seconds"] += wall
+        record["cpu_seconds"] += cpu
+        if peak_memory is not None:
+            record["peak_memory_bytes"] = max(record["peak_memory_bytes"] or 0, peak_memory)
+        if rows_in is not None:
+            record["rows_in"] = (record["rows_in"] or 0) + rows_in
+        if rows_out is not None:
+            record["rows_out"] = (record["rows_out"] or 0) + rows_out
+        for counter_name, count in call_counters.items():
+            record["counters"][counter_name] = record["counters"].get(counter_name, 0) + count
+
+def instrumented(name: str | None = None) -> Callable:
+    """Decorator that records the metrics of a function.
+
+    Args:
+        name (str | None, optional): Name in the report. Defaults to None -> "<module>.<function>".
+
+    Returns:
+        Callable: The decorator.
+    """
+    def decorator(function: Callable) -> Callable:
+        metric_name = name or f"{function.__module__}.{function.__name__}"
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            active_stack = active_stack_getter()
+            tracing = tracemalloc.is_tracing()
+            if tracing:
+                current_memory, peak_memory = tracemalloc.get_traced_memory()
+                # The peak so far belongs to the function that called this one.
+                if active_stack:
+                    active_stack[-1][2] = max(active_stack[-1][2], peak_memory)
+                tracemalloc.reset_peak()
+            else:
+                current_memory = 0
+
+            active_stack.append([metric_name, current_memory, current_memory, {}])
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            output = None
+
+            try:
+                output = function(*args, **kwargs)
+            finally:
+                wall = time.perf_counter() - wall_start
+                cpu = time.process_time() - cpu_start
+                _, start_memory, highest_memory, call_counters = active_stack.pop()
+
+                peak_memory = None
+                if tracing and tracemalloc.is_tracing():
+                    highest_memory = max(highest_memory, tracemalloc.get_traced_memory()[1])
+                    peak_memory = highest_memory - start_memory
+                    if active_stack:
+                        active_stack[-1][2] = max(active_stack[-1][2], highest_memory)
+
+                rows_in = rows_counter(args[0]) if args else None
+                metrics_recorder(metric_name, wall, cpu, peak_memory, rows_in, rows_counter(output), call_counters)
+
+            return output
+
+        return wrapper
+
+    return decorator
+
+def counter_incrementer(name: str, count: int = 1) -> None:
+    """Counts a network / WebDriver call. Added to the totals and to every function that is running.
+
+    Args:
+        name (str): Name of the counter -> "network_calls", "webdriver_calls".
+        count (int, optional): How many calls. Defaults to 1.
+    """
+    with metrics_lock:
+        counters[name] = counters.get(name, 0) + count
+
+    for active in active_stack_getter():
+        active[3][name] = active[3].get(name, 0) + count
+
+def metrics_collector(function: Callable, *args) -> tuple:
+    """Runs a function in a process of a pool and sends back its metrics with its output, otherwise they
+    stay in that process. The metrics copied from the main process (fork) are cleared first.
+
+    Args:
+        function (Callable): The function. Must be picklable (a function of a module).
+        *args: Arguments of the function.
+
+    Returns:
+        tuple: The output of the function and its metrics -> {"functions", "counters"}. See metrics_merger.
+    """
+    metrics.clear()
+    counters.clear()
+    active_stack_getter().clear()
+
+    output = function(*args)
+
+    return output, {"functions" : dict(metrics), "counters" : dict(counters)}
+
+def metrics_merger(process_metrics: dict) -> None:
+    """Adds the metrics of another process (see metrics_collector) to the ones of this process. The counters
+    are also added to every function that is running here, like counter_incrementer.
+
+    Args:
+        process_metrics (dict): Second output of metrics_collector.
+    """
+    with metrics_lock:
+        for name, process_record in process_metrics["functions"].items():
+            record = metrics.setdefault(name, record_builder())
+
+            record["calls"] += process_record["calls"]
+            record["wall_seconds"] += process_record["wall_seconds"]
+            record["cpu_seconds"] += process_record["cpu_seconds"]
+            for key in ("peak_memory_bytes", "rows_in", "rows_out"):
+                if process_record[key] is None:
+                    continue
+                if key == "peak_memory_bytes":
+                    record[key] = max(record[key] or 0, process_record[key])
+                else:
+                    record[key] = (record[key] or 0) + process_record[key]
+            for counter_name, count in process_record["counters"].items():
+                record["counters"][counter_name] = record["counters"].get(counter_name, 0) + count
+
+    for counter_name, count in process_metrics["counters"].items():
+        counter_incrementer(counter_name, count)
+
+def session_starter(track_memory: bool = True) -> None:
+    """Clears the metrics before a run. Starts tracemalloc so that the peak memory is recorded.
+
+    Args:
+        track_memory (bool, optional): Record the peak memory (slower). Defaults to True.
+    """
+    metrics.clear()
+    counters.clear()
+    active_stack_getter().clear()
+
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def report_writer(path: str) -> dict:
+    """Writes the metrics as a JSON file and stops tracemalloc.
+
+    Args:
+        path (str): Where to save the report.
+
+    Returns:
+        dict: The report.
+    """
+    report = {
+        "created_at" : time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "functions" : metrics,
+        "counters" : counters
+    }
+
+    with open(path, "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, indent=2)
+
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+    return report
@@ -0,0 +1,255 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from custom_plot_settings import COLOR_DICT
+from storage import dataframe_reader
+from settings import data_path, figures_path
+from aggregates import (result_cube_builder, cube_years, cube_months, months_per_year, years_per_month,
+                        results_per_year, frame_json, total_json)
+from results_sidecar import sidecar_frame_loader
+from profiling import instrumented
+import json
+import os
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# Static report of the results -> the same numbers as the plots of data_visualizations, without drawing
+# any image. The slices of the cube (see aggregates.py) are written to "report.json", and "report.html"
+# draws the stacked bars and the pie chart from them in the browser (SVG), with the colors of
+# custom_plot_settings.py. The page has everything in it (no files next to it, no internet).
+#
+# Both files only change when the numbers do: no dates in them and always the same order. One slice per
+# line in the JSON, so a diff shows which year / month has changed.
+#
+# report.json   -> {"colors", "result_names", "years", "total", "full_years", "months_per_year", "years_per_month"}
+# report.html   -> the charts
+# ----------------------------------------------------------------------------------------------------
+REPORT_JSON_NAME = "report.json"
+REPORT_HTML_NAME = "report.html"
+# Columns of the merged data used by the cube.
+CUBE_COLUMNS = ["Month", "Year", "Detailed Result"]
+# Parts of the JSON written with one slice per line. The others are written on a single line.
+SERIES_SECTIONS = ("months_per_year", "years_per_month")
+
+# The page. "{report_json}" is replaced by the JSON (not str.format, the CSS and JS have braces).
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Do Re Mi Market results</title>
+<style>
+body { font-family: sans-serif; margin: 2em; color: #222; }
+h2 { margin-top: 2em; border-bottom: 1px solid #ccc; }
+.charts { display: flex; flex-wrap: wrap; gap: 1em; }
+svg { width: 720px; max-width: 100%; height: auto; }
+svg text { font-size: 12px; }
+svg .title { font-size: 18px; text-anchor: middle; }
+svg .axis-label { font-size: 14px; text-anchor: middle; }
+svg .bar-label { text-anchor: middle; dominant-baseline: central; }
+svg .grid { stroke: #ddd; }
+</style>
+</head>
+<body>
+<h1>Do Re Mi Market results</h1>
+<noscript>The charts need JavaScript. The numbers are in report.json.</noscript>
+<div class="charts" id="overview"></div>
+<h2>Results per Month</h2>
+<div class="charts" id="months-per-year"></div>
+<h2>Results per Year</h2>
+<div class="charts" id="years-per-month"></div>
+<script type="application/json" id="report-data">
+{report_json}</script>
+<script>
+const report = JSON.parse(document.getElementById("report-data").textContent);
+
+function esc(text) {
+  return String(text).replace(/[&<>"]/g, c => ({"&" : "&amp;", "<" : "&lt;", ">" : "&gt;", "\\"" : "&quot;"})[c]);
+}
+
+function svgOpen(width, height, title) {
+  return `<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 ${width} ${height}" role="img" ` +
+         `aria-label="${esc(title.replace("\\n", " "))}">` +
+         title.split("\\n").map((line, i) => `<text class="title" x="${width / 2}" y="${24 + i * 22}">${esc(line)}</text>`).join("");
+}
+
+function legend(names, x, y) {
+  return `<text x="${x}" y="${y}">Result:</text>` + names.map((name, i) =>
+    `<rect x="${x}" y="${y + 8 + i * 20}" width="14" height="14" fill="${report.colors[name]}"/>` +
+    `<text x="${x + 20}" y="${y + 20 + i * 20}">${esc(name)}</text>`).join("");
+}
+
+// Step of the y axis -> about 5 lines, 1 / 2 / 2.5 / 5 times a power of 10.
+function tickStep(max) {
+  const raw = max / 5;
+  const power = 10 ** Math.floor(Math.log10(raw));
+  return [1, 2, 2.5, 5, 10].map(m => m * power).find(step => step >= raw);
+}
+
+// Stacked bars of a slice of the cube -> same as the bar plots of data_visualizations.
+function stackedBars(frame, title, xlabel) {
+  const width = 720, height = 440, left = 70, right = 180, top = 70, bottom = 90;
+  const plotWidth = width - left - right, plotHeight = height - top - bottom;
+  const totals = frame.data.map(row => row.reduce((a, b) => a + b, 0));
+  const step = tickStep(Math.max(1, ...totals));
+  const yMax = Math.ceil(Math.max(1, ...totals) * 1.05 / step) * step;
+  const y = value => top + plotHeight - value / yMax * plotHeight;
+  const slot = plotWidth / Math.max(1, frame.index.length), barWidth = slot * 0.5;
+  let out = svgOpen(width, height, title);
+
+  for (let value = 0; value <= yMax; value += step) {
+    out += `<line class="grid" x1="${left}" x2="${left + plotWidth}" y1="${y(value)}" y2="${y(value)}"/>` +
+           `<text x="${left - 6}" y="${y(value) + 4}" text-anchor="end">${value}</text>`;
+  }
+  frame.index.forEach((item, i) => {
+    const x = left + slot * i + (slot - barWidth) / 2;
+    let base = 0;
+    frame.columns.forEach((name, j) => {
+      const value = frame.data[i][j];
+      if (!value) return;
+      const barTop = y(base + value), barHeight = y(base) - barTop;
+      out += `<rect x="${x}" y="${barTop}" width="${barWidth}" height="${barHeight}" fill="${report.colors[name]}">` +
+             `<title>${esc(item)} - ${esc(name)}: ${value}</title></rect>`;
+      if (barHeight >= 12) {
+        out += `<text class="bar-label" x="${x + barWidth / 2}" y="${barTop + barHeight / 2}">${value}</text>`;
+      }
+      base += value;
+    });
+    out += `<text x="${x + barWidth / 2}" y="${top + plotHeight + 14}" text-anchor="end" ` +
+           `transform="rotate(-45 ${x + barWidth / 2} ${top + plotHeight + 14})">${esc(item)}</text>`;
+  });
+  out += `<line x1="${left}" x2="${left + plotWidth}" y1="${y(0)}" y2="${y(0)}" stroke="#222"/>` +
+         `<text class="axis-label" x="${left + plotWidth / 2}" y="${height - 8}">${esc(xlabel)}</text>` +
+         `<text class="axis-label" transform="rotate(-90)" x="${-(top + plotHeight / 2)}" y="18">Number of Occurrences</text>` +
+         legend(frame.columns, left + plotWidth + 20, top);
+  return out + "</svg>";
+}
+
+// Pie chart of the totals -> starts at 3 o'clock, counterclockwise, like matplotlib.
+function pie(total, title) {
+  const width = 720, height = 480, cx = 420, cy = 270, radius = 170;
+  const sum = total.data.reduce((a, b) => a + b, 0);
+  const point = (angle, distance) => [cx + distance * Math.cos(angle), cy - distance * Math.sin(angle)];
+  let out = svgOpen(width, height, title), angle = 0;
+
+  total.index.forEach((name, i) => {
+    const share = total.data[i] / sum, end = angle + share * 2 * Math.PI, middle = (angle + end) / 2;
+    const [x0, y0] = point(angle, radius), [x1, y1] = point(end, radius);
+    const shape = share >= 1 ? `<circle cx="${cx}" cy="${cy}" r="${radius}"`
+      : `<path d="M${cx} ${cy}L${x0} ${y0}A${radius} ${radius} 0 ${share > 0.5 ? 1 : 0} 0 ${x1} ${y1}Z"`;
+    const [px, py] = point(middle, radius * 0.6), [lx, ly] = point(middle, radius * 1.1);
+    out += `${shape} fill="${report.colors[name]}"><title>${esc(name)}: ${total.data[i]}</title>` +
+           (share >= 1 ? "</circle>" : "</path>") +
+           `<text class="bar-label" x="${px}" y="${py}">${(share * 100).toFixed(1)}%</text>` +
+           `<text x="${lx}" y="${ly}" text-anchor="${Math.cos(middle) >= 0 ? "start" : "end"}">${esc(name)}</text>`;
+    angle = end;
+  });
+  return out + legend(total.index, 20, 70) + "</svg>";
+}
+
+const years = report.years, period = `${years[0]} to ${years[years.length - 1]}`;
+const overview = [pie(report.total, `Results percentage:\\n${period}`)];
+if (report.full_years.index.length) {
+  const full = report.full_years.index;
+  overview.push(stackedBars(report.full_years, `Consolidated results:\\n${full[0]} to ${full[full.length - 1]}`, "Year"));
+}
+document.getElementById("overview").innerHTML = overview.join("");
+document.getElementById("months-per-year").innerHTML = Object.entries(report.months_per_year).map(
+  ([year, frame]) => stackedBars(frame, `Consolidated results per Month\\n(Year: ${year})`, "Month")).join("");
+document.getElementById("years-per-month").innerHTML = Object.entries(report.years_per_month).map(
+  ([month, frame]) => stackedBars(frame, `Consolidated results per Year\\n(Month: ${month})`, "Year")).join("");
+</script>
+</body>
+</html>
+"""
+
+# ----------------------------------------------------------------------------------------------------
+# Functions that are used by the main function.
+# ----------------------------------------------------------------------------------------------------
+def report_builder(cube: pd.DataFrame) -> dict:
+    """All the numbers of the report, from the cube.
+
+    Args:
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+
+    Returns:
+        dict: See the top of this file. The slices are the ones of aggregates.frame_json / total_json.
+    """
+    total = total_json(cube)
+
+    return {
+        "colors" : {result : COLOR_DICT[result] for result in total["index"]},
+        "result_names" : total["index"],
+        "years" : [int(year) for year in cube_years(cube)],
+        "total" : total,
+        "full_years" : frame_json(results_per_year(cube, full_years_only=True)),
+        "months_per_year" : {str(year) : frame_json(months_per_year(cube, year)) for year in cube_years(cube)},
+        "years_per_month" : {str(month) : frame_json(years_per_month(cube, month)) for month in cube_months(cube)}
+    }
+
+def report_json_formatter(report: dict) -> str:
+    """The report as JSON text. Short (no spaces) but with one line per part of the report, and one line per
+    slice of SERIES_SECTIONS.
+
+    Args:
+        report (dict): Output of report_builder.
+
+    Returns:
+        str: The JSON.
+    """
+    def compact(value) -> str:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+    lines = []
+    for key, value in report.items():
+        if key in SERIES_SECTIONS:
+            slices = ",\n".join(f"  {compact(item)}:{compact(frame)}" for item, frame in value.items())
+            lines.append(f" {compact(key)}:{{\n{slices}\n }}")
+        else:
+            lines.append(f" {compact(key)}:{compact(value)}")
+
+    return "{\n" + ",\n".join(lines) + "\n}\n"
+
+def text_file_writer(text: str, path: str) -> None:
+    """Writes a text file to a temporary file first, then moves it in place.
+
+    Args:
+        text (str): Content of the file.
+        path (str): Where to write it.
+    """
+    with open(f"{path}.tmp", "w", encoding="utf-8", newline="\n") as text_file:
+        text_file.write(text)
+
+    os.replace(f"{path}.tmp", path)
+
+# ----------------------------------------------------------------------------------------------------
+# Main function.
+# ----------------------------------------------------------------------------------------------------
+@instrumented("report")
+def main(merged_path: str | None = None, save_dir: str | None = None) -> None:
+    """
+    Main function for this file. Counts the merged data and writes "report.json" and "report.html" into
+    the "figures" folder.
+
+    Args:
+        merged_path (str | None, optional): Path of the merged data. Defaults to None -> "data_merged.csv"
+        in the data folder.
+        save_dir (str | None, optional): Where to write the report. Defaults to None -> the "figures" folder.
+    """
+    merged_path = merged_path or data_path("merged/data_merged.csv")
+    save_dir = save_dir or figures_path()
+    os.makedirs(save_dir, exist_ok=True)
+
+    # The binary sidecar if it is up to date (see results_sidecar.py), otherwise only the columns of the cube.
+    df = sidecar_frame_loader(merged_path, columns=CUBE_COLUMNS)
+    if df is None:
+        df = dataframe_reader(merged_path, columns=CUBE_COLUMNS)
+
+    report_json = report_json_formatter(report_builder(result_cube_builder(df)))
+    # "</" would end the <script> of the page. "<\/" is the same text in JSON.
+    report_html = HTML_TEMPLATE.replace("{report_json}", report_json.replace("</", "<\\/"))
+
+    text_file_writer(report_json, os.path.join(save_dir, REPORT_JSON_NAME))
+    text_file_writer(report_html, os.path.join(save_dir, REPORT_HTML_NAME))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from storage import dataframe_chunks_reader, data_version_getter
+from schema import MONTH_DTYPE, MONTH_NAMES, RESULT_DTYPE, RESULT_NAMES
+from text_normalization import air_date_parser
+from settings import data_path
+from profiling import counter_incrementer, instrumented
+import json
+import os
+import struct
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# Binary copy of the columns used by the plots and the stats ("data_merged.bin", next to
+# "data_merged.csv"). Written by the cleaning step with --sidecar. Every column is a fixed-width array of
+# numbers, so opening it is a memory map of the file -> nothing is parsed and the arrays are views of the
+# file, loaded by the OS only when they are used.
+#
+# Layout of the file:
+#   MAGIC (8 bytes), length of the header (8 bytes, little-endian), header (JSON), the columns one after
+#   another, each starting on a multiple of ALIGNMENT bytes, then the names of the episodes (JSON).
+# The header has the number of rows, the type and offset of each column, the names of the episodes /
+# months / results behind the codes, and the version of the merged data it was made from. If the merged
+# data has changed since (or the names are not the same anymore), the sidecar is not used.
+#
+# sidecar_frame_loader()   -> "Episode #", "Date", "Month", "Year", "Detailed Result" (or None)
+# ----------------------------------------------------------------------------------------------------
+SIDECAR_NAME = "merged/data_merged.bin"
+MAGIC = b"DOREMI\x00\x01"
+ALIGNMENT = 64
+# Rows read from the merged data at once.
+SIDECAR_CHUNK_SIZE = 100_000
+# "year" of the rows without a year (a result without a song). Loaded as <NA>.
+UNKNOWN_YEAR = np.iinfo(np.int16).min
+# Columns of sidecar_frame_loader.
+SIDECAR_COLUMNS = ["Episode #", "Date", "Month", "Year", "Detailed Result"]
+# Column of the sidecar -> type. The episode is a code of the list of episodes of the header (its type
+# depends on how many episodes there are). The date is a datetime64 in seconds (the smallest unit of
+# pandas, so it is not converted when loaded), NaT if unknown.
+COLUMN_TYPES = {
+    "episode" : None,
+    "year" : "<i2",
+    "month" : "<i1",
+    "result" : "<i1",
+    "date" : "<M8[s]"
+}
+
+# ----------------------------------------------------------------------------------------------------
+# Writing the sidecar.
+# ----------------------------------------------------------------------------------------------------
+def episode_code_type(count: int) -> str:
+    """Smallest type that can hold the code of every episode. Same as the codes of a pandas categorical,
+    so the codes can be used without a copy.
+
+    Args:
+        count (int): Number of episodes.
+
+    Returns:
+        str: The type -> "<i1", "<i2", "<i4".
+    """
+    for code_type in ("<i1", "<i2", "<i4"):
+        if count < np.iinfo(np.dtype(code_type)).max:
+            return code_type
+
+    return "<i8"
+
+def sidecar_arrays_builder(dataframe: pd.DataFrame, episode_codes: dict[str, int]) -> dict[str, np.ndarray]:
+    """Columns of the sidecar for a chunk of the merged data.
+
+    Args:
+        dataframe (pd.DataFrame): Chunk of the merged data. At least "Episode #", "Air Date", "Month",
+        "Year" and "Detailed Result".
+        episode_codes (dict[str, int]): Episode -> code, of the chunks before. The new episodes are added.
+
+    Returns:
+        dict[str, np.ndarray]: Column of the sidecar -> values.
+    """
+    # The episodes and the days come back many times -> each one is only looked at once.
+    codes, episodes = pd.factorize(dataframe["Episode #"].astype(str))
+    for episode in episodes:
+        episode_codes.setdefault(episode, len(episode_codes))
+    date_codes, air_dates = pd.factorize(dataframe["Air Date"].astype(str))
+
+    return {
+        "episode" : np.array([episode_codes[episode] for episode in episodes], dtype=np.int64)[codes],
+        "year" : dataframe["Year"].fillna(UNKNOWN_YEAR).to_numpy(dtype=np.int16),
+        "month" : pd.Categorical(dataframe["Month"], dtype=MONTH_DTYPE).codes.astype(np.int8),
+        "result" : pd.Categorical(dataframe["Detailed Result"], dtype=RESULT_DTYPE).codes.astype(np.int8),
+        "date" : air_date_parser(pd.Series(air_dates)).to_numpy().astype("datetime64[s]")[date_codes]
+    }
+
+@instrumented()
+def sidecar_writer(merged_path: str | None = None, sidecar_path: str | None = None,
+                   chunk_size: int = SIDECAR_CHUNK_SIZE) -> None:
+    """Writes the sidecar of the merged data. The merged data is read in chunks, only the small arrays of
+    numbers are kept. The sidecar is written to a temporary file first, then moved in place.
+
+    Args:
+        merged_path (str | None, optional): Path of the merged data. Defaults to None -> "data_merged.csv"
+        in the data folder.
+        sidecar_path (str | None, optional): Path of the sidecar. Defaults to None -> SIDECAR_NAME in the
+        data folder.
+        chunk_size (int, optional): Rows read at once. Defaults to SIDECAR_CHUNK_SIZE.
+    """
+    merged_path = merged_path or data_path("merged/data_merged.csv")
+    sidecar_path = sidecar_path or data_path(SIDECAR_NAME)
+    source_path, modified_time, size = data_version_getter(merged_path)
+
+    episode_codes = {}
+    chunks = [sidecar_arrays_builder(dataframe, episode_codes)
+              for dataframe in dataframe_chunks_reader(merged_path, chunk_size, dtype={"Episode #" : str})]
+    column_types = {**COLUMN_TYPES, "episode" : episode_code_type(len(episode_codes))}
+    arrays = {
+        column : np.concatenate([chunk[column] for chunk in chunks]).astype(column_type) if chunks
+                 else np.array([], dtype=column_type)
+        for column, column_type in column_types.items()
+    }
+
+    offsets, offset = {}, 0
+    for column, values in arrays.items():
+        offsets[column] = offset
+        offset += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+
+    # The names of the episodes come after the columns, so that the header stays small and the names are
+    # only read when "Episode #" is used.
+    episode_names = json.dumps(list(episode_codes)).encode("utf-8")
+
+    header = json.dumps({
+        "rows" : len(arrays["year"]),
+        "columns" : {column : {"type" : column_types[column], "offset" : offsets[column]} for column in arrays},
+        "episodes" : {"offset" : offset, "size" : len(episode_names)},
+        "months" : MONTH_NAMES,
+        "results" : RESULT_NAMES,
+        "source" : [os.path.basename(source_path), modified_time, size]
+    }).encode("utf-8")
+    # The columns start on a multiple of ALIGNMENT bytes.
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % ALIGNMENT)
+
+    temp_path = f"{sidecar_path}.tmp"
+    with open(temp_path, "wb") as sidecar_file:
+        sidecar_file.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        for column, values in arrays.items():
+            sidecar_file.write(values.tobytes())
+            sidecar_file.write(b"\x00" * (-values.nbytes % ALIGNMENT))
+        sidecar_file.write(episode_names)
+
+    os.replace(temp_path, sidecar_path)
+
+# ----------------------------------------------------------------------------------------------------
+# Reading the sidecar.
+# ----------------------------------------------------------------------------------------------------
+def sidecar_reader(sidecar_path: str | None = None) -> tuple[dict, dict[str, np.ndarray]]:
+    """Opens the sidecar with a memory map. Nothing is copied -> the arrays are read-only views of the file.
+
+    Args:
+        sidecar_path (str | None, optional): Path of the sidecar. Defaults to None -> SIDECAR_NAME in the
+        data folder.
+
+    Raises:
+        FileNotFoundError: The sidecar hasn't been written yet.
+        ValueError: The file is not a sidecar.
+
+    Returns:
+        tuple[dict, dict[str, np.ndarray]]: The header and the columns. "episode_names" is the JSON of the
+        names of the episodes, as bytes.
+    """
+    sidecar_path = sidecar_path or data_path(SIDECAR_NAME)
+    buffer = np.memmap(sidecar_path, dtype=np.uint8, mode="r")
+
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"Not a sidecar: {sidecar_path}.")
+
+    header_size = struct.unpack("<Q", bytes(buffer[len(MAGIC):len(MAGIC) + 8]))[0]
+    start = len(MAGIC) + 8 + header_size
+    header = json.loads(bytes(buffer[len(MAGIC) + 8:start]))
+
+    arrays = {}
+    for column, layout in header["columns"].items():
+        column_type = np.dtype(layout["type"])
+        column_start = start + layout["offset"]
+        arrays[column] = buffer[column_start:column_start + header["rows"] * column_type.itemsize].view(column_type)
+    names_start = start + header["episodes"]["offset"]
+    arrays["episode_names"] = buffer[names_start:names_start + header["episodes"]["size"]]
+
+    return header, arrays
+
+def sidecar_is_current(header: dict, merged_path: str) -> bool:
+    """Determines if the sidecar was made from the merged data as it is now, with the same names.
+
+    Args:
+        header (dict): Header of the sidecar. See sidecar_reader.
+        merged_path (str): Path of the merged data.
+
+    Returns:
+        bool: True -> the sidecar can be used instead of the merged data.
+    """
+    try:
+        source_path, modified_time, size = data_version_getter(merged_path)
+    except FileNotFoundError:
+        return False
+
+    return (header["source"] == [os.path.basename(source_path), modified_time, size]
+            and header["months"] == MONTH_NAMES and header["results"] == RESULT_NAMES)
+
+def sidecar_frame_loader(merged_path: str | None = None, columns: list[str] | None = None,
+                         sidecar_path: str | None = None) -> pd.DataFrame | None:
+    """The columns used by the plots and the stats, from the sidecar. Same types as schema_applier.
+
+    Args:
+        merged_path (str | None, optional): Path of the merged data. Defaults to None -> "data_merged.csv"
+        in the data folder.
+        columns (list[str] | None, optional): Columns to be loaded. Defaults to None -> all of them.
+        "Episode #" is the only one that has to read the names of the episodes, leave it out when it is
+        not used.
+        sidecar_path (str | None, optional): See sidecar_reader. Defaults to None.
+
+    Returns:
+        pd.DataFrame | None: "Episode #" (categorical, in the order of the data), "Date", "Month", "Year"
+        and "Detailed Result". None if there is no sidecar or it is older than the merged data -> read the
+        merged data instead.
+    """
+    merged_path = merged_path or data_path("merged/data_merged.csv")
+    columns = columns or SIDECAR_COLUMNS
+
+    try:
+        header, arrays = sidecar_reader(sidecar_path)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if not sidecar_is_current(header, merged_path):
+        return None
+
+    # The codes are used as they are by the categoricals -> no copy of the columns.
+    builders = {
+        "Episode #" : lambda: pd.Categorical.from_codes(arrays["episode"],
+                                                        categories=json.loads(bytes(arrays["episode_names"]))),
+        "Date" : lambda: arrays["date"],
+        "Month" : lambda: pd.Categorical.from_codes(arrays["month"], dtype=MONTH_DTYPE),
+        # The years are used as they are, only the mask of the unknown ones is made.
+        "Year" : lambda: pd.arrays.IntegerArray(arrays["year"], arrays["year"] == UNKNOWN_YEAR),
+        "Detailed Result" : lambda: pd.Categorical.from_codes(arrays["result"], dtype=RESULT_DTYPE)
+    }
+
+    counter_incrementer("rows_read", header["rows"])
+    return pd.DataFrame({column : builders[column]() for column in columns}, copy=False)
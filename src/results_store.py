@@ -0,0 +1,291 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from urllib.parse import quote
+from storage import dataframe_chunks_reader
+from schema import MONTH_NAMES, RESULT_NAMES, schema_applier
+from settings import data_path
+from profiling import instrumented
+import os
+import sqlite3
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# Local SQLite copy of the merged data ("data_merged.sqlite", next to "data_merged.csv") so that questions
+# can be asked without writing new loops -> "failure rate in December across years", "all 1st try
+# successes of an artist". Written by the cleaning step with --store. The columns used to filter (year,
+# month, result, episode, artist) have indexes, so a question only reads the rows it needs.
+#
+# results_query(month="December", result="Failed")              -> the rows, same columns as the merged data
+# result_rates_query(by="year", month="December")               -> count of each result and failure rate
+# store_query("SELECT ... FROM results WHERE year = ?", [2020]) -> any other question
+# ----------------------------------------------------------------------------------------------------
+STORE_NAME = "merged/data_merged.sqlite"
+TABLE_NAME = "results"
+# Rows read from the merged data and inserted at once.
+STORE_CHUNK_SIZE = 50_000
+# Column of the merged data -> column of the table. The table has no spaces / "#" in its names, so that the
+# questions are easy to write.
+STORE_COLUMNS = {
+    "Episode #" : "episode",
+    "Song Questions + Snack Time Game" : "song",
+    "Artist" : "artist",
+    "Song" : "title",
+    "Air Date" : "air_date",
+    "Month" : "month",
+    "Year" : "year",
+    "Detailed Result" : "detailed_result",
+    "General Result" : "general_result",
+    "Result as Number" : "result_number"
+}
+TABLE_SQL = f"""
+CREATE TABLE {TABLE_NAME} (
+    row_number INTEGER PRIMARY KEY,
+    episode TEXT,
+    song TEXT,
+    artist TEXT,
+    title TEXT,
+    air_date TEXT,
+    date TEXT,
+    month TEXT,
+    month_number INTEGER,
+    year INTEGER,
+    detailed_result TEXT,
+    general_result TEXT,
+    result_number INTEGER
+)
+"""
+# Made after the rows are inserted, which is faster than keeping them up to date on every insert.
+INDEXES_SQL = [
+    f"CREATE INDEX results_year ON {TABLE_NAME} (year, month_number)",
+    f"CREATE INDEX results_month ON {TABLE_NAME} (month_number, year)",
+    f"CREATE INDEX results_result ON {TABLE_NAME} (detailed_result)",
+    f"CREATE INDEX results_episode ON {TABLE_NAME} (episode)",
+    # Without case -> "bts" finds "BTS".
+    f"CREATE INDEX results_artist ON {TABLE_NAME} (artist COLLATE NOCASE)"
+]
+# Group of result_rates_query -> column of the table, name of the index and order of the groups.
+GROUP_COLUMNS = {
+    "year" : ("year", "Year", "year"),
+    # Unknown months (NULL, "TBA") last.
+    "month" : ("month_number", "Month", "month_number IS NULL, month_number"),
+    "episode" : ("episode", "Episode #", "MIN(row_number)"),
+    "artist" : ("artist COLLATE NOCASE", "Artist", "COUNT(*) DESC, MIN(row_number)")
+}
+
+# ----------------------------------------------------------------------------------------------------
+# Writing the store.
+# ----------------------------------------------------------------------------------------------------
+def store_rows_builder(dataframe: pd.DataFrame) -> list[tuple]:
+    """Rows of the table for a chunk of the merged data.
+
+    Args:
+        dataframe (pd.DataFrame): Chunk of the merged data.
+
+    Returns:
+        list[tuple]: Rows in the order of the columns of TABLE_SQL, without the row number.
+    """
+    dataframe = schema_applier(dataframe, add_date=True)
+
+    df_rows = pd.DataFrame({
+        "episode" : dataframe["Episode #"].astype(str),
+        "song" : dataframe["Song Questions + Snack Time Game"],
+        "artist" : dataframe["Artist"],
+        "title" : dataframe["Song"],
+        "air_date" : dataframe["Air Date"],
+        "date" : dataframe["Date"].dt.strftime("%Y-%m-%d"),
+        "month" : dataframe["Month"].astype(object),
+        # -1 (unknown month) -> 0 -> NULL.
+        "month_number" : (dataframe["Month"].cat.codes + 1).replace(0, None),
+        "year" : dataframe["Year"],
+        "detailed_result" : dataframe["Detailed Result"].astype(object),
+        "general_result" : dataframe["General Result"].astype(object),
+        "result_number" : dataframe["Result as Number"]
+    }).astype(object)
+
+    return list(df_rows.where(df_rows.notna(), None).itertuples(index=False, name=None))
+
+@instrumented()
+def store_writer(merged_path: str | None = None, store_path: str | None = None,
+                 chunk_size: int = STORE_CHUNK_SIZE) -> None:
+    """Writes the merged data to the store. The data is read in chunks, so the memory used doesn't grow
+    with the data. The store is written to a temporary file first, then moved in place.
+
+    Args:
+        merged_path (str | None, optional): Path of the merged data. Defaults to None -> "data_merged.csv"
+        in the data folder.
+        store_path (str | None, optional): Path of the store. Defaults to None -> STORE_NAME in the data folder.
+        chunk_size (int, optional): Rows inserted at once. Defaults to STORE_CHUNK_SIZE.
+    """
+    merged_path = merged_path or data_path("merged/data_merged.csv")
+    store_path = store_path or data_path(STORE_NAME)
+    temp_path = f"{store_path}.tmp"
+
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    connection = sqlite3.connect(temp_path)
+    try:
+        connection.execute(TABLE_SQL)
+        insert_sql = f"INSERT INTO {TABLE_NAME} VALUES (NULL, {', '.join('?' * 12)})"
+
+        for dataframe in dataframe_chunks_reader(merged_path, chunk_size, dtype={"Episode #" : str}):
+            connection.executemany(insert_sql, store_rows_builder(dataframe))
+
+        for index_sql in INDEXES_SQL:
+            connection.execute(index_sql)
+        # Statistics of the indexes, so that SQLite picks the best one for each question.
+        connection.execute("ANALYZE")
+        connection.commit()
+    except BaseException:
+        connection.close()
+        os.remove(temp_path)
+        raise
+
+    connection.close()
+    os.replace(temp_path, store_path)
+
+# ----------------------------------------------------------------------------------------------------
+# Questions to the store. All of them return dataframes.
+# ----------------------------------------------------------------------------------------------------
+def store_connector(store_path: str | None = None) -> sqlite3.Connection:
+    """Opens the store, read only.
+
+    Args:
+        store_path (str | None, optional): Path of the store. Defaults to None -> STORE_NAME in the data folder.
+
+    Raises:
+        FileNotFoundError: The store hasn't been written yet.
+
+    Returns:
+        sqlite3.Connection: The connection. Close it when done.
+    """
+    store_path = os.path.abspath(store_path or data_path(STORE_NAME))
+
+    if not os.path.exists(store_path):
+        raise FileNotFoundError(f"No store found at {store_path}. Run the cleaning step with --store first.")
+
+    return sqlite3.connect(f"file:{quote(store_path)}?mode=ro", uri=True)
+
+def store_query(sql: str, parameters: list | dict | None = None, store_path: str | None = None) -> pd.DataFrame:
+    """Runs any SELECT on the store. The table is "results", see TABLE_SQL for its columns.
+
+    Args:
+        sql (str): The question -> "SELECT year, COUNT(*) FROM results WHERE month = ? GROUP BY year".
+        parameters (list | dict | None, optional): Values of the "?" in the question. Defaults to None.
+        store_path (str | None, optional): See store_connector. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The answer.
+    """
+    connection = store_connector(store_path)
+    try:
+        return pd.read_sql_query(sql, connection, params=parameters)
+    finally:
+        connection.close()
+
+def filters_builder(year: int | None = None, month: str | None = None, result: str | None = None,
+                    episode: str | int | None = None, artist: str | None = None) -> tuple[str, list]:
+    """WHERE part of a question. Only uses the columns with an index.
+
+    Args:
+        year (int | None, optional): Only this year. Defaults to None -> all.
+        month (str | None, optional): Only this month -> "December". Defaults to None -> all.
+        result (str | None, optional): Only this detailed result -> "Failed". Defaults to None -> all.
+        episode (str | int | None, optional): Only this episode -> 150 or "Special 3". Defaults to None -> all.
+        artist (str | None, optional): Only this artist, any case -> "bts". Defaults to None -> all.
+
+    Raises:
+        ValueError: Unknown month or result name.
+
+    Returns:
+        tuple[str, list]: The WHERE part (empty if no filter) and its values.
+    """
+    conditions, parameters = [], []
+
+    if year is not None:
+        conditions.append("year = ?")
+        parameters.append(int(year))
+    if month is not None:
+        if month not in MONTH_NAMES:
+            raise ValueError(f"Unknown month: {month}.")
+        conditions.append("month_number = ?")
+        parameters.append(MONTH_NAMES.index(month) + 1)
+    if result is not None:
+        if result not in RESULT_NAMES:
+            raise ValueError(f"Unknown result: {result}.")
+        conditions.append("detailed_result = ?")
+        parameters.append(result)
+    if episode is not None:
+        conditions.append("episode = ?")
+        parameters.append(str(episode))
+    if artist is not None:
+        conditions.append("artist = ? COLLATE NOCASE")
+        parameters.append(artist.strip())
+
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), parameters
+
+def results_query(year: int | None = None, month: str | None = None, result: str | None = None,
+                  episode: str | int | None = None, artist: str | None = None,
+                  store_path: str | None = None) -> pd.DataFrame:
+    """The rows of the merged data that match all the filters, in their original order.
+
+    Args:
+        year (int | None, optional): See filters_builder. Defaults to None.
+        month (str | None, optional): See filters_builder. Defaults to None.
+        result (str | None, optional): See filters_builder. Defaults to None.
+        episode (str | int | None, optional): See filters_builder. Defaults to None.
+        artist (str | None, optional): See filters_builder. Defaults to None.
+        store_path (str | None, optional): See store_connector. Defaults to None.
+
+    Returns:
+        pd.DataFrame: Same columns and types as the merged data.
+    """
+    where_sql, parameters = filters_builder(year, month, result, episode, artist)
+    columns_sql = ", ".join(STORE_COLUMNS.values())
+
+    dataframe = store_query(f"SELECT {columns_sql} FROM {TABLE_NAME} {where_sql} ORDER BY row_number",
+                            parameters, store_path)
+
+    return schema_applier(dataframe.rename(columns={column : name for name, column in STORE_COLUMNS.items()}))
+
+def result_rates_query(by: str = "year", year: int | None = None, month: str | None = None,
+                       episode: str | int | None = None, artist: str | None = None,
+                       store_path: str | None = None) -> pd.DataFrame:
+    """Count of each result and the failure rate per year / month / episode / artist.
+
+    Args:
+        by (str, optional): "year", "month", "episode" or "artist" (most rounds first). Defaults to "year".
+        year (int | None, optional): See filters_builder. Defaults to None.
+        month (str | None, optional): See filters_builder. Defaults to None.
+        episode (str | int | None, optional): See filters_builder. Defaults to None.
+        artist (str | None, optional): See filters_builder. Defaults to None.
+        store_path (str | None, optional): See store_connector. Defaults to None.
+
+    Raises:
+        ValueError: Unknown "by".
+
+    Returns:
+        pd.DataFrame: Index -> Year / Month / Episode # / Artist. Columns -> result names in the canonical order,
+        "Total" and "Failure Rate" (0 to 1). The rows with an unknown month are grouped under None (last).
+    """
+    if by not in GROUP_COLUMNS:
+        raise ValueError(f"Unknown group: {by}. Use one of {list(GROUP_COLUMNS)}.")
+
+    where_sql, parameters = filters_builder(year, month, None, episode, artist)
+    group_column, index_name, order_sql = GROUP_COLUMNS[by]
+    # One SUM per result name -> one pass over the matching rows.
+    counts_sql = ", ".join(f"SUM(detailed_result = '{result}') AS \"{result}\"" for result in RESULT_NAMES)
+
+    dataframe = store_query(
+        f"SELECT {group_column} AS grouped, {counts_sql}, COUNT(*) AS Total FROM {TABLE_NAME} {where_sql} "
+        f"GROUP BY {group_column} ORDER BY {order_sql}", parameters, store_path
+        )
+
+    if by == "month":
+        dataframe["grouped"] = [None if pd.isna(number) else MONTH_NAMES[int(number) - 1]
+                                for number in dataframe["grouped"]]
+    dataframe = dataframe.set_index("grouped").rename_axis(index_name)
+    dataframe["Failure Rate"] = dataframe["Failed"] / dataframe["Total"]
+
+    return dataframe
@@ -0,0 +1,64 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from text_normalization import air_date_parser
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# The canonical order of the result names and months. Everything that needs an order (plots, groupby)
+# uses these.
+# ----------------------------------------------------------------------------------------------------
+RESULT_NAMES = ["1st Try Success", "2nd Try Success", "3rd Try Success", "Failed"]
+GENERAL_RESULT_NAMES = ["Success", "Failed"]
+MONTH_NAMES = ["January", "February", "March", "April", "May", "June", "July",
+               "August", "September", "October", "November", "December"]
+
+RESULT_DTYPE = pd.CategoricalDtype(RESULT_NAMES, ordered=True)
+GENERAL_RESULT_DTYPE = pd.CategoricalDtype(GENERAL_RESULT_NAMES, ordered=True)
+MONTH_DTYPE = pd.CategoricalDtype(MONTH_NAMES, ordered=True)
+
+# Column -> dtype. Only the columns that are in the dataframe are converted. The ints can be missing (<NA>),
+# like the categories -> a song without a result, or a result without a song (see data_cleaning_merging.data_merger).
+COLUMN_DTYPES = {
+    "Detailed Result" : RESULT_DTYPE,
+    "General Result" : GENERAL_RESULT_DTYPE,
+    "Month" : MONTH_DTYPE,
+    "Year" : "Int16",
+    "Result as Number" : "Int8"
+}
+
+# ----------------------------------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------------------------------
+def schema_applier(dataframe: pd.DataFrame, add_date: bool = False) -> pd.DataFrame:
+    """Converts the columns to their compact types -> ordered categoricals for the result names and
+    months, small ints for the year and the result as number.
+
+    Args:
+        dataframe (pd.DataFrame): Any dataframe of the pipeline. Missing columns are skipped.
+        add_date (bool, optional): Also add a "Date" column (datetime64) parsed from the "Air Date".
+        Not written to the CSV files. Defaults to False.
+
+    Returns:
+        pd.DataFrame: The same data with the compact types.
+    """
+    dtypes = {column : dtype for column, dtype in COLUMN_DTYPES.items() if column in dataframe.columns}
+    dataframe = dataframe.astype(dtypes)
+
+    if add_date and "Air Date" in dataframe.columns:
+        dataframe["Date"] = air_date_parser(dataframe["Air Date"].astype(str))
+
+    return dataframe
+
+def ordered_result_names(results: pd.Series | list) -> list[str]:
+    """The result names that are in the data, in the canonical order.
+
+    Args:
+        results (pd.Series | list): "Detailed Result" column or a list of result names.
+
+    Returns:
+        list[str]: Chronological order of result names.
+    """
+    present = set(results)
+
+    return [result for result in RESULT_NAMES if result in present]
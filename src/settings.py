@@ -0,0 +1,64 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+import os
+
+# ----------------------------------------------------------------------------------------------------
+# Folders of the data and the figures. By default they are relative to the "src" folder, since the steps
+# are run from there. They can be changed with the environment variables DOREMI_DATA_DIR and
+# DOREMI_FIGURES_DIR, or with --data-dir / --figures-dir of main.py. Every step gets its paths from here
+# when it runs, so changing them before running a step is enough.
+# ----------------------------------------------------------------------------------------------------
+def environment_folder(variable: str, default: str) -> str:
+    """Folder from an environment variable. Like paths_setter, a relative path is taken from the current
+    folder -> it is made absolute here, before main.py goes to the "src" folder.
+
+    Args:
+        variable (str): Name of the environment variable.
+        default (str): Folder if the variable is not set (relative to the "src" folder).
+
+    Returns:
+        str: The folder.
+    """
+    folder = os.environ.get(variable)
+
+    return os.path.abspath(folder) if folder else default
+
+paths = {
+    "data" : environment_folder("DOREMI_DATA_DIR", "../data"),
+    "figures" : environment_folder("DOREMI_FIGURES_DIR", "../figures")
+}
+
+def paths_setter(data_dir: str | None = None, figures_dir: str | None = None) -> None:
+    """Changes the folders. Relative paths are taken from the current folder, not the "src" folder.
+
+    Args:
+        data_dir (str | None, optional): Folder of the data. Defaults to None -> unchanged.
+        figures_dir (str | None, optional): Folder of the figures. Defaults to None -> unchanged.
+    """
+    if data_dir is not None:
+        paths["data"] = os.path.abspath(data_dir)
+    if figures_dir is not None:
+        paths["figures"] = os.path.abspath(figures_dir)
+
+def data_path(*parts: str) -> str:
+    """Path of a file in the data folder.
+
+    Args:
+        *parts (str): Path inside the data folder -> "merged/data_merged.csv".
+
+    Returns:
+        str: The path.
+    """
+    return os.path.join(paths["data"], *parts)
+
+def figures_path(*parts: str) -> str:
+    """Path of a file in the figures folder.
+
+    Args:
+        *parts (str): Path inside the figures folder. Nothing -> the folder itself.
+
+    Returns:
+        str: The path.
+    """
+    return os.path.join(paths["figures"], *parts)
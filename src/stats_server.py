@@ -0,0 +1,301 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from storage import dataframe_reader, data_version_getter
+from schema import schema_applier
+from settings import data_path, paths_setter
+from aggregates import (result_cube_builder, cube_years, cube_months, months_per_year, years_per_month,
+                        results_per_year, frame_json, total_json)
+from figure_rendering import figure_drawer, figure_jobs_builder
+from artists import artist_attempts, artist_index_reader, artist_position
+from results_sidecar import sidecar_frame_loader
+from momentum import momentum_builder
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+import matplotlib
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# Local HTTP service of the numbers behind the plots, for the dashboards. Same counts as the plots of
+# data_visualizations (see aggregates.py) as JSON, and the plots themselves as PNG.
+#
+# GET /                          -> list of the endpoints and plots
+# GET /api/total                 -> count and percentage of each result name
+# GET /api/years[?full=1]        -> results per year (only the years with 12 months of data)
+# GET /api/years/<year>          -> results per month of the year
+# GET /api/months/<month>        -> results per year of the month
+# GET /api/cube                  -> results per year and month
+# GET /api/artists               -> attempts, results, average tries and failure rate of every artist
+# GET /api/artists/<artist>      -> the same for one artist (any case) and its rounds
+# GET /plots/<name>.png          -> a plot, same names as the figures of the batch mode ("Plot-Months-2023",
+#                                   "Plot-Momentum-Streaks"), and the grids of small multiples
+#
+# The answers are kept in memory (least recently used ones are dropped first). The merged data is checked
+# on every request -> if the file has changed, the data is loaded again and the kept answers are dropped.
+#
+# python stats_server.py --port 8050
+# ----------------------------------------------------------------------------------------------------
+CACHE_SIZE = 256
+# Columns used by the counts.
+CUBE_COLUMNS = ["Month", "Year", "Detailed Result"]
+# Columns used by the momentum plots, if there's no sidecar. Same as data_visualizations.
+MOMENTUM_COLUMNS = ["Episode #", "Air Date", "Month", "Year", "Detailed Result"]
+# pyplot is not thread safe -> one plot at a time.
+plot_lock = threading.Lock()
+# Version of the data of the kept answers. See storage.data_version_getter.
+cache_state = {"data_key" : None}
+
+@lru_cache(maxsize=1)
+def cube_loader(merged_path: str, data_key: tuple[str, int, int]) -> pd.DataFrame:
+    """Loads the merged data and counts it. Cached, so the file is only read again if it has changed.
+
+    Args:
+        merged_path (str): Path of the merged data.
+        data_key (tuple[str, int, int]): Output of storage.data_version_getter. Only used as part of the cache key.
+
+    Returns:
+        pd.DataFrame: Output of aggregates.result_cube_builder.
+    """
+    # The binary sidecar if it is up to date (see results_sidecar.py).
+    df = sidecar_frame_loader(merged_path, columns=CUBE_COLUMNS)
+    if df is None:
+        df = schema_applier(dataframe_reader(merged_path, columns=CUBE_COLUMNS))
+
+    return result_cube_builder(df)
+
+@lru_cache(maxsize=1)
+def momentum_loader(merged_path: str, data_key: tuple[str, int, int]) -> dict:
+    """Loads the merged data and makes the momentum numbers of the plots. Only used by the plots. Cached,
+    so the file is only read again if it has changed.
+
+    Args:
+        merged_path (str): Path of the merged data.
+        data_key (tuple[str, int, int]): Output of storage.data_version_getter. Only used as part of the cache key.
+
+    Returns:
+        dict: Output of momentum.momentum_builder.
+    """
+    df = sidecar_frame_loader(merged_path)
+    if df is None:
+        df = schema_applier(dataframe_reader(merged_path, columns=MOMENTUM_COLUMNS))
+
+    return momentum_builder(df)
+
+def nan_remover(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """NaN -> None, since NaN is not valid JSON. The average tries and the failure rate of an artist
+    without any result are NaN.
+
+    Args:
+        dataframe (pd.DataFrame): Any dataframe.
+
+    Returns:
+        pd.DataFrame: The same values as Python objects, None instead of NaN.
+    """
+    return dataframe.astype(object).where(dataframe.notna(), None)
+
+def artist_json(artist_index: dict, artist: str) -> dict | None:
+    """Numbers and rounds of one artist. See artists.py.
+
+    Args:
+        artist_index (dict): Output of artists.artist_index_builder.
+        artist (str): Name of the artist, any case.
+
+    Returns:
+        dict | None: {"Artist", "Attempts", result names..., "Average Tries", "Failure Rate", "Rounds"}.
+        None if the artist is not in the data.
+    """
+    try:
+        position = artist_position(artist_index, artist)
+    except KeyError:
+        return None
+
+    df_rounds = artist_attempts(artist_index, artist)[["Episode #", "Song", "Air Date", "Detailed Result"]]
+
+    return {**nan_remover(artist_index["stats"].iloc[[position]]).iloc[0].to_dict(),
+            "Rounds" : df_rounds.astype(str).to_dict(orient="records")}
+
+def plot_png_renderer(cube: pd.DataFrame, momentum: dict, name: str) -> bytes:
+    """Makes one of the plots of the batch mode as a PNG in memory.
+
+    Args:
+        cube (pd.DataFrame): Output of aggregates.result_cube_builder.
+        momentum (dict): Output of momentum.momentum_builder.
+        name (str): Name of the figure -> "Plot-Months-2023".
+
+    Raises:
+        KeyError: No plot with this name.
+
+    Returns:
+        bytes: The PNG.
+    """
+    jobs = {job[0] : job for job in figure_jobs_builder(cube, momentum, grid=True)}
+    job = jobs[name]
+
+    buffer = io.BytesIO()
+    # Same renderer as the batch mode -> the plots of a series have the legend of the whole series.
+    with plot_lock:
+        figure_drawer(cube, job, buffer, momentum)
+
+    return buffer.getvalue()
+
+@lru_cache(maxsize=CACHE_SIZE)
+def response_builder(path: str, query: str, merged_path: str,
+                     data_key: tuple[str, int, int]) -> tuple[int, str, bytes, str]:
+    """The answer of one request. Cached -> the same request on the same data is only built once.
+
+    Args:
+        path (str): Path of the request -> "/api/years/2023".
+        query (str): Query of the request -> "full=1".
+        merged_path (str): Path of the merged data.
+        data_key (tuple[str, int, int]): Output of storage.data_version_getter. Only used as part of the cache key.
+
+    Returns:
+        tuple[int, str, bytes, str]: Status, content type, body and ETag.
+    """
+    cube = cube_loader(merged_path, data_key)
+    parts = [unquote(part) for part in path.strip("/").split("/")]
+    options = parse_qs(query)
+    body = None
+
+    if parts == [""]:
+        body = {
+            "endpoints" : ["/api/total", "/api/years", "/api/years?full=1", "/api/years/<year>", "/api/months/<month>",
+                           "/api/cube", "/api/artists", "/api/artists/<artist>", "/plots/<name>.png"],
+            "plots" : [figure_name for figure_name, _, _ in
+                       figure_jobs_builder(cube, momentum_loader(merged_path, data_key), grid=True)]
+        }
+    elif parts == ["api", "total"]:
+        body = total_json(cube)
+    elif parts == ["api", "years"]:
+        body = frame_json(results_per_year(cube, full_years_only=options.get("full") == ["1"]))
+    elif len(parts) == 3 and parts[:2] == ["api", "years"] and parts[2].isdigit() and int(parts[2]) in cube_years(cube):
+        body = frame_json(months_per_year(cube, int(parts[2])))
+    elif len(parts) == 3 and parts[:2] == ["api", "months"] and parts[2] in cube_months(cube):
+        body = frame_json(years_per_month(cube, parts[2]))
+    elif parts == ["api", "cube"]:
+        body = frame_json(cube[cube.sum(axis=1) > 0])
+    elif parts == ["api", "artists"]:
+        df_stats = artist_index_reader(merged_path, data_key)["stats"]
+        body = nan_remover(df_stats.sort_values("Attempts", ascending=False, kind="stable")).to_dict(orient="records")
+    elif len(parts) == 3 and parts[:2] == ["api", "artists"]:
+        body = artist_json(artist_index_reader(merged_path, data_key), parts[2])
+    elif len(parts) == 2 and parts[0] == "plots" and parts[1].endswith(".png"):
+        try:
+            png = plot_png_renderer(cube, momentum_loader(merged_path, data_key), parts[1].removesuffix(".png"))
+        except KeyError:
+            pass
+        else:
+            return 200, "image/png", png, f"\"{hashlib.sha256(png).hexdigest()[:16]}\""
+
+    if body is None:
+        return 404, "application/json", json.dumps({"error" : f"Not found: {path}"}).encode("utf-8"), ""
+
+    # Never "NaN" in the answer -> an error (500) instead of invalid JSON.
+    encoded = json.dumps(body, allow_nan=False).encode("utf-8")
+    return 200, "application/json", encoded, f"\"{hashlib.sha256(encoded).hexdigest()[:16]}\""
+
+def cached_response_getter(path: str, query: str, merged_path: str) -> tuple[int, str, bytes, str]:
+    """The answer of one request, from memory if the data hasn't changed since it was built.
+
+    Args:
+        path (str): See response_builder.
+        query (str): See response_builder.
+        merged_path (str): See response_builder.
+
+    Returns:
+        tuple[int, str, bytes, str]: Output of response_builder.
+    """
+    data_key = data_version_getter(merged_path)
+
+    if cache_state["data_key"] != data_key:
+        # The data has changed -> the kept answers are dropped, not only left to be pushed out.
+        response_builder.cache_clear()
+        cache_state["data_key"] = data_key
+
+    return response_builder(path, query, merged_path, data_key)
+
+def stats_server_starter(merged_path: str | None = None, host: str = "127.0.0.1",
+                         port: int = 0) -> tuple[ThreadingHTTPServer, str]:
+    """Starts the service in the background.
+
+    Args:
+        merged_path (str | None, optional): Path of the merged data. Defaults to None -> "data_merged.csv"
+        in the data folder.
+        host (str, optional): Address of the service. Defaults to "127.0.0.1".
+        port (int, optional): Port of the service. Defaults to 0 -> any free port.
+
+    Returns:
+        tuple[ThreadingHTTPServer, str]: The server (stop it with shutdown()) and its base URL.
+    """
+    merged_path = os.path.abspath(merged_path or data_path("merged/data_merged.csv"))
+    matplotlib.use("Agg")
+
+    class StatsHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            request = urlsplit(self.path)
+            try:
+                status, content_type, body, etag = cached_response_getter(request.path, request.query, merged_path)
+            except FileNotFoundError as error:
+                # No merged data yet -> run the cleaning step first.
+                status, content_type, body, etag = 503, "application/json", json.dumps({"error" : str(error)}).encode("utf-8"), ""
+            except Exception as error:
+                # Bad data or a bug -> an answer anyway, instead of closing the connection.
+                status, content_type, body, etag = 500, "application/json", json.dumps(
+                    {"error" : f"{type(error).__name__}: {error}"}
+                    ).encode("utf-8"), ""
+
+            if etag and self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            # The dashboards have to ask again every time, so that a change of the data is seen.
+            self.send_header("Cache-Control", "no-cache")
+            if etag:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), StatsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main():
+    """
+    Serves the counts and the plots of the merged data on localhost until Ctrl+C.
+    """
+    parser = argparse.ArgumentParser(description="Local HTTP service of the counts and plots of the merged data.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address of the service.")
+    parser.add_argument("--port", type=int, default=8050, help="Port of the service.")
+    parser.add_argument("--data-dir", help="Folder of the data. Defaults to \"data\".")
+    arguments = parser.parse_args()
+
+    paths_setter(arguments.data_dir)
+    server, base_url = stats_server_starter(host=arguments.host, port=arguments.port)
+    print(f"Serving {base_url}/ (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from typing import Iterable, Iterator
+from profiling import counter_incrementer
+import os
+import pandas as pd
+
+# pyarrow is optional. Without it, only the CSV files are written and read.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# ----------------------------------------------------------------------------------------------------
+# Storage settings. Every dataframe handed from one step to another is written in all of these formats
+# next to each other -> "data_merged.csv", "data_merged.parquet". The CSV files are still written so
+# that they can be viewed in GitHub / Excel. When reading, the first format in READ_ORDER that exists
+# (and is not older than the CSV) is used.
+# ----------------------------------------------------------------------------------------------------
+FILE_EXTENSIONS = {"csv" : ".csv", "parquet" : ".parquet", "feather" : ".feather"}
+STORAGE_FORMATS = ("csv", "parquet") if PYARROW_AVAILABLE else ("csv",)
+READ_ORDER = ("parquet", "feather", "csv")
+
+# ----------------------------------------------------------------------------------------------------
+# Functions used by the steps of the pipeline.
+# ----------------------------------------------------------------------------------------------------
+def storage_path(path: str, file_format: str) -> str:
+    """Path of the same data in another format.
+
+    Args:
+        path (str): Path of the data. The extension is replaced.
+        file_format (str): "csv", "parquet" or "feather".
+
+    Returns:
+        str: The path with the extension of the format.
+    """
+    base_path, _ = os.path.splitext(path)
+
+    return f"{base_path}{FILE_EXTENSIONS[file_format]}"
+
+def dataframes_writer(outputs: dict[str, pd.DataFrame], formats: tuple[str, ...] = STORAGE_FORMATS) -> None:
+    """Writes all the dataframes in all the formats to temporary files first, then moves them in place.
+    A crash while writing will not leave half-written files behind.
+
+    Args:
+        outputs (dict[str, pd.DataFrame]): Path of the data -> dataframe to be written.
+        formats (tuple[str, ...], optional): Formats to be written. Defaults to STORAGE_FORMATS.
+    """
+    written_paths = []
+
+    for path, dataframe in outputs.items():
+        counter_incrementer("rows_written", len(dataframe))
+        for file_format in formats:
+            output_path = storage_path(path, file_format)
+            temp_path = f"{output_path}.tmp"
+
+            if file_format == "csv":
+                dataframe.to_csv(temp_path, index=False)
+            elif file_format == "parquet":
+                dataframe.to_parquet(temp_path, index=False)
+            elif file_format == "feather":
+                dataframe.reset_index(drop=True).to_feather(temp_path)
+            else:
+                raise ValueError(f"Unknown format: {file_format}.")
+
+            written_paths.append(output_path)
+
+    for output_path in written_paths:
+        os.replace(f"{output_path}.tmp", output_path)
+
+def dataframe_writer(dataframe: pd.DataFrame, path: str, formats: tuple[str, ...] = STORAGE_FORMATS) -> None:
+    """Writes one dataframe. See dataframes_writer.
+
+    Args:
+        dataframe (pd.DataFrame): Dataframe to be written.
+        path (str): Path of the data.
+        formats (tuple[str, ...], optional): Formats to be written. Defaults to STORAGE_FORMATS.
+    """
+    dataframes_writer({path : dataframe}, formats)
+
+def dataframes_chunks_writer(chunks: Iterable[dict[str, pd.DataFrame]], formats: tuple[str, ...] = STORAGE_FORMATS) -> None:
+    """Same as dataframes_writer, but the dataframes come in chunks and are written one chunk at a time.
+    Only one chunk is in memory at once. Every chunk of a path must have the same columns and types.
+
+    Args:
+        chunks (Iterable[dict[str, pd.DataFrame]]): Chunks -> path of the data -> rows to be added.
+        formats (tuple[str, ...], optional): "csv" and / or "parquet". Defaults to STORAGE_FORMATS.
+    """
+    if "feather" in formats:
+        raise ValueError("Feather files can't be written in chunks.")
+
+    parquet_writers = {}
+    written_paths = []
+
+    try:
+        for per_chunk in chunks:
+            for path, dataframe in per_chunk.items():
+                counter_incrementer("rows_written", len(dataframe))
+                for file_format in formats:
+                    output_path = storage_path(path, file_format)
+                    temp_path = f"{output_path}.tmp"
+                    first_chunk = output_path not in written_paths
+                    if first_chunk:
+                        written_paths.append(output_path)
+
+                    if file_format == "csv":
+                        dataframe.to_csv(temp_path, index=False, mode="w" if first_chunk else "a", header=first_chunk)
+                    elif file_format == "parquet":
+                        table = pa.Table.from_pandas(
+                            dataframe, schema=parquet_writers[output_path].schema if not first_chunk else None,
+                            preserve_index=False
+                            )
+                        if first_chunk:
+                            parquet_writers[output_path] = pq.ParquetWriter(temp_path, table.schema)
+                        parquet_writers[output_path].write_table(table)
+                    else:
+                        raise ValueError(f"Unknown format: {file_format}.")
+    except BaseException:
+        for parquet_writer in parquet_writers.values():
+            parquet_writer.close()
+        for output_path in written_paths:
+            if os.path.exists(f"{output_path}.tmp"):
+                os.remove(f"{output_path}.tmp")
+        raise
+
+    for parquet_writer in parquet_writers.values():
+        parquet_writer.close()
+    for output_path in written_paths:
+        os.replace(f"{output_path}.tmp", output_path)
+
+def input_path_selector(path: str) -> tuple[str, str]:
+    """The best format available of the data. See READ_ORDER.
+
+    Args:
+        path (str): Path of the data. Any of the extensions can be used.
+
+    Raises:
+        FileNotFoundError: The data doesn't exist in any of the formats.
+
+    Returns:
+        tuple[str, str]: The format and the path of the file.
+    """
+    csv_path = storage_path(path, "csv")
+    csv_modified_time = os.path.getmtime(csv_path) if os.path.exists(csv_path) else 0.0
+
+    for file_format in READ_ORDER:
+        input_path = storage_path(path, file_format)
+
+        if not os.path.exists(input_path):
+            continue
+        if file_format != "csv" and (not PYARROW_AVAILABLE or os.path.getmtime(input_path) < csv_modified_time):
+            # The CSV has been edited / written without this format. The CSV is the one to be trusted.
+            continue
+
+        return file_format, input_path
+
+    raise FileNotFoundError(f"No data found for {path}.")
+
+def data_version_getter(path: str) -> tuple[str, int, int]:
+    """Which version of the data is on the disk. Only stats the file, so it's cheap to call every time.
+    Used as part of a cache key, so that cached data is loaded again when the file changes.
+
+    Args:
+        path (str): Path of the data. Any of the extensions can be used.
+
+    Raises:
+        FileNotFoundError: The data doesn't exist in any of the formats.
+
+    Returns:
+        tuple[str, int, int]: Path of the file that is read, its last change (ns) and its size.
+    """
+    _, input_path = input_path_selector(path)
+    stat = os.stat(input_path)
+
+    return input_path, stat.st_mtime_ns, stat.st_size
+
+def dataframe_reader(path: str, columns: list[str] | None = None) -> pd.DataFrame:
+    """Reads the data from the best format available. Only the given columns are loaded.
+
+    Args:
+        path (str): Path of the data. Any of the extensions can be used.
+        columns (list[str] | None, optional): Columns to be loaded. Defaults to None -> all columns.
+
+    Raises:
+        FileNotFoundError: The data doesn't exist in any of the formats.
+
+    Returns:
+        pd.DataFrame: The data.
+    """
+    file_format, input_path = input_path_selector(path)
+
+    if file_format == "parquet":
+        dataframe = pd.read_parquet(input_path, columns=columns)
+    elif file_format == "feather":
+        dataframe = pd.read_feather(input_path, columns=columns)
+    else:
+        # "nan" in the texts is kept as a text. Only the empty cells are missing values.
+        dataframe = pd.read_csv(input_path, usecols=columns, keep_default_na=False, na_values=[""])
+
+    counter_incrementer("rows_read", len(dataframe))
+    return dataframe
+
+def dataframe_chunks_reader(path: str, chunk_size: int, dtype: dict | None = None) -> Iterator[pd.DataFrame]:
+    """Same as dataframe_reader, but reads the data in chunks of rows. Only one chunk is in memory at once.
+
+    Args:
+        path (str): Path of the data. Any of the extensions can be used.
+        chunk_size (int): Rows per chunk.
+        dtype (dict | None, optional): Types of some columns of the CSV, so that every chunk has the same
+        types. Defaults to None.
+
+    Raises:
+        FileNotFoundError: The data doesn't exist in any of the formats.
+
+    Yields:
+        Iterator[pd.DataFrame]: The chunks in order.
+    """
+    file_format, input_path = input_path_selector(path)
+
+    if file_format == "parquet":
+        chunks = (batch.to_pandas() for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunk_size))
+    elif file_format == "feather":
+        # Feather files can't be read in chunks. The whole file is read, then split.
+        chunks = (dataframe.iloc[start:start + chunk_size] for dataframe in [pd.read_feather(input_path)]
+                  for start in range(0, len(dataframe), chunk_size))
+    else:
+        chunks = pd.read_csv(input_path, chunksize=chunk_size, dtype=dtype, keep_default_na=False, na_values=[""])
+
+    for dataframe in chunks:
+        counter_incrementer("rows_read", len(dataframe))
+        yield dataframe
@@ -0,0 +1,184 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from text_normalization import excluded_songs_loader
+from data_gathering import FIRST_YEAR
+from settings import paths
+from contextlib import contextmanager
+from typing import Iterator
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# Synthetic episode archive of any size, used by the benchmarks. It looks like the tables and the colored
+# cells scraped from the webpage -> same columns, "Notes" like "[a]" in the texts, "Artist - Song" rows,
+# Snack Time Games and the songs of "excluded_songs.txt" (no result). Every song with a result has a
+# colored cell, so the output of the pipeline can be checked the same way as the real data.
+# ----------------------------------------------------------------------------------------------------
+EXCLUDED_SONGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "excluded_songs.txt")
+
+ARTISTS = ["BTS", "Twice", "Blackpink", "Exo", "Red Velvet", "Seventeen", "AKMU", "Apink", "Girls' Generation",
+           "Big Bang", "Mamamoo", "Shinee", "Got7", "IU", "Bolbbalgan4", "Winner", "Fin.K.L", "Sechs Kies",
+           "Lee Hyori", "Psy", "AOA", "Highlight", "Super Junior", "2NE1", "Brown Eyed Girls", "Kara"]
+SONG_WORDS = ["Love", "Heart", "Night", "Dream", "Shaker", "Lotto", "Fire", "Day", "Girl", "Boy", "Summer",
+              "Sweety", "Attack", "Crescendo", "Pride", "Lie", "Bang", "Tell Me", "Nobody", "Rain", "Star", "Why"]
+SNACK_GAMES = ["New/Old Neologism Quiz", "North Korean Cultural Quiz", "Initial Quiz", "Proverb Quiz",
+               "Movie Line Quiz", "Sound Effect Quiz", "Four Letter Idiom Quiz"]
+MARKETS = ["Mangwon Market", "Tongin Market", "Gwangjang Market", "Namdaemun Market", "Jagalchi Market"]
+THEMES = ["School Uniform", "Retro", "Pajama", "Hanbok", "Sports Day", "Halloween"]
+GUESTS = ["Guest A, Guest B", "Guest C", "Guest D, Guest E, Guest F", "Guest G"]
+FOOTNOTES = ["[a]", "[b]", "[bc]", "[d]"]
+
+# Same as the reference in data_gathering.py.
+RESULT_STYLES = ["background: rgb(171, 235, 198);", "background: rgb(174, 214, 241);",
+                 "background: rgb(230, 176, 170);", "background: rgb(210, 180, 222);"]
+RESULT_WEIGHTS = [0.40, 0.25, 0.10, 0.25]
+# Columns of a table as read by pandas. The song is the only cell with a color.
+TABLE_COLUMNS = ["Ep.", "Air Date", "Featured Market", "Song Questions[b] + Snack Time Game[c]",
+                 "Dressing Theme Concept", "Guest(s)"]
+SONG_COLUMN = "Song Questions[b] + Snack Time Game[c]"
+ROWS_PER_EPISODE = 3
+
+def synthetic_archive_builder(rows: int,
+                              years: int = 7,
+                              seed: int = 0,
+                              first_year: int = FIRST_YEAR,
+                              snack_rate: float = 0.15,
+                              excluded_rate: float = 0.01,
+                              footnote_rate: float = 0.05) -> tuple[list[pd.DataFrame], list[np.ndarray]]:
+    """Makes the tables of a fake episode archive. 3 rows per episode, the episodes are spread over the
+    Saturdays of each year (more than one episode per Saturday if there are a lot of rows).
+
+    Args:
+        rows (int): Total number of rows of all the tables.
+        years (int, optional): Number of tables (one per year). Defaults to 7.
+        seed (int, optional): Seed of the random numbers. Same seed -> same archive. Defaults to 0.
+        first_year (int, optional): Year of the first table. Defaults to FIRST_YEAR.
+        snack_rate (float, optional): Share of the rows that are Snack Time Games. Defaults to 0.15.
+        excluded_rate (float, optional): Share of the rows that are excluded songs. Defaults to 0.01.
+        footnote_rate (float, optional): Share of the texts with a "Note". Defaults to 0.05.
+
+    Returns:
+        tuple[list[pd.DataFrame], list[np.ndarray]]: The tables per year (like pd.read_html) and the style
+        of the song cell of each row per year ("" if there's no result).
+    """
+    rng = np.random.default_rng(seed)
+    episodes = max(1, -(-rows // ROWS_PER_EPISODE))
+    row_episode = np.arange(rows) // ROWS_PER_EPISODE
+    row_year = row_episode * years // episodes
+    # ----------------------------------------------------------------------------------------------------
+    # Texts of the "Song Questions + Snack Time Game" column.
+    # ----------------------------------------------------------------------------------------------------
+    song_pool = np.array([f"{artist} - {first} {second}" for artist in ARTISTS
+                          for first in SONG_WORDS for second in SONG_WORDS if first != second], dtype=object)
+    excluded_pool = np.array(sorted(excluded_songs_loader(EXCLUDED_SONGS_PATH)), dtype=object)
+
+    kind = rng.random(rows)
+    is_snack = kind < snack_rate
+    is_excluded = (kind >= snack_rate) & (kind < snack_rate + excluded_rate)
+    has_result = ~is_snack & ~is_excluded
+
+    songs = song_pool[rng.integers(0, len(song_pool), rows)]
+    songs[is_snack] = np.array(SNACK_GAMES, dtype=object)[rng.integers(0, len(SNACK_GAMES), is_snack.sum())]
+    songs[is_excluded] = excluded_pool[rng.integers(0, len(excluded_pool), is_excluded.sum())]
+    songs = footnote_adder(songs, rng, footnote_rate)
+
+    styles = np.full(rows, "", dtype=object)
+    styles[has_result] = np.array(RESULT_STYLES, dtype=object)[
+        rng.choice(len(RESULT_STYLES), has_result.sum(), p=RESULT_WEIGHTS)
+        ]
+    # ----------------------------------------------------------------------------------------------------
+    # One table per year. The Air Date has no year, like in the webpage.
+    # ----------------------------------------------------------------------------------------------------
+    tables = []
+    table_styles = []
+    year_starts = np.searchsorted(row_year, np.arange(years + 1))
+
+    for year_index in range(years):
+        start, end = year_starts[year_index], year_starts[year_index + 1]
+        table_episodes = row_episode[start:end]
+        if len(table_episodes) == 0:
+            continue
+
+        first_saturday = pd.Timestamp(first_year + year_index, 1, 1) + pd.offsets.Week(weekday=5)
+        week = (table_episodes - table_episodes[0]) * 52 // (table_episodes[-1] - table_episodes[0] + 1)
+        dates = pd.DatetimeIndex(first_saturday + pd.to_timedelta(week * 7, unit="D"))
+        air_dates = (dates.month_name() + " " + dates.day.astype(str)).to_numpy(dtype=object)
+        size = end - start
+
+        tables.append(pd.DataFrame({
+            "Ep." : (table_episodes + 1).astype(str).astype(object),
+            "Air Date" : footnote_adder(air_dates, rng, footnote_rate),
+            "Featured Market" : np.array(MARKETS, dtype=object)[rng.integers(0, len(MARKETS), size)],
+            SONG_COLUMN : songs[start:end],
+            "Dressing Theme Concept" : np.array(THEMES, dtype=object)[rng.integers(0, len(THEMES), size)],
+            "Guest(s)" : np.array(GUESTS, dtype=object)[rng.integers(0, len(GUESTS), size)]
+        }, columns=TABLE_COLUMNS))
+        table_styles.append(styles[start:end])
+
+    return tables, table_styles
+
+def footnote_adder(texts: np.ndarray, rng: np.random.Generator, footnote_rate: float) -> np.ndarray:
+    """Adds a "Note" like "[a]" to the end of some texts.
+
+    Args:
+        texts (np.ndarray): Texts (object array).
+        rng (np.random.Generator): Random numbers.
+        footnote_rate (float): Share of the texts with a "Note".
+
+    Returns:
+        np.ndarray: The texts, some with a "Note".
+    """
+    texts = texts.copy()
+    has_note = rng.random(len(texts)) < footnote_rate
+    texts[has_note] = texts[has_note] + np.array(FOOTNOTES, dtype=object)[rng.integers(0, len(FOOTNOTES), has_note.sum())]
+
+    return texts
+
+def cell_styles_builder(table_styles: list[np.ndarray]) -> list[str]:
+    """Styles of all the cells in order, like the output of data_gathering.result_scraper_lxml. Every
+    row has one cell per column and only the song cell has a color.
+
+    Args:
+        table_styles (list[np.ndarray]): Second output of synthetic_archive_builder.
+
+    Returns:
+        list[str]: Style of each cell.
+    """
+    song_position = TABLE_COLUMNS.index(SONG_COLUMN)
+    cells = []
+
+    for styles in table_styles:
+        per_cell = np.full((len(styles), len(TABLE_COLUMNS)), "", dtype=object)
+        per_cell[:, song_position] = styles
+        cells.extend(per_cell.ravel().tolist())
+
+    return cells
+
+@contextmanager
+def temporary_project() -> Iterator[str]:
+    """Temporary folder with the same layout as the project ("src", "data/raw", ...), so that the steps of
+    the pipeline can be run on synthetic data without touching the real files. The current folder is
+    "src" inside it and the folders of settings.py point to it until the end of the "with".
+
+    Yields:
+        Iterator[str]: Path of the temporary project.
+    """
+    current_dir = os.getcwd()
+    current_paths = dict(paths)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for folder in ("src", "data/raw", "data/cleaned", "data/merged"):
+            os.makedirs(os.path.join(temp_dir, folder))
+        shutil.copy(EXCLUDED_SONGS_PATH, os.path.join(temp_dir, "data", "excluded_songs.txt"))
+        # The steps use paths relative to the "src" folder.
+        os.chdir(os.path.join(temp_dir, "src"))
+        paths.update(data=os.path.join(temp_dir, "data"), figures=os.path.join(temp_dir, "figures"))
+        try:
+            yield temp_dir
+        finally:
+            os.chdir(current_dir)
+            paths.update(current_paths)
@@ -0,0 +1,192 @@
+# ----------------------------------------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------------------------------------
+from functools import lru_cache
+from settings import data_path
+from profiling import instrumented
+import os
+import pandas as pd
+import re
+
+# ----------------------------------------------------------------------------------------------------
+# Patterns used for cleaning the texts of the tables. Compiled once here.
+# ----------------------------------------------------------------------------------------------------
+# "Notes" / "HyperLink" in the text -> "[a]", "[b]", "[bc]".
+FOOTNOTE_PATTERN = re.compile(r"\[[a-z]{1,2}\]")
+# Everything that is not a letter -> "April 7" becomes "April".
+NOT_LETTER_PATTERN = re.compile(r"[\W\d_]")
+# "Air Date" after the year has been added -> "April 7, 2018".
+AIR_DATE_FORMAT = "%B %d, %Y"
+# "Artist - Song", split at the first " -" -> "Super Junior - Sorry Sorry - Answer" is "Super Junior" and
+# "Sorry Sorry - Answer". The space after "-" can be missing, a non-breaking space or "Â" ("Apink -Â %%").
+ARTIST_SONG_PATTERN = re.compile(r"^\s*(?P<Artist>.+?)\s+-(?:Â|\s)*(?P<Song>.+?)\s*$")
+# Any run of spaces (non-breaking ones too) -> one space.
+WHITESPACE_PATTERN = re.compile(r"\s+")
+# Pattern of a song -> "String - String". Also catches "String -String" since "Apink - %% (Eung Eung)" is
+# "Apink -Â %% (Eung Eung)" in the raw data.
+SONG_CHARACTERS = r"[a-zA-Z0-9`~!@#$%^&*)(=+_\}{';:.>,<?/-Â]"
+SONG_PATTERN = re.compile(f"{SONG_CHARACTERS} - {SONG_CHARACTERS}|{SONG_CHARACTERS} -{SONG_CHARACTERS}")
+
+# ----------------------------------------------------------------------------------------------------
+# List of the songs without a result ("excluded_songs.txt" in the data folder).
+# ----------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=8)
+def excluded_songs_reader(path: str, modified_time: float) -> frozenset[str]:
+    """Reads the list of songs to be removed. Cached, so the file is only read again if it has changed.
+
+    Args:
+        path (str): Path of the list.
+        modified_time (float): Last time the file has changed. Only used as part of the cache key.
+
+    Returns:
+        frozenset[str]: The songs to be removed.
+    """
+    with open(path, encoding="utf-8") as songs_file:
+        lines = [line.rstrip("\n") for line in songs_file]
+    
+    return frozenset(line for line in lines if line and not line.startswith("# "))
+
+def excluded_songs_loader(path: str | None = None) -> frozenset[str]:
+    """Gets the songs with no Result in it from the text file. See excluded_songs_reader.
+
+    Args:
+        path (str | None, optional): Path of the list. Defaults to None -> "excluded_songs.txt" in the data folder.
+
+    Returns:
+        frozenset[str]: The songs to be removed.
+    """
+    path = path or data_path("excluded_songs.txt")
+
+    return excluded_songs_reader(path, os.path.getmtime(path))
+
+# ----------------------------------------------------------------------------------------------------
+# Functions for a single text. Still used by the notebooks.
+# ----------------------------------------------------------------------------------------------------
+def string_formatter(text: str) -> str:
+    """This removes the "Notes" / "HyperLink" in the text
+
+    Args:
+        text (str): Any text in the table.
+
+    Returns:
+        str: Formatted string.
+    """
+    if FOOTNOTE_PATTERN.search(text):
+        return text.split("[", 1)[0].strip()
+
+    return text
+
+def month_extractor(text: str) -> str:
+    """This function just retrieves the Date in the "Air Date" column. Might be useful
+    in the data visualization.
+
+    Args:
+        text (str): Text in the "Air Date" column.
+
+    Returns:
+        str: Month in String format. To be inserted in the new column named "Month".
+    """
+    return NOT_LETTER_PATTERN.sub("", text)
+
+def song_catcher(text: str) -> bool:
+    """Accepts a string and determines if its a song or not based on the format "String - String".
+
+    Args:
+        text (str): A string to be determine if its a song or not.
+
+    Returns:
+        bool: True -> It is a song.\n\t\tFalse -> Not a song.
+    """
+    return SONG_PATTERN.search(text) is not None
+
+def song_remover(text: str) -> bool:
+    """Accepts a string and determines if its a song to be 
+    remove or not since not all song has a result in it.
+
+    Args:
+        text (str): A string to be determine if its to be remove or not.
+
+    Returns:
+        bool: True -> Remove the song.\n\t\tFalse -> Don't remove the song.
+    """
+    return text in excluded_songs_loader()
+
+# ----------------------------------------------------------------------------------------------------
+# Functions for a whole column at once.
+# ----------------------------------------------------------------------------------------------------
+def column_formatter(text: pd.Series) -> pd.Series:
+    """Same as string_formatter but for the whole column.
+
+    Args:
+        text (pd.Series): Column of strings.
+
+    Returns:
+        pd.Series: Formatted strings.
+    """
+    has_note = text.str.contains(FOOTNOTE_PATTERN, regex=True)
+
+    return text.where(~has_note, text.str.split("[", n=1).str[0].str.strip())
+
+def month_column_extractor(text: pd.Series) -> pd.Series:
+    """Same as month_extractor but for the whole column.
+
+    Args:
+        text (pd.Series): Column of "Air Date" without the year.
+
+    Returns:
+        pd.Series: Month in String format.
+    """
+    return text.str.replace(NOT_LETTER_PATTERN, "", regex=True)
+
+def air_date_parser(air_date: pd.Series) -> pd.Series:
+    """Parses the "Air Date" column into real dates. Dates that are not known yet ("TBA") become NaT.
+
+    Args:
+        air_date (pd.Series): "Air Date" column -> "April 7, 2018".
+
+    Returns:
+        pd.Series: datetime64 column.
+    """
+    return pd.to_datetime(air_date, format=AIR_DATE_FORMAT, errors="coerce")
+
+def month_name_extractor(dates: pd.Series) -> pd.Series:
+    """Gets the name of the month from the parsed dates.
+
+    Args:
+        dates (pd.Series): Output of air_date_parser.
+
+    Returns:
+        pd.Series: Month in String format. Empty if the date is NaT.
+    """
+    return dates.dt.month_name()
+
+def artist_song_splitter(songs: pd.Series) -> pd.DataFrame:
+    """Splits the "Song Questions + Snack Time Game" column into the artist and the song. The odd ones
+    at the bottom of data_cleaning_merging.py work too -> "Apink -Â %% (Eung Eung)", "CL - +HWA+".
+
+    Args:
+        songs (pd.Series): "Song Questions + Snack Time Game" column -> "BTS - DNA".
+
+    Returns:
+        pd.DataFrame: "Artist" and "Song", with single spaces. Missing if the text is not "Artist - Song".
+    """
+    parts = songs.astype(object).str.extract(ARTIST_SONG_PATTERN)
+
+    return parts.apply(lambda column: column.str.replace(WHITESPACE_PATTERN, " ", regex=True))
+
+@instrumented()
+def songs_filter(songs: pd.Series) -> pd.Series:
+    """Same as song_remover and song_catcher but for the whole column at once.
+
+    Args:
+        songs (pd.Series): The "Song Questions + Snack Time Game" column.
+
+    Returns:
+        pd.Series: True -> It is a song with a Result in it. Keep the row.
+    """
+    songs = songs.astype(str)
+    
+    remove_song = songs.isin(excluded_songs_loader())
+    is_it_a_song = songs.str.contains(SONG_PATTERN, regex=True)
+    
+    return is_it_a_song & ~remove_song